@@ -1,4 +1,11 @@
 import sys
+from operator import sub
+
+# NumPy is optional, the fast path is plain Python without it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def solve():
     try:
@@ -49,4 +56,122 @@ def main():
     for _ in range(t):
         solve()
 
-pass
\ No newline at end of file
+
+# --- Fast path ---------------------------------------------------------------
+# solve()/main() above read three lines per test case and loop over the
+# numbers one at a time. For huge inputs it's much faster to read all of
+# stdin at once, parse every number in bulk and print everything in one go.
+
+def answers_python(data):
+    numbers = list(map(int, data.split()))
+    t = numbers[0]
+    pos = 1
+    results = []
+    for _ in range(t):
+        n = numbers[pos]
+        diffs = list(map(sub, numbers[pos + 1:pos + 1 + n], numbers[pos + 1 + n:pos + 1 + 2 * n]))
+        pos += 1 + 2 * n
+        # excess - deficit == sum(diffs) and excess + deficit == sum(|diffs|)
+        total = sum(diffs)
+        spread = sum(map(abs, diffs))
+        s_excess = (spread + total) // 2
+        s_deficit = (spread - total) // 2
+        results.append(max(s_excess, s_deficit))
+    return results
+
+
+def answers_numpy(data):
+    # Parsed by NumPy in C straight from the bytes, no Python int per number
+    numbers = np.fromstring(data, dtype=np.int64, sep=" ")
+    t = int(numbers[0])
+    starts = np.empty(t, dtype=np.int64)
+    sizes = np.empty(t, dtype=np.int64)
+    pos = 1
+    for i in range(t):
+        n = int(numbers[pos])
+        starts[i] = pos + 1
+        sizes[i] = n
+        pos += 1 + 2 * n
+
+    # Index every a[i] and b[i] of every test case at once
+    total = int(sizes.sum())
+    offsets = np.cumsum(sizes) - sizes
+    within = np.arange(total) - np.repeat(offsets, sizes)
+    a_index = np.repeat(starts, sizes) + within
+    diffs = numbers[a_index] - numbers[a_index + np.repeat(sizes, sizes)]
+
+    s_excess = np.zeros(t, dtype=np.int64)
+    s_deficit = np.zeros(t, dtype=np.int64)
+    # reduceat can't handle empty test cases, those just stay 0
+    nonempty = sizes > 0
+    if total:
+        s_excess[nonempty] = np.add.reduceat(np.maximum(diffs, 0), offsets[nonempty])
+        s_deficit[nonempty] = np.add.reduceat(np.maximum(-diffs, 0), offsets[nonempty])
+    return np.maximum(s_excess, s_deficit).tolist()
+
+
+def main_fast():
+    data = sys.stdin.buffer.read()
+    if not data.strip():
+        return
+    answers = answers_numpy(data) if np is not None else answers_python(data)
+    sys.stdout.write("\n".join(map(str, answers)) + "\n")
+
+
+def make_input(count, cases=1000, seed=1):
+    """
+    A test input with about `count` numbers split over `cases` test cases.
+    """
+    import random
+    rng = random.Random(seed)
+    n = max(1, count // (2 * cases))
+    lines = [str(cases)]
+    for _ in range(cases):
+        lines.append(str(n))
+        lines.append(" ".join(str(rng.randint(1, 10 ** 9)) for _ in range(n)))
+        lines.append(" ".join(str(rng.randint(1, 10 ** 9)) for _ in range(n)))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def bench(sizes):
+    # Runs the original per-line path and the fast paths on the same input
+    import io
+    import time
+
+    for count in sizes:
+        data = make_input(count)
+        timings = []
+        outputs = []
+
+        old_stdin, old_stdout = sys.stdin, sys.stdout
+        sys.stdin = io.TextIOWrapper(io.BytesIO(data))
+        sys.stdout = io.StringIO()
+        start = time.perf_counter()
+        main()
+        timings.append(("per-line", time.perf_counter() - start))
+        outputs.append(sys.stdout.getvalue().split())
+        sys.stdin, sys.stdout = old_stdin, old_stdout
+
+        for name, answers in (("bulk", answers_python), ("bulk numpy", answers_numpy)):
+            if name == "bulk numpy" and np is None:
+                continue
+            start = time.perf_counter()
+            result = "\n".join(map(str, answers(data)))
+            timings.append((name, time.perf_counter() - start))
+            outputs.append(result.split())
+
+        same = all(output == outputs[0] for output in outputs)
+        print(f"{count:>10} numbers ({len(data) / 1e6:.0f} MB): "
+              + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in timings)
+              + ("" if same else "  OUTPUTS DIFFER"))
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        # python 2131A.py --bench [counts...]
+        counts = [int(arg) for arg in sys.argv[2:]] or [10 ** 6, 10 ** 7]
+        bench(counts)
+    elif "--slow" in sys.argv:
+        main()
+    else:
+        main_fast()
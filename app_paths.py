@@ -0,0 +1,15 @@
+import os
+
+from PyQt5.QtCore import QStandardPaths
+
+
+def data_path(*parts):
+    """
+    Returns a path inside the browser's per-user data folder, creating the folder if needed.
+    (Something like %LOCALAPPDATA%/Lovely Browser on Windows.)
+    """
+    base = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".lovely-browser")
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, *parts)
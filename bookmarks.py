@@ -0,0 +1,512 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+
+from PyQt5.QtCore import QObject, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWidgets import (
+    QComboBox, QDockWidget, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem,
+    QPushButton, QVBoxLayout, QWidget,
+)
+
+WORD_RE = re.compile(r"\w+")
+
+# Chrome stores times as microseconds since 1601
+CHROME_EPOCH_OFFSET = 11644473600
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS folders (
+        id INTEGER PRIMARY KEY,
+        parent_id INTEGER NOT NULL DEFAULT 0,
+        title TEXT NOT NULL,
+        UNIQUE(parent_id, title)
+    );
+    CREATE TABLE IF NOT EXISTS bookmarks (
+        id INTEGER PRIMARY KEY,
+        folder_id INTEGER NOT NULL DEFAULT 0,
+        url TEXT NOT NULL,
+        title TEXT NOT NULL DEFAULT '',
+        tags TEXT NOT NULL DEFAULT '',
+        added REAL NOT NULL,
+        UNIQUE(folder_id, url)
+    );
+    CREATE INDEX IF NOT EXISTS bookmarks_url ON bookmarks(url);
+    CREATE TABLE IF NOT EXISTS bookmark_tags (
+        tag TEXT NOT NULL,
+        bookmark_id INTEGER NOT NULL,
+        PRIMARY KEY(tag, bookmark_id)
+    ) WITHOUT ROWID;
+
+    -- Full-text index over title, URL and tags, kept in sync by the triggers.
+    -- The prefix indexes make "as you type" queries of 2-3 letters cheap.
+    CREATE VIRTUAL TABLE IF NOT EXISTS bookmarks_fts USING fts5(
+        title, url, tags, content='bookmarks', content_rowid='id', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS bookmarks_ai AFTER INSERT ON bookmarks BEGIN
+        INSERT INTO bookmarks_fts(rowid, title, url, tags) VALUES (new.id, new.title, new.url, new.tags);
+    END;
+    CREATE TRIGGER IF NOT EXISTS bookmarks_ad AFTER DELETE ON bookmarks BEGIN
+        INSERT INTO bookmarks_fts(bookmarks_fts, rowid, title, url, tags)
+        VALUES ('delete', old.id, old.title, old.url, old.tags);
+        DELETE FROM bookmark_tags WHERE bookmark_id = old.id;
+    END;
+"""
+
+
+def connect(db_path):
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def split_tags(tags):
+    return [tag.strip().lower() for tag in tags.split(",") if tag.strip()]
+
+
+class NetscapeParser(HTMLParser):
+    """
+    Streaming parser for the Netscape bookmark file every browser exports.
+    Feed it chunks and collect `items` as (folder path, url, title, added, tags).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items = []
+        # One entry per open <DL>, None for the ones that aren't a folder (the root)
+        self.folders = []
+        self.next_folder = None
+        self.current = None
+
+    def path(self):
+        return tuple(folder for folder in self.folders if folder is not None)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("a", "h3"):
+            self.current = (tag, dict(attrs), [])
+        elif tag == "dl":
+            self.folders.append(self.next_folder)
+            self.next_folder = None
+
+    def handle_endtag(self, tag):
+        if tag == "dl":
+            if self.folders:
+                self.folders.pop()
+        elif self.current is not None and tag == self.current[0]:
+            kind, attrs, text = self.current
+            self.current = None
+            title = "".join(text).strip()
+            if kind == "h3":
+                self.next_folder = title
+            elif attrs.get("href"):
+                try:
+                    added = float(attrs.get("add_date") or 0)
+                except ValueError:
+                    added = 0
+                self.items.append((self.path(), attrs["href"], title, added, attrs.get("tags") or ""))
+
+    def handle_data(self, data):
+        if self.current is not None:
+            self.current[2].append(data)
+
+
+def read_netscape(path, chunk_size=65536):
+    parser = NetscapeParser()
+    with open(path, encoding="utf-8", errors="replace") as export_file:
+        while True:
+            chunk = export_file.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.items
+            parser.items.clear()
+    parser.close()
+    yield from parser.items
+
+
+def read_chrome_json(path):
+    with open(path, encoding="utf-8") as export_file:
+        data = json.load(export_file)
+    # Walked with a stack instead of recursion, exports can be deeply nested
+    stack = [((node.get("name") or key,), node) for key, node in data.get("roots", {}).items()
+             if isinstance(node, dict)]
+    stack.reverse()
+    while stack:
+        path_so_far, node = stack.pop()
+        for child in reversed(node.get("children", [])):
+            if child.get("type") == "folder":
+                stack.append((path_so_far + (child.get("name", ""),), child))
+        for child in node.get("children", []):
+            if child.get("type") == "url":
+                try:
+                    added = int(child.get("date_added", 0)) / 1000000 - CHROME_EPOCH_OFFSET
+                except ValueError:
+                    added = 0
+                yield path_so_far, child.get("url", ""), child.get("name", ""), max(added, 0), ""
+
+
+def read_export(path):
+    """
+    Yields (folder path, url, title, added, tags) from a Chrome "Bookmarks" JSON file or an exported HTML file.
+    """
+    with open(path, "rb") as export_file:
+        start = export_file.read(512).lstrip()
+    if start.startswith(b"{"):
+        return read_chrome_json(path)
+    return read_netscape(path)
+
+
+class BookmarkStore(QObject):
+    """
+    Bookmarks in SQLite: folders, tags and an FTS5 full-text index, all in
+    one file. Reads happen on the GUI thread (they're index lookups),
+    imports run on a thread with their own connection and commit in batches,
+    which WAL mode lets happen alongside the reads.
+    """
+
+    changed = pyqtSignal()
+    importProgress = pyqtSignal(int)
+    importFinished = pyqtSignal(int, str)
+
+    IMPORT_BATCH = 2000
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.import_thread = None
+        try:
+            self.db = connect(db_path)
+        except sqlite3.Error as e:
+            print(f"Warning: bookmarks are disabled, couldn't open {db_path}: {e}")
+            self.db = None
+
+    def count(self):
+        if self.db is None:
+            return 0
+        return self.db.execute("SELECT COUNT(*) FROM bookmarks").fetchone()[0]
+
+    def add(self, url, title, folder=(), tags=""):
+        if self.db is None:
+            return
+        with self.db:
+            self.insert(self.db, {}, [(tuple(folder), url, title, time.time(), tags)])
+        self.changed.emit()
+
+    def remove(self, bookmark_id):
+        if self.db is None:
+            return
+        with self.db:
+            self.db.execute("DELETE FROM bookmarks WHERE id = ?", (bookmark_id,))
+        self.changed.emit()
+
+    def remove_url(self, url):
+        if self.db is None:
+            return
+        with self.db:
+            self.db.execute("DELETE FROM bookmarks WHERE url = ?", (url,))
+        self.changed.emit()
+
+    def contains(self, url):
+        if self.db is None:
+            return False
+        return self.db.execute("SELECT 1 FROM bookmarks WHERE url = ? LIMIT 1", (url,)).fetchone() is not None
+
+    def folders(self):
+        """
+        [(id, "Parent/Child"), ...] sorted by path.
+        """
+        if self.db is None:
+            return []
+        rows = self.db.execute("SELECT id, parent_id, title FROM folders").fetchall()
+        parents = {folder_id: (parent_id, title) for folder_id, parent_id, title in rows}
+        paths = []
+        for folder_id in parents:
+            parts = []
+            current = folder_id
+            while current in parents and len(parts) < 100:
+                current, title = parents[current]
+                parts.append(title)
+            paths.append((folder_id, "/".join(reversed(parts))))
+        paths.sort(key=lambda item: item[1].lower())
+        return paths
+
+    def search(self, text, folder_id=None, limit=200):
+        """
+        Returns [(id, title, url), ...]. Every word has to match the start of a
+        word in the title, URL or tags, and "#tag" only keeps bookmarks with that tag.
+        """
+        if self.db is None:
+            return []
+        tags = [word[1:].lower() for word in text.split() if word.startswith("#") and len(word) > 1]
+        words = WORD_RE.findall(" ".join(word for word in text.split() if not word.startswith("#")))
+
+        # Newest first. Ordering by rowid lets SQLite stop after `limit` rows
+        # instead of ranking every match, which matters for one-letter queries.
+        sql = "SELECT bookmarks.id, bookmarks.title, bookmarks.url FROM bookmarks"
+        where = []
+        params = []
+        order = "bookmarks.id DESC"
+        if words:
+            sql = ("SELECT bookmarks.id, bookmarks.title, bookmarks.url FROM bookmarks_fts"
+                   " JOIN bookmarks ON bookmarks.id = bookmarks_fts.rowid")
+            where.append("bookmarks_fts MATCH ?")
+            params.append(" ".join(f'"{word}"*' for word in words))
+            order = "bookmarks_fts.rowid DESC"
+        for tag in tags:
+            where.append("bookmarks.id IN (SELECT bookmark_id FROM bookmark_tags WHERE tag = ?)")
+            params.append(tag)
+        if folder_id is not None:
+            where.append("bookmarks.folder_id = ?")
+            params.append(folder_id)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        try:
+            return self.db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Warning: bookmark search failed: {e}")
+            return []
+
+    def close(self):
+        if self.import_thread is not None:
+            self.import_thread.join(timeout=2)
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    @staticmethod
+    def folder_id(db, folder_ids, path):
+        if not path:
+            return 0
+        if path in folder_ids:
+            return folder_ids[path]
+        parent_id = BookmarkStore.folder_id(db, folder_ids, path[:-1])
+        db.execute("INSERT OR IGNORE INTO folders (parent_id, title) VALUES (?, ?)", (parent_id, path[-1]))
+        row = db.execute("SELECT id FROM folders WHERE parent_id = ? AND title = ?", (parent_id, path[-1])).fetchone()
+        folder_ids[path] = row[0]
+        return row[0]
+
+    @staticmethod
+    def insert(db, folder_ids, items):
+        """
+        Adds (folder path, url, title, added, tags) items. Bookmarks already in the same folder are skipped.
+        """
+        rows = []
+        for path, url, title, added, tags in items:
+            if url:
+                tags = ",".join(split_tags(tags))
+                rows.append((BookmarkStore.folder_id(db, folder_ids, path), url, title, tags, added or time.time()))
+        db.executemany(
+            "INSERT OR IGNORE INTO bookmarks (folder_id, url, title, tags, added) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        tag_rows = [(tag, folder_id, url) for folder_id, url, _, tags, _ in rows for tag in split_tags(tags)]
+        db.executemany(
+            "INSERT OR IGNORE INTO bookmark_tags (tag, bookmark_id) "
+            "SELECT ?, id FROM bookmarks WHERE folder_id = ? AND url = ?",
+            tag_rows,
+        )
+        return len(rows)
+
+    # --- Importing ---------------------------------------------------------
+
+    def import_file(self, path):
+        if self.import_thread is not None and self.import_thread.is_alive():
+            self.importFinished.emit(0, "Another import is still running")
+            return
+        self.import_thread = threading.Thread(target=self.run_import, args=(path,), name="bookmark-import", daemon=True)
+        self.import_thread.start()
+
+    def run_import(self, path):
+        imported = 0
+        error = ""
+        try:
+            db = connect(self.db_path)
+            folder_ids = {}
+            batch = []
+            for item in read_export(path):
+                batch.append(item)
+                if len(batch) >= self.IMPORT_BATCH:
+                    with db:
+                        imported += self.insert(db, folder_ids, batch)
+                    batch.clear()
+                    self.importProgress.emit(imported)
+            with db:
+                imported += self.insert(db, folder_ids, batch)
+            db.close()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            error = str(e)
+            print(f"Warning: couldn't import bookmarks from {path}: {e}")
+        self.importFinished.emit(imported, error)
+        self.changed.emit()
+
+
+class BookmarksPanel(QDockWidget):
+    """
+    Sidebar with the bookmarks. The list is filtered straight from the full-text index on every keystroke.
+    """
+
+    openUrl = pyqtSignal(QUrl)
+
+    MAX_SHOWN = 200
+
+    def __init__(self, store, favicons=None, parent=None):
+        super().__init__("Bookmarks", parent)
+        self.store = store
+        self.favicons = favicons
+        self.setObjectName("bookmarks_panel")
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Search bookmarks, #tag")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.folder_dropdown = QComboBox()
+        self.list = QListWidget()
+        self.list.setUniformItemSizes(True)
+        self.status_label = QLabel()
+
+        buttons = QHBoxLayout()
+        self.import_btn = QPushButton("Import...")
+        self.delete_btn = QPushButton("Delete")
+        buttons.addWidget(self.import_btn)
+        buttons.addWidget(self.delete_btn)
+
+        layout.addWidget(self.filter_edit)
+        layout.addWidget(self.folder_dropdown)
+        layout.addWidget(self.list)
+        layout.addWidget(self.status_label)
+        layout.addLayout(buttons)
+        self.setWidget(container)
+
+        self.filter_edit.textChanged.connect(self.refresh)
+        self.folder_dropdown.currentIndexChanged.connect(self.refresh)
+        self.list.itemActivated.connect(self.open_item)
+        self.import_btn.clicked.connect(self.choose_import)
+        self.delete_btn.clicked.connect(self.delete_selected)
+        store.changed.connect(self.schedule_reload)
+        store.importProgress.connect(self.import_progress)
+        store.importFinished.connect(self.import_finished)
+
+        # Imports emit changed() a lot, reloading the folder list once is enough
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(200)
+        self.reload_timer.timeout.connect(self.reload)
+        self.reload()
+
+    def schedule_reload(self):
+        self.reload_timer.start()
+
+    def reload(self):
+        current = self.folder_dropdown.currentData()
+        self.folder_dropdown.blockSignals(True)
+        self.folder_dropdown.clear()
+        self.folder_dropdown.addItem("All folders", None)
+        for folder_id, path in self.store.folders():
+            self.folder_dropdown.addItem(path, folder_id)
+        index = self.folder_dropdown.findData(current)
+        self.folder_dropdown.setCurrentIndex(max(index, 0))
+        self.folder_dropdown.blockSignals(False)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        results = self.store.search(self.filter_edit.text(), self.folder_dropdown.currentData(), self.MAX_SHOWN)
+        self.list.clear()
+        for bookmark_id, title, url in results:
+            item = QListWidgetItem(title or url)
+            item.setToolTip(url)
+            item.setData(Qt.UserRole, bookmark_id)
+            item.setData(Qt.UserRole + 1, url)
+            if self.favicons is not None:
+                item.setIcon(self.favicons.icon(url))
+            self.list.addItem(item)
+        self.status_label.setText(f"{self.store.count()} bookmarks")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.filter_edit.setFocus()
+
+    def open_item(self, item):
+        self.openUrl.emit(QUrl(item.data(Qt.UserRole + 1)))
+
+    def delete_selected(self):
+        for item in self.list.selectedItems():
+            self.store.remove(item.data(Qt.UserRole))
+
+    def choose_import(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import bookmarks", os.path.expanduser("~"), "Bookmarks (*.html *.htm *.json Bookmarks);;All files (*)"
+        )
+        if path:
+            self.import_btn.setEnabled(False)
+            self.store.import_file(path)
+
+    def import_progress(self, count):
+        self.status_label.setText(f"Importing... {count} bookmarks")
+
+    def import_finished(self, count, error):
+        self.import_btn.setEnabled(True)
+        self.refresh()
+        if error:
+            self.status_label.setText(f"Import failed after {count} bookmarks: {error}")
+        else:
+            self.status_label.setText(f"Imported {count} bookmarks")
+
+
+if __name__ == "__main__":
+    # Benchmark: python bookmarks.py [count]
+    # Imports a generated Netscape export and times searches as they'd be typed.
+    import sys
+    import tempfile
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    words = ("python", "github", "news", "recipe", "music", "video", "docs", "linux", "game", "travel",
+             "shop", "science", "photo", "design", "blog", "forum", "wiki", "code", "map", "mail")
+    with tempfile.TemporaryDirectory() as folder:
+        export_path = os.path.join(folder, "export.html")
+        with open(export_path, "w", encoding="utf-8") as export_file:
+            export_file.write("<!DOCTYPE NETSCAPE-Bookmark-file-1>\n<H1>Bookmarks</H1>\n<DL><p>\n")
+            for f in range(count // 500):
+                export_file.write(f"<DT><H3>Folder {f}</H3>\n<DL><p>\n")
+                for i in range(500):
+                    n = f * 500 + i
+                    a, b = words[n % 20], words[(n // 20) % 20]
+                    export_file.write(f'<DT><A HREF="https://{a}{n}.example.com/{b}" ADD_DATE="{1600000000 + n}" '
+                                      f'TAGS="{b}">{a.title()} {b} page {n}</A>\n')
+                export_file.write("</DL><p>\n")
+            export_file.write("</DL><p>\n")
+
+        db_path = os.path.join(folder, "bookmarks.sqlite")
+        db = connect(db_path)
+        start = time.perf_counter()
+        folder_ids = {}
+        batch = []
+        total = 0
+        for item in read_export(export_path):
+            batch.append(item)
+            if len(batch) >= BookmarkStore.IMPORT_BATCH:
+                with db:
+                    total += BookmarkStore.insert(db, folder_ids, batch)
+                batch.clear()
+        with db:
+            total += BookmarkStore.insert(db, folder_ids, batch)
+        print(f"imported {total} bookmarks in {time.perf_counter() - start:.2f} s")
+
+        store = BookmarkStore(db_path)
+        for query in ("p", "py", "pyt", "python", "python d", "python docs 12", "#news", "git #code", "zzz"):
+            start = time.perf_counter()
+            for _ in range(20):
+                results = store.search(query)
+            elapsed = (time.perf_counter() - start) / 20 * 1000
+            print(f"{query!r:<18} {len(results):>4} results {elapsed:6.2f} ms")
+        store.close()
+        db.close()
@@ -0,0 +1,378 @@
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from PyQt5.QtCore import QObject, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDockWidget, QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem, QPushButton, QVBoxLayout, QWidget,
+)
+
+WORD_RE = re.compile(r"\w+")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pages (
+        id INTEGER PRIMARY KEY,
+        url TEXT UNIQUE NOT NULL,
+        title TEXT NOT NULL DEFAULT '',
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        indexed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS pages_indexed_at ON pages(indexed_at);
+
+    -- The inverted index itself. Its rowid is pages.id, kept in sync by
+    -- the writer thread (the body only lives here).
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+"""
+
+
+def connect(db_path):
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+class ContentIndex(QObject):
+    """
+    Full-text index of the text of visited pages, so they can be found
+    again by what was on them.
+
+    Nothing heavy happens on the GUI thread: the page text comes from
+    toPlainText() (asynchronous, the renderer sends it over), and is
+    tokenized and written by a background thread in batches. Searches are
+    read straight from the index on the GUI thread, which WAL mode lets
+    happen alongside the writes.
+
+    The index is capped by page count and total text size, the pages
+    indexed longest ago are dropped first.
+    """
+
+    indexed = pyqtSignal(int)
+
+    MAX_PAGES = 5000
+    MAX_BYTES = 100 * 1024 * 1024
+    # Enough to find a page again, without indexing whole books
+    MAX_PAGE_CHARS = 200 * 1000
+    # The same page isn't read again while it's this fresh
+    REINDEX_SECONDS = 10 * 60
+
+    # Queries matching more pages than this aren't ranked by relevance
+    RANK_LIMIT = 500
+
+    BATCH_SIZE = 50
+    BATCH_WAIT = 1.0
+
+    def __init__(self, db_path, enabled=True, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.enabled = enabled
+        self.recent = {}
+        self.writes = queue.Queue()
+        try:
+            self.db = connect(db_path)
+        except sqlite3.Error as e:
+            print(f"Warning: page search is disabled, couldn't open {db_path}: {e}")
+            self.db = None
+            return
+        self.thread = threading.Thread(target=self.run, name="content-indexer", daemon=True)
+        self.thread.start()
+
+    def page_loaded(self, browser_tab):
+        """
+        Called when a tab finished loading a page. Asks the page for its text, which comes back later.
+        """
+        if not self.enabled or self.db is None or browser_tab.page is None:
+            return
+        url = browser_tab.current_url().toString()
+        if not url.startswith(("http://", "https://", "file://")):
+            return
+        now = time.monotonic()
+        if now - self.recent.get(url, -self.REINDEX_SECONDS) < self.REINDEX_SECONDS:
+            return
+        self.recent[url] = now
+        if len(self.recent) > self.MAX_PAGES:
+            self.recent.clear()
+        title = browser_tab.current_title()
+        browser_tab.page.toPlainText(lambda text: self.add_text(url, title, text))
+
+    def add_text(self, url, title, text):
+        if text and self.db is not None:
+            self.writes.put(("add", url, title, text, time.time()))
+
+    def clear(self):
+        self.recent.clear()
+        if self.db is not None:
+            self.writes.put(("clear",))
+
+    def count(self):
+        if self.db is None:
+            return 0
+        return self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def search(self, text, limit=20):
+        """
+        Returns [(url, title, snippet), ...]. Every word has to match the
+        start of a word on the page or in its title.
+        """
+        words = WORD_RE.findall(text)
+        if self.db is None or not words:
+            return []
+        query = " ".join(f'"{word}"*' for word in words)
+        try:
+            # Ranking scores every match, which is slow for words that are on
+            # every page, so those just list the newest pages first
+            matches = self.db.execute("SELECT COUNT(*) FROM pages_fts WHERE pages_fts MATCH ?", (query,)).fetchone()[0]
+            order = "rank" if matches <= self.RANK_LIMIT else "rowid DESC"
+            ids = [row[0] for row in self.db.execute(
+                f"SELECT rowid FROM pages_fts WHERE pages_fts MATCH ? ORDER BY {order} LIMIT ?", (query, limit)
+            )]
+            if not ids:
+                return []
+            # Snippets are the expensive part, so only for the pages that are shown
+            rows = self.db.execute(
+                f"""
+                SELECT pages_fts.rowid, pages.url, pages.title, snippet(pages_fts, 1, '', '', '...', 12)
+                FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid
+                WHERE pages_fts MATCH ? AND pages_fts.rowid IN ({",".join("?" * len(ids))})
+                """,
+                (query, *ids),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Warning: page search failed: {e}")
+            return []
+        found = {row[0]: row[1:] for row in rows}
+        return [found[page_id] for page_id in ids if page_id in found]
+
+    def close(self):
+        if self.db is None:
+            return
+        self.writes.put(None)
+        self.thread.join(timeout=5)
+        self.db.close()
+        self.db = None
+
+    # --- Background thread -----------------------------------------------
+
+    def run(self):
+        try:
+            db = connect(self.db_path)
+        except sqlite3.Error as e:
+            print(f"Warning: page indexing is disabled: {e}")
+            return
+        while True:
+            item = self.writes.get()
+            if item is None:
+                break
+            batch = [item]
+            # Pages loaded around the same time go into one transaction
+            deadline = time.monotonic() + self.BATCH_WAIT
+            stop = False
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    item = self.writes.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self.write_batch(db, batch)
+            if stop:
+                break
+        db.close()
+
+    def write_batch(self, db, batch):
+        try:
+            with db:
+                for item in batch:
+                    if item[0] == "clear":
+                        db.execute("DELETE FROM pages")
+                        db.execute("DELETE FROM pages_fts")
+                    else:
+                        self.write_page(db, *item[1:])
+                self.evict(db)
+        except sqlite3.Error as e:
+            print(f"Warning: couldn't index {len(batch)} pages: {e}")
+            return
+        self.indexed.emit(len(batch))
+
+    def write_page(self, db, url, title, text, indexed_at):
+        text = " ".join(text.split())[:self.MAX_PAGE_CHARS]
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        row = db.execute("SELECT id, digest FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is not None and row[1] == digest:
+            # Same text as last time, only the date changes
+            db.execute("UPDATE pages SET title = ?, indexed_at = ? WHERE id = ?", (title, indexed_at, row[0]))
+            return
+        size = len(text.encode())
+        if row is not None:
+            page_id = row[0]
+            db.execute("DELETE FROM pages_fts WHERE rowid = ?", (page_id,))
+            db.execute("UPDATE pages SET title = ?, digest = ?, size = ?, indexed_at = ? WHERE id = ?",
+                       (title, digest, size, indexed_at, page_id))
+        else:
+            page_id = db.execute("INSERT INTO pages (url, title, digest, size, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                                 (url, title, digest, size, indexed_at)).lastrowid
+        # This is where the text gets tokenized into the index
+        db.execute("INSERT INTO pages_fts (rowid, title, body) VALUES (?, ?, ?)", (page_id, title, text))
+
+    def evict(self, db):
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if count <= self.MAX_PAGES and total <= self.MAX_BYTES:
+            return
+        # Drop the oldest pages until both caps are met again, plus a bit so this doesn't run every batch
+        removed = []
+        for page_id, size in db.execute("SELECT id, size FROM pages ORDER BY indexed_at"):
+            if count <= self.MAX_PAGES * 0.95 and total <= self.MAX_BYTES * 0.95:
+                break
+            removed.append((page_id,))
+            count -= 1
+            total -= size
+        db.executemany("DELETE FROM pages WHERE id = ?", removed)
+        db.executemany("DELETE FROM pages_fts WHERE rowid = ?", removed)
+
+
+class ContentSearchPanel(QDockWidget):
+    """
+    Search box for the text of visited pages. Pages open in a tab are marked, picking one switches to it.
+    """
+
+    openUrl = pyqtSignal(QUrl)
+
+    def __init__(self, index, open_urls=None, parent=None):
+        super().__init__("Search Pages", parent)
+        self.index = index
+        # Returns the URLs open in tabs right now
+        self.open_urls = open_urls or set
+        self.setObjectName("content_search_panel")
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search the text of pages you've visited")
+        self.search_edit.setClearButtonEnabled(True)
+        self.results = QListWidget()
+        self.results.setWordWrap(True)
+        self.status_label = QLabel()
+        buttons = QHBoxLayout()
+        self.clear_btn = QPushButton("Forget all")
+        buttons.addWidget(self.status_label, 1)
+        buttons.addWidget(self.clear_btn)
+        layout.addWidget(self.search_edit)
+        layout.addWidget(self.results)
+        layout.addLayout(buttons)
+        self.setWidget(container)
+
+        # Searched once typing pauses for a moment, not on every single key
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.refresh)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_edit.returnPressed.connect(self.open_first)
+        self.results.itemActivated.connect(self.open_item)
+        self.clear_btn.clicked.connect(self.clear)
+        index.indexed.connect(self.update_status)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        start = time.perf_counter()
+        results = self.index.search(self.search_edit.text())
+        elapsed = (time.perf_counter() - start) * 1000
+        open_urls = self.open_urls()
+        self.results.clear()
+        for url, title, snippet in results:
+            marker = "[open tab] " if url in open_urls else ""
+            item = QListWidgetItem(f"{marker}{title or url}\n{snippet}")
+            item.setToolTip(url)
+            item.setData(Qt.UserRole, url)
+            self.results.addItem(item)
+        self.update_status()
+        if self.search_edit.text().strip():
+            self.status_label.setText(f"{len(results)} found in {elapsed:.0f} ms")
+
+    def update_status(self):
+        if not self.search_edit.text().strip():
+            self.status_label.setText(f"{self.index.count()} pages indexed")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.search_edit.setFocus()
+
+    def open_first(self):
+        if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.refresh()
+        if self.results.count():
+            self.open_item(self.results.item(0))
+
+    def open_item(self, item):
+        self.openUrl.emit(QUrl(item.data(Qt.UserRole)))
+
+    def clear(self):
+        self.index.clear()
+        self.results.clear()
+        self.status_label.setText("Forgotten")
+
+
+if __name__ == "__main__":
+    # Benchmark: python content_index.py [pages]
+    # Indexes made-up pages of ~2000 words through the background thread,
+    # then times how long the GUI thread waits on add_text() and on searches.
+    import os
+    import random
+    import statistics
+    import sys
+    import tempfile
+
+    from PyQt5.QtCore import QCoreApplication
+
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = QCoreApplication(sys.argv[:1])
+    rng = random.Random(22)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+                  for _ in range(30000)]
+    # Zipf-ish: a few words are everywhere, most are rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    with tempfile.TemporaryDirectory() as folder:
+        index = ContentIndex(os.path.join(folder, "content.sqlite"))
+        pages = [(f"https://site{number % 300}.example/page{number}",
+                  " ".join(rng.choices(vocabulary, weights, k=6)),
+                  " ".join(rng.choices(vocabulary, weights, k=2000)))
+                 for number in range(page_count)]
+
+        start = time.perf_counter()
+        gui_waits = []
+        for url, title, text in pages:
+            call = time.perf_counter()
+            index.add_text(url, title, text)
+            gui_waits.append(time.perf_counter() - call)
+        index.writes.put(None)
+        index.thread.join()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(folder, "content.sqlite"))
+        print(f"indexed {index.count()} pages in {elapsed:.1f} s ({page_count / elapsed:.0f} pages/s), "
+              f"{size / 1024 / 1024:.0f} MB on disk")
+        print(f"GUI thread per page: median {statistics.median(gui_waits) * 1e6:.0f} µs, "
+              f"worst {max(gui_waits) * 1e6:.0f} µs")
+
+        queries = [vocabulary[0], vocabulary[5], vocabulary[500], vocabulary[20000],
+                   f"{vocabulary[3]} {vocabulary[900]}", vocabulary[1000][:3], "zzzzqq"]
+        for query in queries:
+            times = []
+            for _ in range(5):
+                start = time.perf_counter()
+                results = index.search(query)
+                times.append((time.perf_counter() - start) * 1000)
+            print(f"search {query!r:<24} {len(results):>3} results, median {statistics.median(times):.1f} ms")
+        index.db.close()
@@ -0,0 +1,803 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from PyQt5.QtCore import QObject, QStandardPaths, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QDesktopServices
+from PyQt5.QtWebEngineWidgets import QWebEngineDownloadItem
+from PyQt5.QtWidgets import (
+    QDockWidget, QHBoxLayout, QHeaderView, QLabel, QPushButton, QSpinBox, QTableWidget, QTableWidgetItem,
+    QVBoxLayout, QWidget,
+)
+
+from procstats import format_bytes
+
+
+def unique_path(folder, name):
+    """
+    folder/name, or folder/name (1).ext and so on if that's taken. An empty
+    name.part is created right away to reserve it, so two downloads started
+    back to back can't get the same name.
+    """
+    name = os.path.basename(name) or "download"
+    stem, ext = os.path.splitext(name)
+    path = os.path.join(folder, name)
+    n = 1
+    while True:
+        if not os.path.exists(path):
+            try:
+                open(path + ".part", "xb").close()
+                return path
+            except FileExistsError:
+                pass
+        path = os.path.join(folder, f"{stem} ({n}){ext}")
+        n += 1
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PrivateRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """
+    urllib copies every request header to wherever a redirect goes. This
+    drops the download's private headers (cookies, credentials) when the
+    redirect leaves the site, and asks for the new site's own cookies instead.
+    """
+
+    def __init__(self, download):
+        super().__init__()
+        self.download = download
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new_request = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new_request is None:
+            return None
+        old, new = urllib.parse.urlsplit(req.full_url), urllib.parse.urlsplit(new_request.full_url)
+        if (old.scheme, old.netloc) != (new.scheme, new.netloc):
+            for name in self.download.PRIVATE_HEADERS:
+                new_request.remove_header(name)
+            cookie = self.download.cookies(new_request.full_url) if self.download.cookies else ""
+            if cookie:
+                new_request.add_header("Cookie", cookie)
+        return new_request
+
+
+class Throttle:
+    """
+    Token bucket shared by every segment of every download. 0 means unlimited.
+    """
+
+    def __init__(self, bytes_per_second=0):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.allowance = 0.0
+        self.last = time.monotonic()
+
+    def consume(self, size):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            # At most one second worth of burst
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate) - size
+            self.last = now
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class SegmentedDownload:
+    """
+    Python-side downloader for big files: the file is split into segments
+    fetched in parallel with HTTP range requests, written in place into a
+    preallocated .part file, and the progress is saved to a small JSON state
+    file so a paused or interrupted download continues where it stopped,
+    even after a restart. Servers without range support get one plain stream.
+
+    Runs on its own threads, the GUI just polls `received`/`state`.
+    """
+
+    SEGMENTS = 4
+    # Files smaller than this per segment aren't worth splitting
+    MIN_SEGMENT = 1024 * 1024
+    CHUNK = 64 * 1024
+    SAVE_INTERVAL = 1.0
+    TIMEOUT = 30
+    # Never written to the state file. The cookie is asked for again on
+    # every start instead (see `cookies`).
+    PRIVATE_HEADERS = ("Cookie", "Authorization")
+
+    def __init__(self, url, path, state_path, throttle=None, headers=None):
+        self.url = url
+        self.path = path
+        self.state_path = state_path
+        self.throttle = throttle or Throttle()
+        self.headers = dict(headers or {})
+        self.name = os.path.basename(path)
+        # Optional callable, url -> Cookie header for it (or ""), called on every start
+        self.cookies = None
+
+        self.size = None
+        self.ranges = False
+        self.validator = None
+        # [start, end (inclusive, None if unknown), bytes done]
+        self.segments = []
+        self.state = "paused"
+        self.error = ""
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_save = 0.0
+        self.opener = urllib.request.build_opener(PrivateRedirectHandler(self))
+
+    @property
+    def received(self):
+        return sum(segment[2] for segment in self.segments)
+
+    @property
+    def total(self):
+        return self.size if self.size is not None else -1
+
+    @property
+    def part_path(self):
+        return self.path + ".part"
+
+    # --- Control (GUI thread) ------------------------------------------------
+
+    def start(self):
+        if self.state in ("running", "done"):
+            return
+        if self.thread is not None and self.thread.is_alive():
+            # Still pausing (or cancelling), a second run would write over the first one's file
+            return
+        if self.cookies is not None:
+            cookie = self.cookies(self.url)
+            if cookie:
+                self.headers["Cookie"] = cookie
+            else:
+                self.headers.pop("Cookie", None)
+        self.stop_event.clear()
+        self.state = "running"
+        self.error = ""
+        self.thread = threading.Thread(target=self.run, name=f"download-{self.name}", daemon=True)
+        self.thread.start()
+
+    def pause(self):
+        if self.state == "running":
+            # Becomes "paused" once the threads have actually stopped
+            self.state = "pausing"
+            self.stop_event.set()
+
+    def resume(self):
+        self.start()
+
+    def cancel(self):
+        # A running download removes its files itself once its threads stop
+        with self.lock:
+            self.state = "cancelled"
+        self.stop_event.set()
+        self.remove_files()
+
+    def remove_files(self):
+        remove_file(self.part_path)
+        remove_file(self.state_path)
+
+    # --- State file ------------------------------------------------------------
+
+    def save_state(self):
+        state = {
+            "url": self.url, "path": self.path, "size": self.size, "ranges": self.ranges,
+            "validator": self.validator, "segments": self.segments,
+            "headers": {name: value for name, value in self.headers.items() if name not in self.PRIVATE_HEADERS},
+        }
+        temp_path = self.state_path + ".tmp"
+        with self.lock:
+            with open(temp_path, "w", encoding="utf-8") as state_file:
+                json.dump(state, state_file)
+            os.replace(temp_path, self.state_path)
+        self.last_save = time.monotonic()
+
+    @classmethod
+    def from_state(cls, state_path, throttle=None):
+        with open(state_path, encoding="utf-8") as state_file:
+            state = json.load(state_file)
+        headers = {name: value for name, value in (state.get("headers") or {}).items()
+                   if name not in cls.PRIVATE_HEADERS}
+        download = cls(state["url"], state["path"], state_path, throttle, headers)
+        download.size = state["size"]
+        download.ranges = state["ranges"]
+        download.validator = state["validator"]
+        download.segments = [list(segment) for segment in state["segments"]]
+        return download
+
+    # --- Worker threads ----------------------------------------------------------
+
+    def request(self, extra_headers=None):
+        headers = dict(self.headers)
+        headers.update(extra_headers or {})
+        return self.opener.open(urllib.request.Request(self.url, headers=headers), timeout=self.TIMEOUT)
+
+    def probe(self):
+        """
+        Finds out the size and whether ranges work, with a one byte range request.
+        """
+        with self.request({"Range": "bytes=0-0"}) as response:
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+            if response.status == 206 and "/" in response.headers.get("Content-Range", ""):
+                total = response.headers["Content-Range"].rsplit("/", 1)[1]
+                return (int(total) if total.isdigit() else None), True, validator
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), False, validator
+
+    def plan(self):
+        size, ranges, validator = self.probe()
+        if self.segments and ranges and self.ranges and size == self.size and validator == self.validator:
+            return  # Carry on with the saved segments
+        # First start, or the file changed on the server: start over
+        self.size, self.ranges, self.validator = size, ranges, validator
+        if ranges and size:
+            count = max(1, min(self.SEGMENTS, size // self.MIN_SEGMENT))
+            step = size // count
+            self.segments = [[i * step, (size - 1 if i == count - 1 else (i + 1) * step - 1), 0]
+                             for i in range(count)]
+        else:
+            self.segments = [[0, size - 1 if size else None, 0]]
+        self.preallocate()
+
+    def preallocate(self):
+        # Reserving the whole file up front avoids fragmentation and
+        # lets every segment write straight into its own place.
+        with open(self.part_path, "wb") as part_file:
+            if self.size:
+                if hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(part_file.fileno(), 0, self.size)
+                        return
+                    except OSError:
+                        pass
+                part_file.truncate(self.size)
+
+    def run(self):
+        try:
+            self.plan()
+            if not os.path.exists(self.part_path):
+                self.preallocate()
+            self.save_state()
+            errors = []
+            workers = [threading.Thread(target=self.fetch_segment, args=(segment, errors), daemon=True)
+                       for segment in self.segments if not self.segment_done(segment)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            if self.state == "cancelled":
+                self.remove_files()
+                return
+            self.save_state()
+            if errors:
+                raise errors[0]
+            if self.stop_event.is_set():
+                with self.lock:
+                    if self.state == "pausing":
+                        self.state = "paused"
+                return
+            os.replace(self.part_path, self.path)
+            os.remove(self.state_path)
+            self.state = "done"
+        except (OSError, ValueError, urllib.error.URLError) as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"Warning: download of {self.url} failed: {e}")
+
+    def segment_done(self, segment):
+        start, end, done = segment
+        return end is not None and start + done > end
+
+    def fetch_segment(self, segment, errors):
+        start, end, _ = segment
+        headers = {}
+        if self.ranges:
+            headers["Range"] = f"bytes={start + segment[2]}-{end}"
+            if self.validator:
+                # Makes the server send the whole file (200) if it changed since
+                headers["If-Range"] = self.validator
+        else:
+            segment[2] = 0  # No way to continue a plain stream, start it over
+        try:
+            with self.request(headers) as response, open(self.part_path, "r+b") as part_file:
+                if self.ranges and response.status != 206:
+                    raise ValueError("the file changed on the server, start the download again")
+                part_file.seek(start + segment[2])
+                while not self.stop_event.is_set():
+                    chunk = response.read(self.CHUNK)
+                    if not chunk:
+                        break
+                    self.throttle.consume(len(chunk))
+                    part_file.write(chunk)
+                    with self.lock:
+                        segment[2] += len(chunk)
+                    if time.monotonic() - self.last_save > self.SAVE_INTERVAL:
+                        part_file.flush()
+                        self.save_state()
+                if end is None and not self.stop_event.is_set():
+                    # Size wasn't known up front, now it is
+                    segment[1] = start + segment[2] - 1
+                    self.size = segment[2]
+                elif not self.stop_event.is_set() and not self.segment_done(segment):
+                    raise ValueError("the connection closed before the download finished")
+        except (OSError, ValueError, urllib.error.URLError) as e:
+            self.stop_event.set()
+            errors.append(e)
+
+
+class BrowserDownload:
+    """
+    A QWebEngineDownloadItem with the same interface as SegmentedDownload, so the panel treats both alike.
+    """
+
+    STATES = {
+        QWebEngineDownloadItem.DownloadRequested: "queued",
+        QWebEngineDownloadItem.DownloadInProgress: "running",
+        QWebEngineDownloadItem.DownloadCompleted: "done",
+        QWebEngineDownloadItem.DownloadCancelled: "cancelled",
+        QWebEngineDownloadItem.DownloadInterrupted: "failed",
+    }
+
+    def __init__(self, item):
+        self.item = item
+        self.path = item.path()
+        self.name = os.path.basename(self.path)
+
+    @property
+    def received(self):
+        return self.item.receivedBytes()
+
+    @property
+    def total(self):
+        return self.item.totalBytes()
+
+    @property
+    def state(self):
+        if self.item.isPaused():
+            return "paused"
+        return self.STATES.get(self.item.state(), "failed")
+
+    @property
+    def error(self):
+        return self.item.interruptReasonString() if self.state == "failed" else ""
+
+    def pause(self):
+        self.item.pause()
+
+    def resume(self):
+        self.item.resume()
+
+    def cancel(self):
+        self.item.cancel()
+
+
+class DownloadManager(QObject):
+    """
+    Takes every download from the profile. Plain http(s) downloads are
+    handed to SegmentedDownload (when `segmented` is on), everything else
+    (blob: and data: URLs, saved pages...) stays with QtWebEngine.
+    """
+
+    downloadAdded = pyqtSignal(object)
+    updated = pyqtSignal()
+
+    TICK_MS = 1000
+
+    def __init__(self, profile, state_dir, segmented=True, throttle_kbps=0, parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.state_dir = state_dir
+        self.segmented = segmented
+        self.throttle = Throttle(throttle_kbps * 1024)
+        self.downloads = []
+        # Cookies are copied over so logged-in downloads keep working outside the browser
+        self.cookies = {}
+        # Optional callable that gets first look at every download and returns
+        # True if it took it (offline snapshots, see offline_cache.py)
+        self.take_download = None
+        os.makedirs(state_dir, exist_ok=True)
+
+        profile.downloadRequested.connect(self.download_requested)
+        cookie_store = profile.cookieStore()
+        cookie_store.cookieAdded.connect(self.cookie_added)
+        cookie_store.cookieRemoved.connect(self.cookie_removed)
+        cookie_store.loadAllCookies()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.TICK_MS)
+        self.timer.timeout.connect(self.tick)
+        self.last_tick = time.monotonic()
+
+        # Downloads that were still going when the browser closed
+        for state_path in glob.glob(os.path.join(state_dir, "*.json")):
+            try:
+                download = SegmentedDownload.from_state(state_path, self.throttle)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: couldn't read download state {state_path}: {e}")
+                continue
+            download.cookies = self.segment_cookies
+            self.add(download)
+
+    @staticmethod
+    def download_folder():
+        folder = QStandardPaths.writableLocation(QStandardPaths.DownloadLocation)
+        return folder or os.path.expanduser("~")
+
+    def set_throttle(self, kbps):
+        self.throttle.rate = kbps * 1024
+
+    def cookie_added(self, cookie):
+        key = (bytes(cookie.domain().encode()), bytes(cookie.name()), bytes(cookie.path().encode()))
+        self.cookies[key] = cookie
+
+    def cookie_removed(self, cookie):
+        key = (bytes(cookie.domain().encode()), bytes(cookie.name()), bytes(cookie.path().encode()))
+        self.cookies.pop(key, None)
+
+    def cookie_header(self, qurl):
+        host = qurl.host()
+        path = qurl.path() or "/"
+        secure = qurl.scheme() == "https"
+        pairs = []
+        # Also called from download threads (redirects), so it works on a copy
+        for cookie in list(self.cookies.values()):
+            domain = cookie.domain().lstrip(".")
+            if not (host == domain or host.endswith("." + domain)):
+                continue
+            if not path.startswith(cookie.path() or "/") or (cookie.isSecure() and not secure):
+                continue
+            pairs.append(bytes(cookie.name()).decode(errors="replace") + "="
+                         + bytes(cookie.value()).decode(errors="replace"))
+        return "; ".join(pairs)
+
+    def segment_cookies(self, url):
+        return self.cookie_header(QUrl(url))
+
+    def download_requested(self, item):
+        if self.take_download and self.take_download(item):
+            return
+        name = item.downloadFileName() if hasattr(item, "downloadFileName") else os.path.basename(item.path())
+        path = unique_path(self.download_folder(), name)
+        url = item.url()
+        if (self.segmented and url.scheme() in ("http", "https")
+                and item.savePageFormat() == QWebEngineDownloadItem.UnknownSaveFormat):
+            headers = {"User-Agent": self.profile.httpUserAgent()}
+            state_path = os.path.join(self.state_dir, hashlib.sha1(path.encode()).hexdigest() + ".json")
+            item.cancel()
+            download = SegmentedDownload(url.toString(QUrl.FullyEncoded), path, state_path, self.throttle, headers)
+            download.cookies = self.segment_cookies
+            self.add(download)
+            download.start()
+        else:
+            if item.savePageFormat() == QWebEngineDownloadItem.UnknownSaveFormat:
+                item.setDownloadDirectory(os.path.dirname(path))
+                item.setDownloadFileName(os.path.basename(path))
+            # QtWebEngine writes the file itself, the .part only held the name until it's done
+            item.finished.connect(lambda: remove_file(path + ".part"))
+            item.accept()
+            self.add(BrowserDownload(item))
+
+    def add(self, download):
+        download.speed = 0
+        download.last_received = download.received
+        self.downloads.append(download)
+        self.timer.start()
+        self.downloadAdded.emit(download)
+        self.updated.emit()
+
+    def remove_finished(self):
+        self.downloads = [d for d in self.downloads if d.state in ("running", "pausing", "paused", "queued")]
+        self.updated.emit()
+
+    def tick(self):
+        now = time.monotonic()
+        elapsed = max(now - self.last_tick, 0.001)
+        self.last_tick = now
+        active = False
+        for download in self.downloads:
+            received = download.received
+            download.speed = max(received - download.last_received, 0) / elapsed
+            download.last_received = received
+            active = active or download.state in ("running", "pausing", "queued")
+        if not active:
+            self.timer.stop()
+        self.updated.emit()
+
+    def close(self):
+        # Segmented downloads get paused and saved, they're resumed from the panel next time
+        for download in self.downloads:
+            if isinstance(download, SegmentedDownload) and download.state in ("running", "pausing"):
+                download.pause()
+                download.thread.join(timeout=2)
+
+
+class DownloadsPanel(QDockWidget):
+    """
+    Dockable list of downloads with live progress and speed.
+    """
+
+    COLUMNS = ("File", "Progress", "Speed", "Status")
+
+    def __init__(self, manager, parent=None):
+        super().__init__("Downloads", parent)
+        self.manager = manager
+        self.setObjectName("downloads_panel")
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().hide()
+
+        controls = QHBoxLayout()
+        self.pause_btn = QPushButton("Pause/Resume")
+        self.cancel_btn = QPushButton("Cancel")
+        self.clear_btn = QPushButton("Clear finished")
+        self.folder_btn = QPushButton("Open folder")
+        self.throttle_spin = QSpinBox()
+        self.throttle_spin.setRange(0, 1000000)
+        self.throttle_spin.setSingleStep(256)
+        self.throttle_spin.setSuffix(" KB/s")
+        self.throttle_spin.setSpecialValueText("No limit")
+        self.throttle_spin.setValue(int(manager.throttle.rate // 1024))
+        controls.addWidget(self.pause_btn)
+        controls.addWidget(self.cancel_btn)
+        controls.addWidget(self.clear_btn)
+        controls.addWidget(self.folder_btn)
+        controls.addStretch(1)
+        controls.addWidget(QLabel("Limit:"))
+        controls.addWidget(self.throttle_spin)
+
+        layout.addWidget(self.table)
+        layout.addLayout(controls)
+        self.setWidget(container)
+
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        self.cancel_btn.clicked.connect(self.cancel_selected)
+        self.clear_btn.clicked.connect(manager.remove_finished)
+        self.folder_btn.clicked.connect(
+            lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(manager.download_folder()))
+        )
+        self.throttle_spin.valueChanged.connect(manager.set_throttle)
+        manager.updated.connect(self.refresh)
+        manager.downloadAdded.connect(lambda download: self.show())
+
+    def selected(self):
+        rows = {index.row() for index in self.table.selectedIndexes()}
+        return [self.manager.downloads[row] for row in sorted(rows) if row < len(self.manager.downloads)]
+
+    def toggle_pause(self):
+        for download in self.selected():
+            if download.state == "paused" or download.state == "failed":
+                download.resume()
+            elif download.state == "running":
+                download.pause()
+        self.manager.timer.start()
+        self.refresh()
+
+    def cancel_selected(self):
+        for download in self.selected():
+            download.cancel()
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        downloads = self.manager.downloads
+        self.table.setRowCount(len(downloads))
+        for row, download in enumerate(downloads):
+            total = download.total
+            if total > 0:
+                progress = f"{download.received * 100 // total}% of {format_bytes(total)}"
+            else:
+                progress = format_bytes(download.received)
+            speed = f"{format_bytes(download.speed)}/s" if download.state == "running" else ""
+            status = download.state + (f": {download.error}" if download.error else "")
+            for column, text in enumerate((download.name, progress, speed, status)):
+                item = QTableWidgetItem(text)
+                if column == 0:
+                    item.setToolTip(download.path)
+                self.table.setItem(row, column, item)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+
+if __name__ == "__main__":
+    # Self-test: python downloads.py
+    # Runs SegmentedDownload against a local HTTP server that supports range
+    # requests (and one that doesn't), including pausing, resuming from the
+    # state file, a file changing on the server and throttling.
+    import re
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    DATA = os.urandom(6 * 1024 * 1024 + 123)
+    served = {"data": DATA, "ranges": True, "delay": 0.0, "cookies": []}
+
+    class RangeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            served["cookies"].append((self.headers.get("Host", "").split(":")[0], self.headers.get("Cookie")))
+            if self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", f"http://localhost:{self.server.server_address[1]}/file.bin")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = served["data"]
+            etag = '"%s"' % hashlib.md5(data).hexdigest()
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if_range = self.headers.get("If-Range")
+            if served["ranges"] and match and (if_range is None or if_range == etag):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else len(data) - 1
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            else:
+                start, end = 0, len(data) - 1
+                self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            try:
+                for offset in range(start, end + 1, 65536):
+                    self.wfile.write(data[offset:min(offset + 65536, end + 1)])
+                    time.sleep(served["delay"])
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client paused or cancelled
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+    results = []
+
+    def check(name, condition):
+        results.append(condition)
+        print(f"{'ok  ' if condition else 'FAIL'} {name}")
+
+    def wait(download, timeout=60):
+        deadline = time.monotonic() + timeout
+        while download.thread.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def read(path):
+        with open(path, "rb") as result_file:
+            return result_file.read()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Plain segmented download
+        path = os.path.join(folder, "a.bin")
+        download = SegmentedDownload(url, path, path + ".json")
+        start = time.perf_counter()
+        download.start()
+        wait(download)
+        check(f"segmented download ({len(download.segments)} segments, "
+              f"{time.perf_counter() - start:.2f} s)", download.state == "done" and read(path) == DATA)
+        check("state file removed", not os.path.exists(path + ".json"))
+
+        # Pause, then resume from the state file in a "new session"
+        served["delay"] = 0.05
+        path = os.path.join(folder, "b.bin")
+        download = SegmentedDownload(url, path, path + ".json")
+        download.start()
+        time.sleep(0.5)
+        download.pause()
+        wait(download)
+        paused_at = download.received
+        check(f"paused part way ({paused_at} bytes)", 0 < paused_at < len(DATA) and os.path.exists(path + ".json"))
+        served["delay"] = 0.0
+        download = SegmentedDownload.from_state(path + ".json")
+        check("progress restored from the state file", download.received == paused_at)
+        download.start()
+        wait(download)
+        check("resumed download complete", download.state == "done" and read(path) == DATA)
+
+        # Pausing and resuming straight away mustn't start a second run on top of the first
+        served["delay"] = 0.05
+        path = os.path.join(folder, "g.bin")
+        download = SegmentedDownload(url, path, path + ".json", headers={"Cookie": "session=secret"})
+        download.start()
+        time.sleep(0.3)
+        download.pause()
+        first_run = download.thread
+        download.resume()
+        check("resume while pausing is ignored", download.thread is first_run and download.state == "pausing")
+        wait(download)
+        check("paused once the threads stopped", download.state == "paused")
+        with open(path + ".json", encoding="utf-8") as state_file:
+            check("cookie not written to the state file", "secret" not in state_file.read())
+        served["delay"] = 0.0
+        download.resume()
+        wait(download)
+        check("pause/resume download complete", download.state == "done" and read(path) == DATA
+              and download.received == len(DATA))
+
+        # The file changes on the server between pause and resume
+        served["delay"] = 0.05
+        path = os.path.join(folder, "c.bin")
+        download = SegmentedDownload(url, path, path + ".json")
+        download.start()
+        time.sleep(0.3)
+        download.pause()
+        wait(download)
+        served["delay"] = 0.0
+        served["data"] = DATA[::-1]
+        download = SegmentedDownload.from_state(path + ".json")
+        download.start()
+        wait(download)
+        check("changed file downloaded again from scratch", download.state == "done" and read(path) == DATA[::-1])
+        served["data"] = DATA
+
+        # Redirected to another host: that host gets its own cookie, not ours
+        path = os.path.join(folder, "h.bin")
+        download = SegmentedDownload(url.replace("file.bin", "redirect"), path, path + ".json")
+        download.cookies = lambda target: "session=SECRET" if "127.0.0.1" in target else "other=1"
+        served["cookies"].clear()
+        download.start()
+        wait(download)
+        elsewhere = [cookie for host, cookie in served["cookies"] if host == "localhost"]
+        check("redirect to another host", download.state == "done" and read(path) == DATA and elsewhere
+              and all(cookie == "other=1" for cookie in elsewhere))
+
+        # Names are reserved as soon as they're handed out
+        first = unique_path(folder, "same.bin")
+        second = unique_path(folder, "same.bin")
+        check("back to back downloads get different names", first != second and os.path.exists(first + ".part"))
+
+        # A server without range support
+        served["ranges"] = False
+        path = os.path.join(folder, "d.bin")
+        download = SegmentedDownload(url, path, path + ".json")
+        download.start()
+        wait(download)
+        check("server without ranges", download.state == "done" and len(download.segments) == 1
+              and read(path) == DATA)
+        served["ranges"] = True
+
+        # Throttled to 2 MB/s, 6 MB should take about 2-3 s (the first second is a burst)
+        path = os.path.join(folder, "e.bin")
+        download = SegmentedDownload(url, path, path + ".json", Throttle(2 * 1024 * 1024))
+        start = time.perf_counter()
+        download.start()
+        wait(download)
+        elapsed = time.perf_counter() - start
+        check(f"throttled to 2 MB/s ({elapsed:.1f} s)", download.state == "done" and elapsed > 2)
+
+        # Cancelling removes the partial file
+        served["delay"] = 0.05
+        path = os.path.join(folder, "f.bin")
+        download = SegmentedDownload(url, path, path + ".json")
+        download.start()
+        time.sleep(0.2)
+        download.cancel()
+        wait(download)
+        check("cancel cleans up", not os.path.exists(path + ".part") and not os.path.exists(path + ".json"))
+
+    server.shutdown()
+    print(f"{sum(results)}/{len(results)} checks passed")
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QIcon, QPixmap
+
+ICON_SIZE = 32
+
+
+def site_key(url):
+    """
+    Icons are remembered per host, so every page of a site (and every tab,
+    history entry and bookmark on it) shares one.
+    """
+    if not isinstance(url, QUrl):
+        url = QUrl(url)
+    return url.host().lower()
+
+
+class FaviconStore(QObject):
+    """
+    Site icons that outlive the pages they came from. QtWebEngine fetches
+    the favicon in the background and tells us through iconChanged, we keep
+    it on disk under the hash of its PNG (so sites sharing an icon share the
+    file) with a small host -> hash index next to it. Decoded QIcons are
+    kept in memory for the most recently used icons.
+
+    On restart the tabs get their icon straight from here instead of
+    waiting for each page to load.
+    """
+
+    # Sent with the host whenever it gets a new icon, so other tabs on it can update
+    iconStored = pyqtSignal(str)
+
+    MEMORY_ICONS = 256
+    # Hosts remembered at most, the least recently stored ones are forgotten
+    MAX_HOSTS = 5000
+
+    def __init__(self, folder, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, "index.json")
+        self.index = OrderedDict()
+        self.memory = OrderedDict()
+        self.load_index()
+
+        # The index is small but still written at most every couple of seconds
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(2000)
+        self.save_timer.timeout.connect(self.save_index)
+
+    def load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as index_file:
+                self.index.update(json.load(index_file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: couldn't read the favicon index: {e}")
+
+    def save_index(self):
+        self.save_timer.stop()
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump(self.index, index_file)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: couldn't save the favicon index: {e}")
+
+    def path(self, digest):
+        return os.path.join(self.folder, digest + ".png")
+
+    def icon(self, url):
+        """
+        The cached icon for the URL's site, or a null QIcon if there isn't one.
+        """
+        digest = self.index.get(site_key(url))
+        if digest is None:
+            return QIcon()
+        icon = self.memory.get(digest)
+        if icon is not None:
+            self.memory.move_to_end(digest)
+            return icon
+        pixmap = QPixmap(self.path(digest))
+        if pixmap.isNull():
+            return QIcon()
+        icon = QIcon(pixmap)
+        self.remember(digest, icon)
+        return icon
+
+    def store(self, url, icon):
+        host = site_key(url)
+        if not host or icon.isNull():
+            return
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        icon.pixmap(ICON_SIZE, ICON_SIZE).save(buffer, "PNG")
+        data = bytes(data)
+        digest = hashlib.sha1(data).hexdigest()
+        if self.index.get(host) == digest:
+            return  # Same icon as last time, which is almost always the case
+
+        path = self.path(digest)
+        if not os.path.exists(path):
+            try:
+                with open(path, "wb") as icon_file:
+                    icon_file.write(data)
+            except OSError as e:
+                print(f"Warning: couldn't save a favicon: {e}")
+                return
+        self.index.pop(host, None)
+        self.index[host] = digest
+        while len(self.index) > self.MAX_HOSTS:
+            self.index.popitem(last=False)
+        self.remember(digest, icon)
+        self.save_timer.start()
+        self.iconStored.emit(host)
+
+    def remember(self, digest, icon):
+        self.memory[digest] = icon
+        self.memory.move_to_end(digest)
+        while len(self.memory) > self.MEMORY_ICONS:
+            self.memory.popitem(last=False)
+
+    def prune(self):
+        # Icons no host points at anymore (the site changed it, or was forgotten)
+        used = set(self.index.values())
+        for entry in os.scandir(self.folder):
+            name, ext = os.path.splitext(entry.name)
+            if ext == ".png" and name not in used:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def close(self):
+        if self.save_timer.isActive():
+            self.save_index()
+        self.prune()
+
+
+if __name__ == "__main__":
+    # Rough check of what a restart costs: 2000 sites sharing 50 icons
+    import sys
+    import tempfile
+    import time
+
+    from PyQt5.QtGui import QColor
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as folder:
+        store = FaviconStore(folder)
+        icons = []
+        for number in range(50):
+            pixmap = QPixmap(ICON_SIZE, ICON_SIZE)
+            pixmap.fill(QColor.fromHsv(number * 7, 200, 200))
+            icons.append(QIcon(pixmap))
+        start = time.perf_counter()
+        for number in range(2000):
+            store.store(f"https://site{number}.example/page", icons[number % 50])
+        store.close()
+        print(f"stored 2000 sites in {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"{len(os.listdir(folder)) - 1} icon files")
+
+        start = time.perf_counter()
+        store = FaviconStore(folder)
+        found = sum(not store.icon(f"https://site{number}.example/").isNull() for number in range(2000))
+        print(f"after restart: {found} icons found in {(time.perf_counter() - start) * 1000:.0f} ms")
+        start = time.perf_counter()
+        for number in range(2000):
+            store.icon(f"https://site{number}.example/")
+        print(f"again from memory: {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,295 @@
+# Headless batch mode: loads a list of URLs without the browser window and
+# writes one JSON line per URL (load time, status, title, optional
+# screenshot and PDF). Meant for smoke-loading pages in CI:
+#
+#   python headless.py urls.txt --concurrency 8 --screenshots shots/ --pdf pdfs/
+#
+# URLs come from a file (or - for stdin), one per line, # starts a comment.
+# The exit code is 1 if any page didn't load. QtWebEngine doesn't tell us
+# the HTTP status code, so "status" is ok/failed/timeout/crashed.
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# No window is ever shown, so don't require a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QObject, QTimer, QUrl
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile, QWebEngineView
+from PyQt5.QtWidgets import QApplication
+
+import process_model
+from main import CustomWebEnginePage
+
+
+def read_urls(path):
+    lines = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with lines:
+        for line in lines:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield QUrl.fromUserInput(line)
+
+
+def capture_name(number, url, ext):
+    host = re.sub(r"[^\w.-]", "_", url.host() or "page")
+    return f"{number:04d}-{host}.{ext}"
+
+
+class PageSlot:
+    """
+    One view + page from the pool. Reused for URL after URL, which saves
+    creating a page (and often a renderer) for each one.
+
+    Signals from a job that was given up on (a stopped load, a PDF that took
+    too long) can still come in once the next job has started. Every job
+    gets a new generation number, and a signal only counts if it belongs to
+    the current one.
+    """
+
+    def __init__(self, runner, profile):
+        self.runner = runner
+        self.view = QWebEngineView()
+        self.page = CustomWebEnginePage(self.view, profile=profile)
+        self.view.setPage(self.page)
+        self.view.resize(runner.width, runner.height)
+        # Only shown on the offscreen platform, but it has to be "visible" to render
+        self.view.show()
+
+        self.job = None
+        self.generation = 0
+        self.loading = None  # Generation of the load the page is on, once it has started
+        self.printing = None  # (generation, path) of the PDF being printed
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.timed_out)
+        self.page.loadStarted.connect(self.load_started)
+        self.page.loadFinished.connect(self.load_finished)
+        self.page.renderProcessTerminated.connect(self.crashed)
+        self.page.pdfPrintingFinished.connect(self.pdf_finished)
+
+    def start(self, number, url):
+        self.job = {"number": number, "url": url.toString(), "status": None, "load_ms": None,
+                    "title": "", "final_url": "", "screenshot": None, "pdf": None}
+        self.generation += 1
+        self.loading = None
+        self.printing = None
+        self.started = time.perf_counter()
+        self.timer.start(int(self.runner.timeout * 1000))
+        self.page.load(url)
+
+    def load_started(self):
+        # The page finishes (or aborts) the last load before it starts the next one
+        self.loading = self.generation
+
+    def load_finished(self, success):
+        if self.job is None or self.loading != self.generation or self.job["status"] is not None:
+            return  # A late loadFinished from an earlier load
+        self.timer.stop()
+        self.job["load_ms"] = round((time.perf_counter() - self.started) * 1000)
+        self.job["status"] = "ok" if success else "failed"
+        self.job["title"] = self.page.title()
+        self.job["final_url"] = self.page.url().toString()
+        if success and (self.runner.screenshots or self.runner.pdf):
+            # Give the compositor a moment to put the first frame together
+            generation = self.generation
+            QTimer.singleShot(self.runner.capture_delay_ms, lambda: self.capture(generation))
+        else:
+            self.finish()
+
+    def timed_out(self):
+        if self.job is None:
+            return
+        if self.job["status"] is None:
+            self.page.triggerAction(QWebEnginePage.Stop)
+            self.job["status"] = "timeout"
+            self.job["load_ms"] = round(self.runner.timeout * 1000)
+        # Otherwise the PDF never came back, report the page without it
+        self.finish()
+
+    def crashed(self, termination_status, exit_code):
+        if self.job is not None and self.loading == self.generation and self.job["status"] is None:
+            self.timer.stop()
+            self.job["status"] = "crashed"
+            self.finish()
+
+    def capture(self, generation):
+        if self.job is None or generation != self.generation:
+            return  # The job ended (crashed) while waiting for the first frame
+        url = QUrl(self.job["url"])
+        if self.runner.screenshots:
+            path = os.path.join(self.runner.screenshots, capture_name(self.job["number"], url, "png"))
+            if self.view.grab().save(path):
+                self.job["screenshot"] = path
+        if self.runner.pdf:
+            path = os.path.join(self.runner.pdf, capture_name(self.job["number"], url, "pdf"))
+            self.timer.start(int(self.runner.timeout * 1000))
+            self.printing = (self.generation, path)
+            self.page.printToPdf(path)  # finish() once pdfPrintingFinished comes in
+        else:
+            self.finish()
+
+    def pdf_finished(self, path, success):
+        if self.job is not None and self.printing == (self.generation, path):
+            self.timer.stop()
+            self.job["pdf"] = path if success else None
+            self.finish()
+
+    def finish(self):
+        job, self.job = self.job, None
+        if job is not None:
+            self.runner.job_finished(self, job)
+
+
+class HeadlessRunner(QObject):
+    """
+    Loads URLs through a fixed pool of pages, starting the next URL as soon as a page is free.
+    """
+
+    def __init__(self, urls, concurrency=4, timeout=30.0, screenshots=None, pdf=None,
+                 width=1280, height=800, output=sys.stdout, profile=None):
+        super().__init__()
+        self.urls = iter(enumerate(urls, 1))
+        self.timeout = timeout
+        self.screenshots = screenshots
+        self.pdf = pdf
+        self.width = width
+        self.height = height
+        self.capture_delay_ms = 300
+        self.output = output
+        self.results = []
+        for folder in (screenshots, pdf):
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+        # A throwaway in-memory profile unless one is given, so runs don't affect each other
+        self.profile = profile or QWebEngineProfile()
+        self.slots = [PageSlot(self, self.profile) for _ in range(max(1, concurrency))]
+        self.running = 0
+        self.finished = False
+
+    def start(self):
+        self.started = time.perf_counter()
+        for slot in self.slots:
+            self.start_next(slot)
+        if not self.running:
+            self.done()
+
+    def start_next(self, slot):
+        try:
+            number, url = next(self.urls)
+        except StopIteration:
+            return False
+        self.running += 1
+        slot.start(number, url)
+        return True
+
+    def job_finished(self, slot, job):
+        self.running -= 1
+        self.results.append(job)
+        self.output.write(json.dumps(job) + "\n")
+        self.output.flush()
+        # Next URL from an event loop turn so the page is done with the last one
+        QTimer.singleShot(0, lambda: self.start_next(slot) or self.running or self.done())
+
+    def done(self):
+        if self.finished:
+            return  # Several pages can finish in the same event loop turn
+        self.finished = True
+        elapsed = time.perf_counter() - self.started
+        failed = sum(1 for job in self.results if job["status"] != "ok")
+        rate = len(self.results) / elapsed if elapsed else 0
+        print(f"{len(self.results)} pages, {failed} failed, {elapsed:.1f} s ({rate:.1f} pages/s) "
+              f"with {len(self.slots)} at a time", file=sys.stderr)
+        QApplication.instance().exit(1 if failed else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load URLs headlessly and report how it went.")
+    parser.add_argument("urls", help="file with one URL per line, or - for stdin")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="pages loading at once (default 4)")
+    parser.add_argument("-t", "--timeout", type=float, default=30, help="seconds before a page counts as timed out")
+    parser.add_argument("-o", "--output", help="write the JSON lines here instead of stdout")
+    parser.add_argument("--screenshots", metavar="DIR", help="save a PNG of every page that loaded")
+    parser.add_argument("--pdf", metavar="DIR", help="print every page that loaded to PDF")
+    parser.add_argument("--size", default="1280x800", help="viewport size (default 1280x800)")
+    # The process model options from main.py work here too (--renderer-limit=4 ...)
+    argv, process_options = process_model.parse_args(sys.argv[1:], process_model.DEFAULT_OPTIONS)
+    process_model.apply(process_options)
+    args = parser.parse_args(argv)
+
+    width, _, height = args.size.partition("x")
+    app = QApplication(sys.argv[:1])
+    app.setApplicationName("Lovely Browser")
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    runner = HeadlessRunner(
+        list(read_urls(args.urls)), args.concurrency, args.timeout, args.screenshots, args.pdf,
+        int(width), int(height), output,
+    )
+    QTimer.singleShot(0, runner.start)
+    code = app.exec_()
+    if output is not sys.stdout:
+        output.close()
+    sys.exit(code)
+
+
+def self_test():
+    """
+    Plays the signals of two jobs on one slot by hand, without running the
+    event loop, so nothing real comes in between: the first job's PDF times
+    out and its pdfPrintingFinished (and a stray loadFinished) only arrive
+    once the second job has started.
+    """
+    import io
+    import tempfile
+
+    app = QApplication(sys.argv[:1])
+    checks = []
+
+    def check(name, passed):
+        checks.append(passed)
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        urls = [QUrl("https://first.example/"), QUrl("https://second.example/")]
+        runner = HeadlessRunner(urls, concurrency=1, timeout=5, pdf=folder, output=io.StringIO())
+        slot = runner.slots[0]
+
+        runner.start_next(slot)
+        slot.page.loadStarted.emit()
+        slot.page.loadFinished.emit(True)
+        slot.capture(slot.generation)
+        first_pdf = slot.printing[1]
+        slot.timed_out()  # The PDF never came back
+        check("first job finishes without its PDF",
+              len(runner.results) == 1 and runner.results[0]["status"] == "ok" and runner.results[0]["pdf"] is None)
+
+        runner.start_next(slot)
+        slot.page.loadFinished.emit(False)  # The first page again, before the second load starts
+        slot.page.pdfPrintingFinished.emit(first_pdf, True)
+        check("late signals from the first job are ignored", slot.job is not None and len(runner.results) == 1)
+
+        slot.page.loadStarted.emit()
+        slot.page.pdfPrintingFinished.emit(first_pdf, True)
+        check("a late PDF doesn't finish the second job once it's loading", slot.job is not None)
+        slot.page.loadFinished.emit(True)
+        slot.capture(slot.generation)
+        slot.page.pdfPrintingFinished.emit(slot.printing[1], True)
+        second = runner.results[-1]
+        check("second job gets its own PDF", len(runner.results) == 2 and second["status"] == "ok"
+              and second["pdf"] is not None and second["pdf"] != first_pdf)
+        slot.timer.stop()
+
+    del app
+    print(f"{sum(checks)}/{len(checks)} checks passed")
+    return all(checks)
+
+
+if __name__ == "__main__":
+    # python headless.py --self-test checks that late signals don't leak into the next job
+    if sys.argv[1:] == ["--self-test"]:
+        sys.exit(0 if self_test() else 1)
+    main()
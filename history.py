@@ -0,0 +1,506 @@
+import bisect
+import heapq
+import queue
+import re
+import sqlite3
+import threading
+import time
+from operator import attrgetter, itemgetter
+
+from PyQt5.QtCore import QModelIndex, QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+from PyQt5.QtWidgets import QCompleter
+
+
+# (max age in days, weight) - recent visits count for a lot more, like Firefox's frecency
+RECENCY_WEIGHTS = ((4, 100), (14, 70), (31, 50), (90, 30), (float("inf"), 10))
+
+WORD_RE = re.compile(r"\w+")
+
+
+def frecency(visit_count, last_visit, now=None):
+    age_days = ((now or time.time()) - last_visit) / 86400
+    for max_age, weight in RECENCY_WEIGHTS:
+        if age_days <= max_age:
+            return visit_count * weight
+    return visit_count
+
+
+def url_key(text):
+    """
+    What people actually type: "github.com/..." rather than "https://www.github.com/...".
+    """
+    text = text.lower()
+    for prefix in ("https://", "http://"):
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    if text.startswith("www."):
+        text = text[4:]
+    return text
+
+
+class HistoryEntry:
+    __slots__ = ("url", "title", "visit_count", "last_visit", "score")
+
+    def __init__(self, url, title, visit_count=0, last_visit=0.0):
+        self.url = url
+        self.title = title
+        self.visit_count = visit_count
+        self.last_visit = last_visit
+        self.update_score()
+
+    def update_score(self):
+        # Worked out when the entry changes rather than on every keystroke
+        self.score = frecency(self.visit_count, self.last_visit)
+
+    def words(self):
+        host = url_key(self.url).split("/", 1)[0]
+        return set(WORD_RE.findall(self.title.lower())) | set(WORD_RE.findall(host))
+
+
+class HistoryIndex:
+    """
+    In-memory index for the URL bar suggestions.
+
+    Two sorted lists are searched with bisect: one of URL keys (for "git" ->
+    github.com/...) and one of words from titles and host names (for "hub
+    issues" -> a page titled "Issues - ..."). Both behave like a trie for
+    prefix lookups but use far less memory than one in Python.
+
+    Short prefixes ("g", "e", "https://") match a big part of the history,
+    so for prefixes matching more than CACHE_ABOVE items the best TOP URLs
+    are kept, and updated as visits change their frecency instead of being
+    worked out again. The ones up to PRECOMPUTE_LENGTH letters are worked
+    out up front, on the thread that loads the index, and longer prefixes
+    mostly narrow one of those down (see `python history.py`).
+    """
+
+    CACHE_ABOVE = 1000
+    TOP = 100
+    PRECOMPUTE_LENGTH = 2
+
+    def __init__(self, entries=()):
+        self.entries = {entry.url: entry for entry in entries}
+        self.keys = sorted((url_key(url), url) for url in self.entries)
+        self.words = sorted((word, url) for url, entry in self.entries.items() for word in entry.words())
+        # (list name, prefix) -> its TOP URLs, highest frecency first
+        self.top = {}
+        if len(self.keys) > self.CACHE_ABOVE:
+            self.rank_prefix("keys", "")  # "https://" and the like
+        for name in ("keys", "words"):
+            for length in range(1, self.PRECOMPUTE_LENGTH + 1):
+                self.rank_prefixes(name, length)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_visit(self, url, title, visit_time):
+        entry = self.entries.get(url)
+        if entry is None:
+            entry = HistoryEntry(url, title)
+            self.entries[url] = entry
+            bisect.insort(self.keys, (url_key(url), url))
+            self.add_words(entry, entry.words())
+        elif title and title != entry.title:
+            old_words = entry.words()
+            entry.title = title
+            new_words = entry.words()
+            self.remove_words(entry, old_words - new_words)
+            self.add_words(entry, new_words - old_words)
+        entry.visit_count += 1
+        entry.last_visit = visit_time
+        entry.update_score()
+        self.update_top(entry)
+        return entry
+
+    def add_words(self, entry, words):
+        for word in words:
+            bisect.insort(self.words, (word, entry.url))
+
+    def remove_words(self, entry, words):
+        for word in words:
+            i = bisect.bisect_left(self.words, (word, entry.url))
+            if i < len(self.words) and self.words[i] == (word, entry.url):
+                del self.words[i]
+
+    def merge(self, other):
+        """
+        Adds visits that happened while this index was being loaded.
+        """
+        for entry in other.entries.values():
+            mine = self.entries.get(entry.url)
+            if mine is None:
+                mine = self.add_visit(entry.url, entry.title, entry.last_visit)
+                mine.visit_count = entry.visit_count
+            else:
+                mine.visit_count += entry.visit_count
+                mine.last_visit = max(mine.last_visit, entry.last_visit)
+            mine.update_score()
+            self.update_top(mine)
+
+    @staticmethod
+    def prefix_range(sorted_list, prefix):
+        """
+        (start, end) of the items whose key starts with prefix.
+        """
+        return (bisect.bisect_left(sorted_list, (prefix,)),
+                bisect.bisect_left(sorted_list, (prefix + "\U0010ffff",)))
+
+    def rank_prefixes(self, name, length):
+        """
+        Works out the top list of every prefix of `length` letters that matches more than CACHE_ABOVE items.
+        """
+        sorted_list = getattr(self, name)
+        i = 0
+        while i < len(sorted_list):
+            prefix = sorted_list[i][0][:length]
+            if len(prefix) < length:
+                i += 1
+                continue
+            end = self.prefix_range(sorted_list, prefix)[1]
+            if end - i > self.CACHE_ABOVE:
+                self.rank_prefix(name, prefix)
+            i = end
+
+    def urls_in_range(self, name, prefix):
+        start, end = self.prefix_range(getattr(self, name), prefix)
+        return set(map(itemgetter(1), getattr(self, name)[start:end]))
+
+    def rank_prefix(self, name, prefix):
+        top = heapq.nlargest(self.TOP, self.urls_in_range(name, prefix), key=lambda url: self.entries[url].score)
+        self.top[name, prefix] = top
+        return top
+
+    def matches(self, name, url, prefix, words=None):
+        if name == "keys":
+            return url_key(url).startswith(prefix)
+        return any(word.startswith(prefix) for word in (words or self.entries[url].words()))
+
+    def ranked(self, name, prefix, count):
+        """
+        The `count` URLs with the highest frecency among those in self.keys
+        or self.words whose key starts with prefix, best first.
+        """
+        sorted_list = getattr(self, name)
+        start, end = self.prefix_range(sorted_list, prefix)
+        if end - start <= self.CACHE_ABOVE:
+            urls = set(map(itemgetter(1), sorted_list[start:end]))
+            return heapq.nlargest(count, urls, key=lambda url: self.entries[url].score)
+        top = self.top.get((name, prefix))
+        if top is None:
+            # A shorter prefix's list, filtered, is the start of this one's. Often
+            # that's already enough: "e" -> "ex" -> "exa" mostly narrows down the same pages.
+            for length in range(len(prefix) - 1, -1, -1):
+                shorter = self.top.get((name, prefix[:length]))
+                if shorter is not None:
+                    narrowed = [url for url in shorter if self.matches(name, url, prefix)]
+                    if len(narrowed) >= count:
+                        return narrowed[:count]
+                    break
+            top = self.rank_prefix(name, prefix)
+        if count <= len(top):
+            return top[:count]
+        return heapq.nlargest(count, self.urls_in_range(name, prefix), key=lambda url: self.entries[url].score)
+
+    def update_top(self, entry):
+        """
+        Moves a page whose frecency went up (or whose title changed) within the kept top lists.
+        """
+        words = entry.words()
+        for (name, prefix), top in list(self.top.items()):
+            if entry.url in top:
+                top.remove(entry.url)
+                if not self.matches(name, entry.url, prefix, words):
+                    # Its title lost the word, the list is one short now
+                    del self.top[name, prefix]
+                    continue
+            elif not self.matches(name, entry.url, prefix, words) or entry.score <= self.entries[top[-1]].score:
+                continue
+            scores = [-self.entries[url].score for url in top]
+            top.insert(bisect.bisect_right(scores, -entry.score), entry.url)
+            del top[self.TOP:]
+
+    def search(self, text, limit=8):
+        text = text.strip().lower()
+        if not text:
+            return []
+
+        # Both lists are in frecency order, so the best `limit` of each are
+        # all that can make it into the best `limit` overall
+        candidates = set(self.ranked("keys", url_key(text), limit))
+
+        # Every word typed has to match the start of some word of the page.
+        # Walks the best pages of each typed word, rarest first, keeping the
+        # ones that match all the others. A page missed by every walk scores
+        # at most the lowest score walked (`floor`), so whatever was found
+        # from there up is the real top (ties can go either way).
+        tokens = WORD_RE.findall(text)
+        if tokens:
+            def match_count(token):
+                start, end = self.prefix_range(self.words, token)
+                return end - start
+
+            tokens.sort(key=match_count)
+            found = set()
+            floor = None
+            for token in tokens:
+                best = self.ranked("words", token, self.TOP)
+                for url in best:
+                    words = self.entries[url].words() if len(tokens) > 1 else ()
+                    if all(self.matches("words", url, other, words) for other in tokens if other != token):
+                        found.add(url)
+                complete = len(best) < self.TOP or len(best) == match_count(token)
+                lowest = self.entries[best[-1]].score if best else 0
+                floor = float("-inf") if complete else lowest if floor is None else min(floor, lowest)
+                sure = [url for url in found if self.entries[url].score >= floor]
+                if len(sure) >= limit or complete:
+                    candidates.update(sure)
+                    break
+            else:
+                # Only common words that rarely go together: intersect all their pages
+                urls = self.urls_in_range("words", tokens[0])
+                for token in tokens[1:]:
+                    urls &= self.urls_in_range("words", token)
+                candidates.update(heapq.nlargest(limit, urls, key=lambda url: self.entries[url].score))
+
+        return heapq.nlargest(limit, (self.entries[url] for url in candidates), key=attrgetter("score"))
+
+
+class BrowsingHistory(QObject):
+    """
+    Browsing history kept in SQLite (WAL mode).
+
+    All database work happens on a background thread: it loads the index at
+    startup and then writes visits in batches. The GUI thread only ever
+    touches the in-memory HistoryIndex.
+    """
+
+    loaded = pyqtSignal(object)
+
+    BATCH_SIZE = 500
+    BATCH_WAIT = 0.5
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.index = HistoryIndex()
+        self.writes = queue.Queue()
+
+        self.loaded.connect(self.on_loaded)
+        self.thread = threading.Thread(target=self.run, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def add_visit(self, url, title):
+        # Don't remember internal pages or failed loads that have no URL
+        if not url.startswith(("http://", "https://", "file://")):
+            return
+        now = time.time()
+        entry = self.index.add_visit(url, title, now)
+        self.writes.put((url, title, now, frecency(entry.visit_count, entry.last_visit, now)))
+
+    def search(self, text, limit=8):
+        return self.index.search(text, limit)
+
+    def on_loaded(self, index):
+        index.merge(self.index)
+        self.index = index
+
+    def close(self):
+        self.writes.put(None)
+        self.thread.join(timeout=2)
+
+    # --- Background thread -----------------------------------------------
+
+    def connect_db(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                visit_count INTEGER NOT NULL DEFAULT 0,
+                last_visit REAL NOT NULL DEFAULT 0,
+                frecency REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS visits (
+                id INTEGER PRIMARY KEY,
+                url_id INTEGER NOT NULL,
+                visit_time REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS visits_url_id ON visits(url_id);
+        """)
+        return db
+
+    def run(self):
+        try:
+            db = self.connect_db()
+            rows = db.execute("SELECT url, title, visit_count, last_visit FROM urls")
+            self.loaded.emit(HistoryIndex(HistoryEntry(*row) for row in rows))
+        except sqlite3.Error as e:
+            print(f"Warning: history is disabled, couldn't open {self.db_path}: {e}")
+            return
+
+        while True:
+            item = self.writes.get()
+            if item is None:
+                break
+            batch = [item]
+            # Group whatever else comes in shortly after into the same transaction
+            deadline = time.monotonic() + self.BATCH_WAIT
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    item = self.writes.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.write_batch(db, batch)
+                    db.close()
+                    return
+                batch.append(item)
+            self.write_batch(db, batch)
+        db.close()
+
+    def write_batch(self, db, batch):
+        try:
+            with db:
+                db.executemany(
+                    """
+                    INSERT INTO urls (url, title, visit_count, last_visit, frecency)
+                    VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        title = CASE WHEN excluded.title != '' THEN excluded.title ELSE title END,
+                        visit_count = visit_count + 1,
+                        last_visit = excluded.last_visit,
+                        frecency = excluded.frecency
+                    """,
+                    batch,
+                )
+                db.executemany(
+                    "INSERT INTO visits (url_id, visit_time) SELECT id, ? FROM urls WHERE url = ?",
+                    [(visit_time, url) for url, _, visit_time, _ in batch],
+                )
+        except sqlite3.Error as e:
+            print(f"Warning: couldn't save {len(batch)} history entries: {e}")
+
+
+class HistoryCompleter(QCompleter):
+    """
+    URL bar suggestions from the browsing history (and bookmarks, which go
+    first). The list is rebuilt on every keystroke from the indexes instead
+    of letting QCompleter filter a huge model itself.
+    """
+
+    urlChosen = pyqtSignal(str)
+
+    URL_ROLE = Qt.UserRole + 1
+
+    MAX_BOOKMARKS = 3
+
+    def __init__(self, history, line_edit, bookmarks=None, favicons=None):
+        super().__init__(line_edit)
+        self.history = history
+        self.bookmarks = bookmarks
+        self.favicons = favicons
+        self.line_edit = line_edit
+
+        self.suggestions = QStandardItemModel(self)
+        self.setModel(self.suggestions)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCompletionRole(self.URL_ROLE)
+        self.setMaxVisibleItems(8)
+        self.setWidget(line_edit)
+
+        line_edit.textEdited.connect(self.update_suggestions)
+        self.activated[QModelIndex].connect(self.choose)
+
+    def suggestions_for(self, text):
+        suggestions = []
+        if self.bookmarks is not None:
+            suggestions = [("\u2605 " + (title or url), url)
+                           for _, title, url in self.bookmarks.search(text, limit=self.MAX_BOOKMARKS)]
+        bookmarked = {url for _, url in suggestions}
+        suggestions += [(entry.title, entry.url) for entry in self.history.search(text)
+                        if entry.url not in bookmarked]
+        return suggestions
+
+    def update_suggestions(self, text):
+        self.suggestions.clear()
+        for title, url in self.suggestions_for(text):
+            item = QStandardItem(f"{title} - {url}" if title else url)
+            item.setData(url, self.URL_ROLE)
+            if self.favicons is not None:
+                item.setIcon(self.favicons.icon(url))
+            self.suggestions.appendRow(item)
+        if self.suggestions.rowCount():
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def choose(self, index):
+        url = index.data(self.URL_ROLE)
+        self.line_edit.setText(url)
+        self.urlChosen.emit(url)
+
+
+if __name__ == "__main__":
+    # Keystroke timing: python history.py [entries]
+    # Builds an index of made-up pages (100000 by default) and times typing
+    # a few queries one letter at a time, like the URL bar does, before and
+    # after some visits. Every result is checked against a plain full scan.
+    import random
+    import statistics
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(1)
+    now = time.time()
+    sites = ["example.com", "github.com", "google.com", "en.wikipedia.org", "news.ycombinator.com",
+             "stackoverflow.com", "reddit.com", "docs.python.org", "youtube.com", "ebay.com"]
+    topics = ["python", "issues", "release", "example", "guide", "error", "game", "history", "music", "editor"]
+    entries = []
+    for number in range(count):
+        site = sites[min(int(rng.expovariate(0.4)), len(sites) - 1)]
+        title = f"{rng.choice(topics).title()} {rng.choice(topics)} {number}"
+        entries.append(HistoryEntry(f"https://{site}/{rng.choice(topics)}/{number}", title,
+                                    int(rng.paretovariate(1.2)), now - rng.uniform(0, 200) * 86400))
+
+    start = time.perf_counter()
+    index = HistoryIndex(entries)
+    print(f"{count} entries indexed in {time.perf_counter() - start:.1f} s (on the loading thread)")
+
+    def full_scan(text, limit=8):
+        text = text.strip().lower()
+        key = url_key(text)
+        tokens = WORD_RE.findall(text)
+        found = [entry for entry in index.entries.values()
+                 if url_key(entry.url).startswith(key)
+                 or (tokens and all(any(word.startswith(token) for word in entry.words()) for token in tokens))]
+        return [entry.score for entry in heapq.nlargest(limit, found, key=attrgetter("score"))]
+
+    queries = ["example", "github.com/is", "https://", "g", "wiki history", "music game", "e"]
+    wrong = []
+
+    def type_queries(label):
+        times = []
+        for query in queries:
+            for length in range(1, len(query) + 1):
+                start = time.perf_counter()
+                results = index.search(query[:length])
+                times.append(((time.perf_counter() - start) * 1000, query[:length]))
+                if [entry.score for entry in results] != full_scan(query[:length]):
+                    wrong.append(query[:length])
+        worst, worst_text = max(times)
+        print(f"{label:<16} median {statistics.median(ms for ms, _ in times):6.2f} ms, "
+              f"worst {worst:6.2f} ms for {worst_text!r} ({len(times)} keystrokes)")
+
+    type_queries("first time")
+    type_queries("again")
+    for _ in range(50):
+        entry = rng.choice(entries)
+        index.add_visit(entry.url, entry.title, time.time())
+    type_queries("after 50 visits")
+    print(f"{'ok  ' if not wrong else 'FAIL'} results match a full scan" + (f" (not for {wrong[:5]})" if wrong else ""))
+    sys.exit(1 if wrong else 0)
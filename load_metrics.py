@@ -0,0 +1,259 @@
+import csv
+import json
+import random
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDockWidget, QFileDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QSpinBox,
+    QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+)
+
+# Runs in the page once it has loaded. Returns a JSON string so the callback
+# gets one plain value instead of a big nested QVariant.
+NAVIGATION_TIMING_JS = """
+(function() {
+    var nav = performance.getEntriesByType('navigation')[0];
+    if (!nav) { return null; }
+    var paint = performance.getEntriesByName('first-contentful-paint')[0];
+    var resources = performance.getEntriesByType('resource');
+    var bytes = 0;
+    for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+    var slowest = resources.slice().sort(function(a, b) { return b.duration - a.duration; }).slice(0, 5);
+    return JSON.stringify({
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        ttfb: nav.responseStart - nav.requestStart,
+        first_paint: paint ? paint.startTime : null,
+        dom_content_loaded: nav.domContentLoadedEventEnd,
+        transfer_size: nav.transferSize,
+        resource_count: resources.length,
+        resource_bytes: bytes,
+        slowest: slowest.map(function(r) { return [r.name, Math.round(r.duration)]; })
+    });
+})();
+"""
+
+FIELDS = ("time", "url", "origin", "hint", "success", "first_progress", "load", "dns", "connect", "ttfb",
+          "first_paint", "dom_content_loaded", "transfer_size", "resource_count", "resource_bytes")
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class LoadMetrics(QObject):
+    """
+    Times every navigation of every tab: loadStarted -> first loadProgress ->
+    loadFinished from Qt, plus Navigation/Resource Timing read from the page.
+
+    Only `sample_percent` of navigations are recorded, and only the last
+    MAX_RECORDS are kept, so it's cheap enough to leave on all the time.
+    """
+
+    recordAdded = pyqtSignal(dict)
+
+    MAX_RECORDS = 1000
+
+    def __init__(self, sample_percent=100, parent=None):
+        super().__init__(parent)
+        self.sample_percent = sample_percent
+        self.records = deque(maxlen=self.MAX_RECORDS)
+        # Navigation in progress for each tab
+        self.pending = {}
+        # Optional callable(url) -> name of the prefetch hint that warmed the url up, see prefetch.py
+        self.take_hint = None
+
+    def watch(self, browser_tab):
+        browser_tab.loadStarted.connect(self.load_started)
+        browser_tab.loadProgress.connect(self.load_progress)
+        browser_tab.loadFinished.connect(self.load_finished)
+
+    def forget(self, browser_tab):
+        self.pending.pop(browser_tab, None)
+
+    def load_started(self):
+        browser_tab = self.sender()
+        if random.uniform(0, 100) >= self.sample_percent:
+            self.pending.pop(browser_tab, None)
+            return
+        hint = self.take_hint(browser_tab.current_url()) if self.take_hint else ""
+        self.pending[browser_tab] = {"start": time.monotonic(), "first_progress": None, "hint": hint}
+
+    def load_progress(self, progress):
+        navigation = self.pending.get(self.sender())
+        if navigation is not None and navigation["first_progress"] is None and progress > 0:
+            navigation["first_progress"] = round((time.monotonic() - navigation["start"]) * 1000)
+
+    def load_finished(self, success):
+        browser_tab = self.sender()
+        navigation = self.pending.pop(browser_tab, None)
+        if navigation is None:
+            return
+        url = browser_tab.current_url()
+        record = dict.fromkeys(FIELDS)
+        record.update({
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "url": url.toString(),
+            "origin": url.adjusted(QUrl.RemovePath | QUrl.RemoveQuery | QUrl.RemoveFragment).toString(),
+            "hint": navigation["hint"],
+            "success": success,
+            "first_progress": navigation["first_progress"],
+            "load": round((time.monotonic() - navigation["start"]) * 1000),
+        })
+        if success and browser_tab.page is not None:
+            browser_tab.page.runJavaScript(NAVIGATION_TIMING_JS, lambda result: self.add_record(record, result))
+        else:
+            self.add_record(record, None)
+
+    def add_record(self, record, timing_json):
+        if timing_json:
+            try:
+                timing = json.loads(timing_json)
+            except ValueError:
+                timing = {}
+            for key, value in timing.items():
+                record[key] = round(value) if isinstance(value, float) else value
+        self.records.append(record)
+        self.recordAdded.emit(record)
+
+    def origin_stats(self):
+        """
+        [(origin, count, p50 load, p95 load, p50 ttfb, p95 ttfb, p50 first paint), ...] busiest origin first.
+        """
+        by_origin = {}
+        for record in self.records:
+            by_origin.setdefault(record["origin"], []).append(record)
+        rows = []
+        for origin, records in by_origin.items():
+            loads = [r["load"] for r in records if r["success"]]
+            ttfbs = [r["ttfb"] for r in records if r["ttfb"] is not None]
+            paints = [r["first_paint"] for r in records if r["first_paint"] is not None]
+            rows.append((origin, len(records), percentile(loads, 0.5), percentile(loads, 0.95),
+                         percentile(ttfbs, 0.5), percentile(ttfbs, 0.95), percentile(paints, 0.5)))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def hint_stats(self):
+        """
+        {hint: (count, p50 first paint, p50 load)}, "" being the loads without a prefetch hint.
+        """
+        by_hint = {}
+        for record in self.records:
+            if record["success"]:
+                by_hint.setdefault(record["hint"] or "", []).append(record)
+        stats = {}
+        for hint, records in by_hint.items():
+            paints = [r["first_paint"] for r in records if r["first_paint"] is not None]
+            stats[hint] = (len(records), percentile(paints, 0.5), percentile([r["load"] for r in records], 0.5))
+        return stats
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as export_file:
+            json.dump(list(self.records), export_file, indent=1)
+
+    def export_csv(self, path):
+        with open(path, "w", encoding="utf-8", newline="") as export_file:
+            writer = csv.DictWriter(export_file, fieldnames=FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.records)
+
+
+class LoadMetricsPanel(QDockWidget):
+    """
+    Dockable table of page load times per origin.
+    """
+
+    COLUMNS = ("Origin", "Loads", "Load p50", "Load p95", "TTFB p50", "TTFB p95", "First paint p50")
+
+    def __init__(self, metrics, parent=None):
+        super().__init__("Page Load Performance", parent)
+        self.metrics = metrics
+        self.setObjectName("load_metrics_panel")
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().hide()
+
+        controls = QHBoxLayout()
+        self.sample_spin = QSpinBox()
+        self.sample_spin.setRange(0, 100)
+        self.sample_spin.setSuffix(" %")
+        self.sample_spin.setValue(metrics.sample_percent)
+        self.summary_label = QLabel()
+        self.json_btn = QPushButton("Export JSON")
+        self.csv_btn = QPushButton("Export CSV")
+        self.clear_btn = QPushButton("Clear")
+        controls.addWidget(QLabel("Sample:"))
+        controls.addWidget(self.sample_spin)
+        controls.addWidget(self.summary_label, 1)
+        controls.addWidget(self.json_btn)
+        controls.addWidget(self.csv_btn)
+        controls.addWidget(self.clear_btn)
+
+        layout.addWidget(self.table)
+        layout.addLayout(controls)
+        self.setWidget(container)
+
+        self.sample_spin.valueChanged.connect(self.set_sample_percent)
+        self.json_btn.clicked.connect(lambda: self.export("JSON (*.json)", metrics.export_json))
+        self.csv_btn.clicked.connect(lambda: self.export("CSV (*.csv)", metrics.export_csv))
+        self.clear_btn.clicked.connect(self.clear)
+
+        # Refreshing is batched and skipped entirely while the panel is hidden
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.refresh)
+        metrics.recordAdded.connect(self.schedule_refresh)
+
+    def set_sample_percent(self, value):
+        self.metrics.sample_percent = value
+
+    def schedule_refresh(self):
+        if self.isVisible() and not self.refresh_timer.isActive():
+            self.refresh_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        rows = self.metrics.origin_stats()
+        self.table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            for column, value in enumerate(row):
+                item = QTableWidgetItem("-" if value is None else str(value))
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row_index, column, item)
+        summary = f"{len(self.metrics.records)} loads recorded (times in ms)"
+        hint_stats = self.metrics.hint_stats()
+        if len(hint_stats) > 1:
+            # Only worth showing once there's something to compare
+            parts = [f"{hint or 'no hint'}: first paint {paint if paint is not None else '-'}, "
+                     f"load {load} ({count})" for hint, (count, paint, load) in sorted(hint_stats.items())]
+            summary += "\np50 by prefetch hint - " + "; ".join(parts)
+        self.summary_label.setText(summary)
+
+    def clear(self):
+        self.metrics.records.clear()
+        self.refresh()
+
+    def export(self, file_filter, write):
+        path, _ = QFileDialog.getSaveFileName(self, "Export load times", "", file_filter)
+        if not path:
+            return
+        try:
+            write(path)
+        except OSError as e:
+            self.summary_label.setText(f"Export failed: {e}")
@@ -1,19 +1,63 @@
 import os
 import sys
-from PyQt5.QtWidgets import *
-from PyQt5.QtGui import *
-from PyQt5.QtCore import *
-from PyQt5.QtWebEngineWidgets import *
-from PyQt5.QtWebChannel import QWebChannel
+import time
+from functools import lru_cache
 
-# Set environment variables to enable proprietary codecs for video and audio.
-os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = "--enable-proprietary-media-audios"
+# Taken before Qt is imported so --profile-startup can time the imports too
+START_TIME = time.perf_counter()
 
+if __name__ == "__main__":
+    # If the browser is already running, give it our URLs and stop here,
+    # before QtWebEngine gets loaded (see single_instance.py)
+    import single_instance
+    if single_instance.hand_off(sys.argv[1:]):
+        sys.exit(0)
 
+from PyQt5.QtCore import QEvent, QPointF, QSettings, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QIcon, QKeySequence
+# QtWebEngineWidgets has to be imported before the QApplication is created,
+# so it can't be deferred. What is deferred is building any web view: tabs
+# are lazy and the first one only loads after the window has been painted.
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineView
+from PyQt5.QtWidgets import (
+    QApplication, QCheckBox, QComboBox, QDialog, QFormLayout, QGroupBox, QHBoxLayout, QLabel, QLayout,
+    QLineEdit, QMainWindow, QPushButton, QRadioButton, QShortcut, QSpinBox, QStatusBar,
+    QVBoxLayout, QWidget,
+)
+
+from app_paths import data_path
+from bookmarks import BookmarkStore, BookmarksPanel
+from content_blocker import ContentBlocker
+from content_index import ContentIndex, ContentSearchPanel
+from downloads import DownloadManager, DownloadsPanel
+from favicons import FaviconStore
+from history import BrowsingHistory, HistoryCompleter
+from load_metrics import LoadMetrics, LoadMetricsPanel
+from offline_cache import OfflineCache
+from prefetch import SpeculativeLoader
+import process_model
+from procstats import format_bytes, process_rss
+from profile_manager import ProfileManager
+from session_store import SessionStore, restore_history, serialize_history
+from single_instance import InstanceServer, urls_from_args
+from stall_watchdog import StallWatchdog
+from startup_profile import StartupProfiler
+from theme_engine import ThemeEngine
+from tab_lifecycle import TabLifecycleManager
+from tab_overview import TabOverview, ThumbnailCache, capture_tab
+from tab_strip import TabStrip
+from tab_throttle import BackgroundThrottler, split_hosts
+from url_classifier import PublicSuffixTrie, SearchEngines, UrlClassifier
+
+startup_profiler = StartupProfiler(START_TIME, enabled="--profile-startup" in sys.argv)
+
+
+@lru_cache(maxsize=None)
 def get_app_icon():
     """
     Attempts to load the .ico file first. If it doesn't exist,
     it falls back to the .png file. This is a robust way to handle icons.
+    Only looked up once per process, later calls get the same QIcon.
     """
     ICON_DIR = 'src/icons'
     ICON_BASE_NAME = 'icon'
@@ -36,15 +80,37 @@ def get_app_icon():
         return QIcon()
 
 
+@lru_cache(maxsize=None)
+def default_url_classifier():
+    """
+    The URL bar rules with the built-in search engines and public suffixes,
+    for tabs made without a settings manager. Built on first use.
+    """
+    return UrlClassifier()
+
+
 class CustomWebEnginePage(QWebEnginePage):
     """
     Custom page to handle link clicks directly in Python.
     """
     newTabRequested = pyqtSignal(QUrl)
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    # Pages that haven't been deleted yet, handy for spotting leaks
+    alive = 0
+
+    def __init__(self, parent=None, profile=None):
+        # Tabs share the browser's profile (cache, cookies...), see profile_manager.py
+        if profile is not None:
+            super().__init__(profile, parent)
+        else:
+            super().__init__(parent)
         self.mouseButton = Qt.NoButton  # Initialize mouseButton to avoid errors
+        CustomWebEnginePage.alive += 1
+        self.destroyed.connect(CustomWebEnginePage.page_destroyed)
+
+    @staticmethod
+    def page_destroyed():
+        CustomWebEnginePage.alive -= 1
 
     def acceptNavigationRequest(self, qurl, nav_type, is_main_frame):
         # Intercept middle-click on a link
@@ -60,8 +126,16 @@ class CustomWebEnginePage(QWebEnginePage):
         super().mousePressEvent(event)
 
 class BrowserTab(QWidget):
+    newTabRequested = pyqtSignal(QUrl)
+    titleChanged = pyqtSignal(str)
+    # Forwarded from whichever web view the tab currently has
+    urlChanged = pyqtSignal(QUrl)
+    loadStarted = pyqtSignal()
+    loadProgress = pyqtSignal(int)
+    loadFinished = pyqtSignal(bool)
+    iconChanged = pyqtSignal(QIcon)
     
-    def __init__(self, parent=None, settings_manager=None):
+    def __init__(self, parent=None, settings_manager=None, url=None, title="New Tab", lazy=False):
         super().__init__(parent)
         
         self.settings_manager = settings_manager
@@ -86,61 +160,280 @@ class BrowserTab(QWidget):
         self.horizontal.addWidget(self.go_btn)
         self.horizontal.addWidget(self.reload_btn)
 
-        self.browser = QWebEngineView()
-        self.page = CustomWebEnginePage(self.browser)
-        self.browser.setPage(self.page)
-
         self.layout.addLayout(self.horizontal)
-        self.layout.addWidget(self.browser)
+
+        # Shown while the tab is on a saved copy of the page (see offline_cache.py)
+        self.offline_banner = QWidget()
+        self.offline_banner.setObjectName("offline_banner")
+        banner_layout = QHBoxLayout(self.offline_banner)
+        banner_layout.setContentsMargins(8, 2, 2, 2)
+        self.offline_label = QLabel()
+        self.live_btn = QPushButton("Reload live page")
+        banner_layout.addWidget(self.offline_label, 1)
+        banner_layout.addWidget(self.live_btn)
+        self.offline_banner.hide()
+        self.layout.addWidget(self.offline_banner)
+
+        # URL bar suggestions from the browsing history
+        if settings_manager is not None:
+            self.completer = HistoryCompleter(
+                settings_manager.history, self.url_bar, settings_manager.bookmarks, settings_manager.favicons
+            )
+            self.completer.urlChosen.connect(self.navigate)
+            self.url_bar.textEdited.connect(self.url_text_edited)
+
+        # The web view and page are only built when the tab is first shown and can
+        # be thrown away again in the background (see tab_lifecycle.py), so this
+        # is what we remember about the tab while it has no view.
+        self.browser = None
+        self.page = None
+        self.saved_url = url if url is not None else QUrl("https://google.com")
+        self.saved_title = title
+        self.saved_icon = QIcon()
+        self.saved_scroll = QPointF()
+        self.saved_history = None
+        self.session_id = None
+        self.last_active = time.monotonic()
+        self.discard_count = 0
+        self.restore_count = 0
+        # "frozen" or "paused" while throttled in the background, see tab_throttle.py
+        self.throttled = None
+        # The page's real URL while the tab shows its offline snapshot
+        self.offline_url = None
+        self.offline_path = None
         
         self.go_btn.clicked.connect(self.navigate)
         self.url_bar.returnPressed.connect(self.navigate)
-        self.back_btn.clicked.connect(self.browser.back)
-        self.forward_btn.clicked.connect(self.browser.forward)
-        self.reload_btn.clicked.connect(self.browser.reload)
+        self.back_btn.clicked.connect(self.go_back)
+        self.forward_btn.clicked.connect(self.go_forward)
+        self.reload_btn.clicked.connect(self.reload)
+        self.live_btn.clicked.connect(self.reload)
         
+        self.update_url_bar(self.saved_url)
+
+        # A lazy tab is just a placeholder until it gets activated.
+        if not lazy:
+            self.restore()
+
+    def create_view(self):
+        self.browser = QWebEngineView()
+        profile = self.settings_manager.profiles.profile if self.settings_manager else None
+        self.page = CustomWebEnginePage(self.browser, profile=profile)
+        self.browser.setPage(self.page)
+
+        self.layout.addWidget(self.browser)
+
         self.browser.urlChanged.connect(self.update_url_bar)
         self.browser.loadFinished.connect(self.update_title)
-        
-        self.browser.setUrl(QUrl("https://google.com"))
+        self.browser.urlChanged.connect(self.urlChanged)
+        self.browser.loadStarted.connect(self.loadStarted)
+        self.browser.loadProgress.connect(self.loadProgress)
+        self.browser.loadFinished.connect(self.loadFinished)
+        self.browser.iconChanged.connect(self.iconChanged)
+        self.page.newTabRequested.connect(self.newTabRequested)
+
+    def destroy_view(self):
+        self.browser.stop()
+        self.browser.urlChanged.disconnect(self.update_url_bar)
+        self.browser.loadFinished.disconnect(self.update_title)
+        self.browser.urlChanged.disconnect(self.urlChanged)
+        self.browser.loadStarted.disconnect(self.loadStarted)
+        self.browser.loadProgress.disconnect(self.loadProgress)
+        self.browser.loadFinished.disconnect(self.loadFinished)
+        self.browser.iconChanged.disconnect(self.iconChanged)
+        self.page.newTabRequested.disconnect(self.newTabRequested)
+        self.layout.removeWidget(self.browser)
+        # The page goes first (which detaches it from the view) so the view
+        # never points at a deleted page. Deleting the page is what lets its
+        # renderer process go away.
+        self.page.deleteLater()
+        self.browser.deleteLater()
+        self.browser = None
+        self.page = None
+        self.throttled = None
+
+    def dispose(self):
+        """
+        Frees the web view, page and the tab widget itself. Used when the tab is closed.
+        """
+        if not self.is_discarded():
+            self.destroy_view()
+        for signal in (self.newTabRequested, self.titleChanged, self.urlChanged,
+                       self.loadStarted, self.loadProgress, self.loadFinished, self.iconChanged):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # Nothing was connected
+        self.deleteLater()
+
+    def is_discarded(self):
+        return self.browser is None
+
+    def state(self):
+        if self.browser is not None:
+            return "live"
+        return "discarded" if self.discard_count else "lazy"
+
+    def discard(self):
+        """
+        Tears down the web view and its renderer, keeping just enough to bring it back.
+        """
+        if self.is_discarded():
+            return False
+        if not self.current_url().isEmpty():
+            self.saved_url = self.current_url()
+        self.saved_title = self.page.title() or self.saved_title
+        self.saved_icon = self.browser.icon()
+        self.saved_scroll = self.page.scrollPosition()
+        self.saved_history = self.history_state()
+        # Comes back as the live page, the snapshot is only a stand-in
+        self.leave_snapshot()
+        self.destroy_view()
+        self.discard_count += 1
+        return True
+
+    def restore(self):
+        if not self.is_discarded():
+            return False
+        self.create_view()
+        if not self.saved_scroll.isNull():
+            self.browser.loadFinished.connect(self.restore_scroll)
+        if self.saved_history:
+            # Brings back the back/forward list too, and loads its current entry
+            restore_history(self.page, self.saved_history)
+            self.saved_history = None
+        else:
+            self.browser.setUrl(self.saved_url)
+        # The first load of a lazy tab isn't a restore
+        if self.discard_count:
+            self.restore_count += 1
+        return True
+
+    def restore_scroll(self, success):
+        self.browser.loadFinished.disconnect(self.restore_scroll)
+        if success:
+            x, y = self.saved_scroll.x(), self.saved_scroll.y()
+            self.page.runJavaScript(f"window.scrollTo({x}, {y});")
+
+    def history_state(self):
+        """
+        Serialized back/forward history, for the session file.
+        """
+        if self.is_discarded():
+            return self.saved_history
+        if self.offline_url is not None:
+            return None  # It'd only remember the snapshot's file, the URL is enough
+        return serialize_history(self.page)
+
+    def current_url(self):
+        if self.offline_url is not None:
+            return self.offline_url
+        return self.saved_url if self.is_discarded() else self.browser.url()
+
+    def current_title(self):
+        return self.saved_title if self.is_discarded() else (self.page.title() or self.saved_title)
+
+    def renderer_pid(self):
+        # renderProcessPid() only exists from Qt 5.15 on
+        if self.page is None or not hasattr(self.page, "renderProcessPid"):
+            return None
+        return self.page.renderProcessPid() or None
+
+    def memory_usage(self):
+        return process_rss(self.renderer_pid())
+
+    def go_back(self):
+        if self.browser:
+            self.browser.back()
+
+    def go_forward(self):
+        if self.browser:
+            self.browser.forward()
+
+    def reload(self):
+        if self.offline_url is not None:
+            # Go back to the real page instead of reloading the snapshot
+            url = self.offline_url
+            self.leave_snapshot()
+            self.browser.setUrl(url)
+        elif self.browser:
+            self.browser.reload()
+        else:
+            self.restore()
+
+    def show_snapshot(self, url, path, saved_at):
+        """
+        Shows the offline copy of `url` saved at `path`, with a banner saying how old it is.
+        """
+        if self.is_discarded():
+            self.saved_url = QUrl(url)
+            self.create_view()
+        self.offline_url = QUrl(url)
+        self.offline_path = path
+        saved = time.strftime("%d %b %Y, %H:%M", time.localtime(saved_at))
+        self.offline_label.setText(f"You're offline. This is a saved copy from {saved}, it may be out of date.")
+        self.offline_banner.show()
+        self.browser.setUrl(QUrl.fromLocalFile(path))
+
+    def leave_snapshot(self):
+        self.offline_url = None
+        self.offline_path = None
+        self.offline_banner.hide()
+
+    def url_for_text(self, text):
+        """
+        Where the text typed in the URL bar leads: the URL itself or a search for it.
+        """
+        # See url_classifier.py for what counts as a URL and the search keywords
+        if self.settings_manager is None:
+            _, final_url = default_url_classifier().classify(text)
+        else:
+            _, final_url = self.settings_manager.url_classifier.classify(
+                text, self.settings_manager.default_search_engine
+            )
+        return final_url
+
+    def url_text_edited(self, text):
+        # Warm up the likely destination while the user is still typing (see prefetch.py)
+        self.settings_manager.speculative.text_edited(text, self.url_for_text(text))
 
     def navigate(self):
-        url = self.url_bar.text().strip()
-        
-        # Check if the URL already has a protocol.
-        if url.startswith("http://") or url.startswith("https://") or url.startswith("file:///"):
-            final_url = url
-        # Check if the URL has a dot with at least one character after it.
-        elif '.' in url and len(url.split('.')[-1]) > 0:
-            final_url = "https://" + url
+        final_url = self.url_for_text(self.url_bar.text())
+        if self.settings_manager is not None:
+            self.settings_manager.speculative.cancel()
+        if not final_url:
+            return  # Nothing typed
+
+        # No network at all: don't wait for the error page if there's a saved copy
+        offline_cache = self.settings_manager.offline_cache if self.settings_manager is not None else None
+        if offline_cache is not None and not offline_cache.online():
+            snapshot = offline_cache.snapshot(QUrl(final_url))
+            if snapshot is not None:
+                self.show_snapshot(QUrl(final_url), *snapshot)
+                return
+        self.leave_snapshot()
+
+        if self.is_discarded():
+            self.saved_url = QUrl(final_url)
+            self.saved_scroll = QPointF()
+            self.saved_history = None
+            self.restore()
         else:
-            # Use the selected search engine for the query.
-            search_engine = self.settings_manager.default_search_engine
-            search_query = url.replace(" ", "+")
-            if search_engine == "Google":
-                final_url = f"https://www.google.com/search?q={search_query}"
-            elif search_engine == "Bing":
-                final_url = f"https://www.bing.com/search?q={search_query}"
-            elif search_engine == "DuckDuckGo":
-                final_url = f"https://duckduckgo.com/?q={search_query}"
-            elif search_engine == "Yahoo":
-                final_url = f"https://search.yahoo.com/search?p={search_query}"
-            else: # Default to Google if something goes wrong
-                final_url = f"https://www.google.com/search?q={search_query}"
-            
-        self.browser.setUrl(QUrl(final_url))
+            self.browser.setUrl(QUrl(final_url))
 
     def update_url_bar(self, url):
+        if self.offline_url is not None:
+            if url == self.offline_url or (url.isLocalFile() and url.toLocalFile() == self.offline_path):
+                url = self.offline_url  # The snapshot's file isn't what the user asked for
+            else:
+                self.leave_snapshot()  # Followed a link or went back
         self.url_bar.setText(url.toString())
         self.url_bar.setCursorPosition(0)
 
     def update_title(self, success):
         if success:
-            tab_widget = self.parentWidget()
-            if isinstance(tab_widget, QTabWidget):
-                index = tab_widget.indexOf(self)
-                title = self.browser.page().title()
-                tab_widget.setTabText(index, title or "New Tab")
+            self.saved_title = self.page.title() or "New Tab"
+            self.titleChanged.emit(self.saved_title)
 
 class SettingsDialog(QDialog):
     """
@@ -149,55 +442,255 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None, settings_manager=None):
         super().__init__(parent)
         self.setWindowTitle("Settings")
-        self.setFixedSize(300, 200)
+        self.setFixedWidth(320)
         self.settings_manager = settings_manager
         
         self.main_layout = QVBoxLayout(self)
+        # Keep the dialog at exactly the size its sections need
+        self.main_layout.setSizeConstraint(QLayout.SetFixedSize)
         
-        # Theme Mode section
+        # Theme Mode section, one button per theme in the themes folder
         self.theme_group = QGroupBox("Theme Mode")
         self.theme_layout = QHBoxLayout()
-        self.light_mode_btn = QRadioButton("Light")
-        self.dark_mode_btn = QRadioButton("Dark")
-        self.theme_layout.addWidget(self.light_mode_btn)
-        self.theme_layout.addWidget(self.dark_mode_btn)
+        self.theme_buttons = {}
+        for name, label in self.settings_manager.themes.available():
+            self.theme_buttons[name] = QRadioButton(label)
+            self.theme_layout.addWidget(self.theme_buttons[name])
         self.theme_group.setLayout(self.theme_layout)
         
         # Search Engine section
         self.search_group = QGroupBox("Default Search Engine")
         self.search_layout = QHBoxLayout()
         self.search_dropdown = QComboBox()
-        self.search_dropdown.addItems(["Google", "Bing", "DuckDuckGo", "Yahoo"])
+        self.search_dropdown.addItems(self.settings_manager.search_engines.names())
         self.search_layout.addWidget(self.search_dropdown)
         self.search_group.setLayout(self.search_layout)
 
+        # Tab discarding section (0 turns a rule off)
+        self.discard_group = QGroupBox("Tab Discarding")
+        self.discard_layout = QFormLayout()
+        self.idle_spin = QSpinBox()
+        self.idle_spin.setRange(0, 24 * 60)
+        self.idle_spin.setSuffix(" min")
+        self.idle_spin.setSpecialValueText("Never")
+        self.budget_spin = QSpinBox()
+        self.budget_spin.setRange(0, 64 * 1024)
+        self.budget_spin.setSingleStep(256)
+        self.budget_spin.setSuffix(" MB")
+        self.budget_spin.setSpecialValueText("No limit")
+        self.discard_layout.addRow("Idle time:", self.idle_spin)
+        self.discard_layout.addRow("Memory budget:", self.budget_spin)
+        self.discard_group.setLayout(self.discard_layout)
+
+        # Background tab throttling section
+        self.throttle_group = QGroupBox("Background Tabs")
+        self.throttle_layout = QFormLayout()
+        self.throttle_check = QCheckBox("Freeze tabs that are in the background")
+        self.throttle_hosts_edit = QLineEdit()
+        self.throttle_hosts_edit.setPlaceholderText("music.example.com, radio.example.org")
+        self.throttle_hosts_edit.setToolTip("Sites that keep running in the background (subdomains too)")
+        self.throttle_layout.addRow(self.throttle_check)
+        self.throttle_layout.addRow("Never freeze:", self.throttle_hosts_edit)
+        self.throttle_group.setLayout(self.throttle_layout)
+
+        # Cache & cookies section
+        self.cache_group = QGroupBox("Cache && Cookies")
+        self.cache_layout = QFormLayout()
+        self.cache_type_dropdown = QComboBox()
+        self.cache_type_dropdown.addItems(list(ProfileManager.CACHE_TYPES))
+        self.cache_size_spin = QSpinBox()
+        # setHttpCacheMaximumSize() takes an int, so stay under 2 GB
+        self.cache_size_spin.setRange(0, 2047)
+        self.cache_size_spin.setSingleStep(64)
+        self.cache_size_spin.setSuffix(" MB")
+        self.cache_size_spin.setSpecialValueText("Automatic")
+        self.cookies_check = QCheckBox("Keep cookies between sessions")
+        self.clear_cache_btn = QPushButton("Clear cache")
+        self.cache_layout.addRow("Cache type:", self.cache_type_dropdown)
+        self.cache_layout.addRow("Cache size:", self.cache_size_spin)
+        self.cache_layout.addRow(self.cookies_check)
+        self.cache_layout.addRow(self.clear_cache_btn)
+        self.cache_group.setLayout(self.cache_layout)
+
+        # Content blocking section
+        self.blocking_group = QGroupBox("Content Blocking")
+        self.blocking_layout = QVBoxLayout()
+        self.block_ads_check = QCheckBox("Block ads and trackers")
+        blocker = self.settings_manager.content_blocker
+        rule_count = blocker.index.rule_count if blocker.index else 0
+        self.block_ads_check.setToolTip(
+            f"{rule_count} rules loaded. Put EasyList-style .txt lists in:\n{blocker.lists_dir}"
+        )
+        self.blocking_layout.addWidget(self.block_ads_check)
+        self.blocking_group.setLayout(self.blocking_layout)
+
+        # Page text search section
+        self.page_search_group = QGroupBox("Page Search")
+        self.page_search_layout = QVBoxLayout()
+        self.index_pages_check = QCheckBox("Remember the text of pages I visit (Ctrl+Shift+F to search)")
+        self.page_search_layout.addWidget(self.index_pages_check)
+        self.page_search_group.setLayout(self.page_search_layout)
+
+        # Offline pages section
+        self.offline_group = QGroupBox("Offline Pages")
+        self.offline_layout = QFormLayout()
+        self.offline_auto_check = QCheckBox("Keep bookmarked pages saved for offline use (Ctrl+Shift+S saves any page)")
+        self.offline_size_spin = QSpinBox()
+        self.offline_size_spin.setRange(10, 10000)
+        self.offline_size_spin.setSingleStep(50)
+        self.offline_size_spin.setSuffix(" MB")
+        self.clear_offline_btn = QPushButton("Delete saved pages")
+        self.offline_layout.addRow(self.offline_auto_check)
+        self.offline_layout.addRow("Space for saved pages:", self.offline_size_spin)
+        self.offline_layout.addRow(self.clear_offline_btn)
+        self.offline_group.setLayout(self.offline_layout)
+
+        # Downloads section
+        self.downloads_group = QGroupBox("Downloads")
+        self.downloads_layout = QVBoxLayout()
+        self.segmented_check = QCheckBox("Download in parallel parts (resumable)")
+        self.segmented_check.setToolTip(f"Saved to {DownloadManager.download_folder()}")
+        self.downloads_layout.addWidget(self.segmented_check)
+        self.downloads_group.setLayout(self.downloads_layout)
+
+        # URL bar prefetching section
+        self.prefetch_group = QGroupBox("Prefetch While Typing")
+        self.prefetch_layout = QHBoxLayout()
+        self.prefetch_dropdown = QComboBox()
+        for key, label in SpeculativeLoader.MODES.items():
+            self.prefetch_dropdown.addItem(label, key)
+        self.prefetch_layout.addWidget(self.prefetch_dropdown)
+        self.prefetch_group.setLayout(self.prefetch_layout)
+
+        # Process model section. Chromium reads these at startup only.
+        self.process_group = QGroupBox("Processes (after restart)")
+        self.process_layout = QFormLayout()
+        self.process_model_dropdown = QComboBox()
+        for key, (label, _) in process_model.PROCESS_MODELS.items():
+            self.process_model_dropdown.addItem(label, key)
+        self.renderer_limit_spin = QSpinBox()
+        self.renderer_limit_spin.setRange(0, 64)
+        self.renderer_limit_spin.setSpecialValueText("No limit")
+        self.gpu_dropdown = QComboBox()
+        for key, (label, _) in process_model.GPU_MODES.items():
+            self.gpu_dropdown.addItem(label, key)
+        self.site_isolation_check = QCheckBox("Isolate sites from each other")
+        self.process_layout.addRow("Renderers:", self.process_model_dropdown)
+        self.process_layout.addRow("Renderer limit:", self.renderer_limit_spin)
+        self.process_layout.addRow("Graphics:", self.gpu_dropdown)
+        self.process_layout.addRow(self.site_isolation_check)
+        self.process_group.setLayout(self.process_layout)
+
         # Apply button
         self.apply_btn = QPushButton("Apply")
 
         self.main_layout.addWidget(self.theme_group)
         self.main_layout.addWidget(self.search_group)
+        self.main_layout.addWidget(self.discard_group)
+        self.main_layout.addWidget(self.throttle_group)
+        self.main_layout.addWidget(self.cache_group)
+        self.main_layout.addWidget(self.blocking_group)
+        self.main_layout.addWidget(self.page_search_group)
+        self.main_layout.addWidget(self.offline_group)
+        self.main_layout.addWidget(self.downloads_group)
+        self.main_layout.addWidget(self.prefetch_group)
+        self.main_layout.addWidget(self.process_group)
         self.main_layout.addWidget(self.apply_btn)
 
         self.apply_btn.clicked.connect(self.apply_settings)
+        self.clear_cache_btn.clicked.connect(self.clear_cache)
+        self.clear_offline_btn.clicked.connect(self.clear_offline_pages)
         
         # Set initial values based on the settings manager
-        if self.settings_manager.current_theme == "dark":
-            self.dark_mode_btn.setChecked(True)
-        else:
-            self.light_mode_btn.setChecked(True)
+        if self.settings_manager.current_theme in self.theme_buttons:
+            self.theme_buttons[self.settings_manager.current_theme].setChecked(True)
             
         self.search_dropdown.setCurrentText(self.settings_manager.default_search_engine)
+        self.idle_spin.setValue(self.settings_manager.tab_idle_minutes)
+        self.budget_spin.setValue(self.settings_manager.tab_memory_budget_mb)
+        self.throttle_check.setChecked(self.settings_manager.throttle_background)
+        self.throttle_hosts_edit.setText(self.settings_manager.throttle_allowed_hosts)
+        self.cache_type_dropdown.setCurrentText(self.settings_manager.cache_type)
+        self.cache_size_spin.setValue(self.settings_manager.cache_size_mb)
+        self.cookies_check.setChecked(self.settings_manager.persistent_cookies)
+        self.block_ads_check.setChecked(self.settings_manager.block_ads)
+        self.index_pages_check.setChecked(self.settings_manager.index_pages)
+        self.offline_auto_check.setChecked(self.settings_manager.offline_auto_save)
+        self.offline_size_spin.setValue(self.settings_manager.offline_size_mb)
+        self.segmented_check.setChecked(self.settings_manager.segmented_downloads)
+        self.prefetch_dropdown.setCurrentIndex(self.prefetch_dropdown.findData(self.settings_manager.prefetch_mode))
+        process_options = self.settings_manager.process_options
+        self.process_model_dropdown.setCurrentIndex(self.process_model_dropdown.findData(process_options["model"]))
+        self.renderer_limit_spin.setValue(process_options["renderer_limit"])
+        self.gpu_dropdown.setCurrentIndex(self.gpu_dropdown.findData(process_options["gpu"]))
+        self.site_isolation_check.setChecked(process_options["site_isolation"])
+        self.clear_cache_btn.setToolTip(
+            f"Using {format_bytes(self.settings_manager.profiles.cache_usage())}"
+        )
+        self.clear_offline_btn.setToolTip(
+            f"Using {format_bytes(self.settings_manager.offline_cache.total_size())}"
+        )
+
+    def clear_cache(self):
+        self.settings_manager.profiles.clear_cache()
+        self.clear_cache_btn.setText("Cache cleared")
+        self.clear_cache_btn.setEnabled(False)
+
+    def clear_offline_pages(self):
+        self.settings_manager.offline_cache.clear()
+        self.clear_offline_btn.setText("Saved pages deleted")
+        self.clear_offline_btn.setEnabled(False)
 
     def apply_settings(self):
         # Update settings in the main window
-        if self.dark_mode_btn.isChecked():
-            self.settings_manager.current_theme = "dark"
-        else:
-            self.settings_manager.current_theme = "light"
+        for name, button in self.theme_buttons.items():
+            if button.isChecked():
+                self.settings_manager.current_theme = name
             
         self.settings_manager.default_search_engine = self.search_dropdown.currentText()
+        self.settings_manager.tab_idle_minutes = self.idle_spin.value()
+        self.settings_manager.tab_memory_budget_mb = self.budget_spin.value()
+        self.settings_manager.tab_lifecycle.configure(
+            self.settings_manager.tab_idle_minutes,
+            self.settings_manager.tab_memory_budget_mb,
+        )
+        self.settings_manager.throttle_background = self.throttle_check.isChecked()
+        self.settings_manager.throttle_allowed_hosts = ", ".join(split_hosts(self.throttle_hosts_edit.text()))
+        self.settings_manager.throttler.configure(
+            self.settings_manager.throttle_background,
+            split_hosts(self.settings_manager.throttle_allowed_hosts),
+        )
+        self.settings_manager.cache_type = self.cache_type_dropdown.currentText()
+        self.settings_manager.cache_size_mb = self.cache_size_spin.value()
+        self.settings_manager.persistent_cookies = self.cookies_check.isChecked()
+        self.settings_manager.profiles.configure(
+            self.settings_manager.cache_type,
+            self.settings_manager.cache_size_mb,
+            self.settings_manager.persistent_cookies,
+        )
+        self.settings_manager.block_ads = self.block_ads_check.isChecked()
+        self.settings_manager.content_blocker.enabled = self.settings_manager.block_ads
+        self.settings_manager.index_pages = self.index_pages_check.isChecked()
+        self.settings_manager.content_index.enabled = self.settings_manager.index_pages
+        self.settings_manager.offline_auto_save = self.offline_auto_check.isChecked()
+        self.settings_manager.offline_size_mb = self.offline_size_spin.value()
+        self.settings_manager.offline_cache.auto_save = self.settings_manager.offline_auto_save
+        self.settings_manager.offline_cache.max_bytes = self.settings_manager.offline_size_mb * 1024 * 1024
+        self.settings_manager.offline_cache.evict()
+        self.settings_manager.offline_cache.save_index()
+        self.settings_manager.segmented_downloads = self.segmented_check.isChecked()
+        self.settings_manager.downloads.segmented = self.settings_manager.segmented_downloads
+        self.settings_manager.prefetch_mode = self.prefetch_dropdown.currentData()
+        self.settings_manager.speculative.mode = self.settings_manager.prefetch_mode
+        self.settings_manager.process_options = {
+            "model": self.process_model_dropdown.currentData(),
+            "renderer_limit": self.renderer_limit_spin.value(),
+            "gpu": self.gpu_dropdown.currentData(),
+            "site_isolation": self.site_isolation_check.isChecked(),
+        }
+        self.settings_manager.save_settings()
         
-        # Apply the new theme to the main window
+        # Apply the new theme to the whole app (does nothing if it didn't change)
         self.settings_manager.toggle_theme(self.settings_manager.current_theme)
         
         self.accept()
@@ -207,19 +700,128 @@ class MyWebBrowser(QMainWindow):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.current_theme = "light"
-        self.default_search_engine = "Google"
+        self.settings = QSettings(data_path("settings.ini"), QSettings.IniFormat)
+        self.load_settings()
+        self.themes = ThemeEngine()
+
+        # What the URL bar text means. Extra search engines (with keywords like
+        # "gh foo") can be added in search_engines.json, and the full public
+        # suffix list can be dropped in as public_suffix_list.dat.
+        self.search_engines = SearchEngines(data_path("search_engines.json"))
+        self.url_classifier = UrlClassifier(
+            self.search_engines, PublicSuffixTrie.load(data_path("public_suffix_list.dat"))
+        )
+
+        # One shared profile for every tab, so the disk cache and cookies are reused
+        self.profiles = ProfileManager("lovely", data_path("profile"))
+        self.profiles.configure(self.cache_type, self.cache_size_mb, self.persistent_cookies)
+
+        # Ad/tracker blocking for every request made through the profile.
+        # Parented to the profile since the profile keeps calling it.
+        self.content_blocker = ContentBlocker(
+            data_path("filters"), data_path("filters.cache"), parent=self.profiles.profile
+        )
+        self.content_blocker.enabled = self.block_ads
+        self.content_blocker.install(self.profiles.profile)
+        self.content_blocker.reload_lists()
+
+        # Every download from the profile goes through here (panel on Ctrl+J)
+        self.downloads = DownloadManager(
+            self.profiles.profile, data_path("downloads"), self.segmented_downloads,
+            self.download_limit_kbps, parent=self
+        )
 
         # --- FIX: Use the new function to set the window icon with fallback ---
         self.setWindowIcon(get_app_icon())
         # ---------------------------------------------------------------------
 
-        self.tabs = QTabWidget()
-        self.tabs.setDocumentMode(True)
+        # Vertical tabs backed by a model, so thousands of tabs stay responsive (see tab_strip.py)
+        self.tabs = TabStrip()
         self.tabs.tabBarDoubleClicked.connect(self.tab_open_doubleclick)
         self.tabs.currentChanged.connect(self.current_tab_changed)
         
         self.setCentralWidget(self.tabs)
+
+        # No page starts loading until the window has been painted once
+        self.first_paint_done = False
+        self.tabs.list_view.viewport().installEventFilter(self)
+        # In case the window never gets painted (minimized, offscreen...)
+        QTimer.singleShot(1000, self.first_paint)
+
+        self.tab_lifecycle = TabLifecycleManager(
+            self.tabs, self.tab_idle_minutes, self.tab_memory_budget_mb, parent=self
+        )
+        # Freezes tabs that have been in the background for a bit
+        self.throttler = BackgroundThrottler(
+            self.tabs, self.throttle_background, split_hosts(self.throttle_allowed_hosts), parent=self
+        )
+        # Debug helper: dump per-tab memory/state to the console
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self, self.show_tab_stats)
+        # Logs where the window freezes (stalls.log, stalls.folded), main() starts it with the event loop
+        self.watchdog = StallWatchdog(
+            data_path("stalls.log"), data_path("stalls.folded"), self.stall_ms, parent=self
+        )
+
+        self.session = SessionStore(data_path("session"), parent=self)
+        self.history = BrowsingHistory(data_path("history.sqlite"), parent=self)
+
+        # Site icons for the tabs, URL bar suggestions and bookmarks, kept across restarts
+        self.favicons = FaviconStore(data_path("favicons"), parent=self)
+        self.favicons.iconStored.connect(self.favicon_stored)
+
+        # Bookmarks sidebar (Ctrl+Shift+B), Ctrl+D bookmarks the current page
+        self.bookmarks = BookmarkStore(data_path("bookmarks.sqlite"), parent=self)
+        self.bookmarks_panel = BookmarksPanel(self.bookmarks, self.favicons, parent=self)
+        self.bookmarks_panel.openUrl.connect(self.open_bookmark)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.bookmarks_panel)
+        self.bookmarks_panel.hide()
+        QShortcut(QKeySequence("Ctrl+Shift+B"), self, self.toggle_bookmarks)
+        QShortcut(QKeySequence("Ctrl+D"), self, self.bookmark_current_page)
+
+        # MHTML snapshots to fall back on without a network, Ctrl+Shift+S saves
+        # the current page and bookmarked pages are kept saved automatically
+        self.offline_cache = OfflineCache(
+            data_path("offline"), self.bookmarks, self.offline_size_mb * 1024 * 1024,
+            self.offline_auto_save, parent=self
+        )
+        self.offline_cache.snapshotSaved.connect(self.snapshot_saved)
+        self.downloads.take_download = self.offline_cache.take_download
+        QShortcut(QKeySequence("Ctrl+Shift+S"), self, self.save_current_page)
+
+        # Page load timings per origin, shown in a dock panel (Ctrl+Shift+P)
+        self.load_metrics = LoadMetrics(self.perf_sample_percent, parent=self)
+        self.load_metrics_panel = LoadMetricsPanel(self.load_metrics, parent=self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.load_metrics_panel)
+        self.load_metrics_panel.hide()
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.toggle_load_metrics)
+
+        self.downloads_panel = DownloadsPanel(self.downloads, parent=self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.downloads_panel)
+        self.downloads_panel.hide()
+        QShortcut(QKeySequence("Ctrl+J"), self, self.toggle_downloads)
+
+        # Search the text of visited pages (Ctrl+Shift+F), indexed in the background
+        self.content_index = ContentIndex(data_path("content.sqlite"), self.index_pages, parent=self)
+        self.content_search_panel = ContentSearchPanel(self.content_index, self.open_tab_urls, parent=self)
+        self.content_search_panel.openUrl.connect(self.open_search_result)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.content_search_panel)
+        self.content_search_panel.hide()
+        QShortcut(QKeySequence("Ctrl+Shift+F"), self, self.toggle_content_search)
+
+        # Thumbnails for the tab overview (Ctrl+Shift+A), taken a moment after
+        # the current tab finishes loading since hidden tabs can't be grabbed
+        self.thumbnails = ThumbnailCache(data_path("thumbnails"))
+        self.thumbnail_timer = QTimer(self)
+        self.thumbnail_timer.setSingleShot(True)
+        self.thumbnail_timer.setInterval(500)
+        self.thumbnail_timer.timeout.connect(self.capture_thumbnail)
+        QShortcut(QKeySequence("Ctrl+Shift+A"), self, self.open_tab_overview)
+
+        # Warms up connections for what's being typed in the URL bar
+        self.speculative = SpeculativeLoader(
+            self.profiles.profile, self.history, self.prefetch_mode, parent=self
+        )
+        self.load_metrics.take_hint = self.speculative.take_hint
         
         self.status = QStatusBar()
         self.setStatusBar(self.status)
@@ -230,256 +832,96 @@ class MyWebBrowser(QMainWindow):
         # Modern settings button icon
         self.settings_btn = QPushButton('⋮') 
         self.settings_btn.clicked.connect(self.open_settings)
+
+        self.overview_btn = QPushButton('▦')
+        self.overview_btn.setToolTip("All tabs (Ctrl+Shift+A)")
+        self.overview_btn.clicked.connect(self.open_tab_overview)
         
         self.toggle_theme(self.current_theme)
         
         self.add_tab_btn.setObjectName("add_tab_btn")
         self.settings_btn.setObjectName("settings_btn")
+        self.overview_btn.setObjectName("overview_btn")
 
         self.top_right_widget = QWidget()
         self.top_right_layout = QHBoxLayout(self.top_right_widget)
         self.top_right_layout.setContentsMargins(0, 0, 0, 0)
         
         # New tab button before settings button
+        self.top_right_layout.addWidget(self.overview_btn)
         self.top_right_layout.addWidget(self.add_tab_btn)
         self.top_right_layout.addWidget(self.settings_btn)
         
-        self.tabs.setCornerWidget(self.top_right_widget, Qt.Corner.TopRightCorner)
+        self.tabs.setCornerWidget(self.top_right_widget)
 
-        self.add_new_tab(QUrl('https://google.com/'), 'Homepage')
-        self.add_new_tab(QUrl("https://github.com/Yezdtiz/"), "My projects :P")
+        # Reopen the last session, or the default tabs the first time around
+        saved_tabs, active_id = self.session.load()
+        if saved_tabs:
+            self.restore_session(saved_tabs, active_id)
+        else:
+            self.add_new_tab(QUrl('https://google.com/'), 'Homepage')
+            self.add_new_tab(QUrl("https://github.com/Yezdtiz/"), "My projects :P")
         
-        self.tabs.setTabsClosable(True)
+        # Later starts of the browser send their URLs here instead of opening a second window
+        self.instance_server = InstanceServer(parent=self)
+        self.instance_server.openRequested.connect(self.open_urls)
+        self.instance_server.listen()
+
         self.tabs.tabCloseRequested.connect(self.close_current_tab)
-        self.tabs.setMovable(True)
+        self.tabs.tabMoved.connect(self.session.tab_moved)
         
         self.setWindowTitle("Python Browser")
         self.setMinimumSize(1024, 768)
         self.show()
 
+    def load_settings(self):
+        self.current_theme = self.settings.value("theme", "light")
+        self.default_search_engine = self.settings.value("search_engine", "Google")
+        self.tab_idle_minutes = self.settings.value("tabs/idle_minutes", 30, type=int)
+        self.tab_memory_budget_mb = self.settings.value("tabs/memory_budget_mb", 0, type=int)
+        self.cache_type = self.settings.value("profile/cache_type", "Disk")
+        self.cache_size_mb = self.settings.value("profile/cache_size_mb", 256, type=int)
+        self.persistent_cookies = self.settings.value("profile/persistent_cookies", True, type=bool)
+        self.block_ads = self.settings.value("privacy/block_ads", True, type=bool)
+        self.perf_sample_percent = self.settings.value("perf/sample_percent", 100, type=int)
+        self.prefetch_mode = self.settings.value("prefetch/mode", "preconnect")
+        self.segmented_downloads = self.settings.value("downloads/segmented", True, type=bool)
+        self.download_limit_kbps = self.settings.value("downloads/limit_kbps", 0, type=int)
+        self.throttle_background = self.settings.value("throttle/enabled", True, type=bool)
+        self.index_pages = self.settings.value("privacy/index_pages", True, type=bool)
+        self.stall_ms = self.settings.value("debug/stall_ms", 250, type=int)
+        self.offline_auto_save = self.settings.value("offline/auto_save", True, type=bool)
+        self.offline_size_mb = self.settings.value("offline/size_mb", 200, type=int)
+        self.throttle_allowed_hosts = self.settings.value(
+            "throttle/allowed_hosts", "music.youtube.com, open.spotify.com, soundcloud.com"
+        )
+        # Only used by the settings dialog, main() applies them before the app starts
+        self.process_options = process_model.load_options(self.settings)
+
+    def save_settings(self):
+        self.settings.setValue("theme", self.current_theme)
+        self.settings.setValue("search_engine", self.default_search_engine)
+        self.settings.setValue("tabs/idle_minutes", self.tab_idle_minutes)
+        self.settings.setValue("tabs/memory_budget_mb", self.tab_memory_budget_mb)
+        self.settings.setValue("profile/cache_type", self.cache_type)
+        self.settings.setValue("profile/cache_size_mb", self.cache_size_mb)
+        self.settings.setValue("profile/persistent_cookies", self.persistent_cookies)
+        self.settings.setValue("privacy/block_ads", self.block_ads)
+        self.settings.setValue("perf/sample_percent", self.perf_sample_percent)
+        self.settings.setValue("prefetch/mode", self.prefetch_mode)
+        self.settings.setValue("downloads/segmented", self.segmented_downloads)
+        self.settings.setValue("downloads/limit_kbps", self.download_limit_kbps)
+        self.settings.setValue("throttle/enabled", self.throttle_background)
+        self.settings.setValue("privacy/index_pages", self.index_pages)
+        self.settings.setValue("debug/stall_ms", self.stall_ms)
+        self.settings.setValue("offline/auto_save", self.offline_auto_save)
+        self.settings.setValue("offline/size_mb", self.offline_size_mb)
+        self.settings.setValue("throttle/allowed_hosts", self.throttle_allowed_hosts)
+        process_model.save_options(self.settings, self.process_options)
+
     def toggle_theme(self, mode):
-        if mode == "dark":
-            dark_stylesheet = """
-                QWidget {
-                    background-color: #1a1a1a;
-                    color: #e0e0e0;
-                }
-                QTabWidget::pane {
-                    border: 1px solid #333;
-                    background-color: #1a1a1a;
-                }
-                QTabBar::tab {
-                    background-color: #333;
-                    color: #e0e0e0;
-                    border: 1px solid #444;
-                    border-bottom-color: #333;
-                    border-top-left-radius: 4px;
-                    border-top-right-radius: 4px;
-                    padding: 8px 12px;
-                }
-                QTabBar::tab:selected {
-                    background-color: #1a1a1a;
-                    border-bottom-color: #1a1a1a;
-                }
-                QTabBar::tab:hover {
-                    background-color: #2a2a2a;
-                }
-                QPushButton {
-                    background-color: #333;
-                    border: 1px solid #444;
-                    border-radius: 6px;
-                    padding: 6px;
-                    font-family: Arial;
-                    font-size: 14px;
-                    color: #e0e0e0;
-                }
-                QPushButton:hover {
-                    background-color: #444;
-                }
-                QPushButton:pressed {
-                    background-color: #2a2a2a;
-                }
-                QLineEdit {
-                    background-color: #2a2a2a;
-                    border: 1px solid #444;
-                    border-radius: 6px;
-                    padding: 6px 10px;
-                    font-family: Arial;
-                    font-size: 14px;
-                    color: #e0e0e0;
-                }
-                QLineEdit:focus {
-                    border: 1px solid #66A3FF;
-                }
-                #add_tab_btn {
-                    background-color: #66A3FF;
-                    color: white;
-                    border: none;
-                    border-radius: 12px;
-                    font-weight: bold;
-                    font-size: 18px;
-                    padding: 4px 6px;
-                }
-                #add_tab_btn:hover {
-                    background-color: #558ED4;
-                }
-                #add_tab_btn:pressed {
-                    background-color: #4477A9;
-                }
-                #settings_btn {
-                    background-color: transparent; 
-                    border: none;
-                    font-size: 24px; 
-                    color: #e0e0e0; 
-                    padding: 4px 6px;
-                    border-radius: 12px; 
-                }
-                #settings_btn:hover {
-                    background-color: #444;
-                }
-                #settings_btn:pressed {
-                    background-color: #2a2a2a;
-                }
-                QGroupBox {
-                    font-weight: bold;
-                    margin-top: 10px;
-                }
-                QGroupBox::title {
-                    subcontrol-origin: margin;
-                    subcontrol-position: top center;
-                    padding: 0 3px;
-                }
-                QComboBox {
-                    background-color: #2a2a2a;
-                    border: 1px solid #444;
-                    border-radius: 4px;
-                    padding: 4px;
-                }
-                QComboBox::drop-down {
-                    border: none;
-                }
-                QComboBox::down-arrow {
-                    image: url(data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIxNiIgaGVpZ2h0PSIxNiIgdmlld0JveD0iMCAwIDE2IDE2Ij48cGF0aCBmaWxsPSIjRTAwRTAwIiBkPSJNOCA5LjVMMy41IDUuNWwxLTFoNS0xLjIgMS41IDQuNVoiLz48L2N2Zz4=);
-                }
-                QComboBox QAbstractItemView {
-                    background-color: #2a2a2a;
-                    color: #e0e0e0;
-                    border: 1px solid #444;
-                    selection-background-color: #66A3FF;
-                }
-            """
-            self.setStyleSheet(dark_stylesheet)
-        else:
-            light_stylesheet = """
-                QWidget {
-                    background-color: #F0F2F5;
-                    color: #333;
-                }
-                QTabWidget::pane {
-                    border: 1px solid #D4DCE3;
-                    background-color: #F0F2F5;
-                }
-                QTabBar::tab {
-                    background-color: #E8F0F5;
-                    color: #333;
-                    border: 1px solid #D4DCE3;
-                    border-bottom-color: #E8F0F5;
-                    border-top-left-radius: 4px;
-                    border-top-right-radius: 4px;
-                    padding: 8px 12px;
-                }
-                QTabBar::tab:selected {
-                    background-color: #F0F2F5;
-                    border-bottom-color: #F0F2F5;
-                }
-                QTabBar::tab:hover {
-                    background-color: #DAE3EB;
-                }
-                QPushButton {
-                    background-color: #E8F0F5;
-                    border: 1px solid #D4DCE3;
-                    border-radius: 6px;
-                    padding: 6px;
-                    font-family: Arial;
-                    font-size: 14px;
-                    color: #333;
-                }
-                QPushButton:hover {
-                    background-color: #DAE3EB;
-                }
-                QPushButton:pressed {
-                    background-color: #C6D0DB;
-                }
-                QLineEdit {
-                    background-color: #F0F2F5;
-                    border: 1px solid #D4DCE3;
-                    border-radius: 6px;
-                    padding: 6px 10px;
-                    font-family: Arial;
-                    font-size: 14px;
-                    color: #333;
-                }
-                QLineEdit:focus {
-                    border: 1px solid #66A3FF;
-                }
-                #add_tab_btn {
-                    background-color: #66A3FF;
-                    color: white;
-                    border: none;
-                    border-radius: 12px;
-                    font-weight: bold;
-                    font-size: 18px;
-                    padding: 4px 6px;
-                }
-                #add_tab_btn:hover {
-                    background-color: #558ED4;
-                }
-                #add_tab_btn:pressed {
-                    background-color: #4477A9;
-                }
-                #settings_btn {
-                    background-color: transparent; 
-                    border: none;
-                    font-size: 24px; 
-                    color: #333; 
-                    padding: 4px 6px;
-                    border-radius: 12px; 
-                }
-                #settings_btn:hover {
-                    background-color: #DAE3EB;
-                }
-                #settings_btn:pressed {
-                    background-color: #C6D0DB;
-                }
-                QGroupBox {
-                    font-weight: bold;
-                    margin-top: 10px;
-                }
-                QGroupBox::title {
-                    subcontrol-origin: margin;
-                    subcontrol-position: top center;
-                    padding: 0 3px;
-                }
-                QComboBox {
-                    background-color: #E8F0F5;
-                    border: 1px solid #D4DCE3;
-                    border-radius: 4px;
-                    padding: 4px;
-                }
-                QComboBox::drop-down {
-                    border: none;
-                }
-                QComboBox::down-arrow {
-                    image: url(data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIxNiIgaGVpZ2h0PSIxNiIgdmlld0JveD0iMCAwIDE2IDE2Ij48cGF0aCBmaWxsPSIjMzMzMzMzIiBkPSJNOCA5LjVMMy41IDUuNWwxLTFoNS0xLjIgMS41IDQuNVoiLz48L2N2Zz4=);
-                }
-                QComboBox QAbstractItemView {
-                    background-color: #E8F0F5;
-                    color: #333;
-                    border: 1px solid #D4DCE3;
-                    selection-background-color: #66A3FF;
-                }
-            """
-            self.setStyleSheet(light_stylesheet)
+        # Themes live in the themes folder, see theme_engine.py
+        self.themes.apply(mode, self)
 
     def open_settings(self):
         # Open the settings dialog
@@ -488,7 +930,7 @@ class MyWebBrowser(QMainWindow):
         
     # FIX: Safely check for unexpected signal arguments (like tab index or boolean) 
     # and default to a new tab behavior.
-    def add_new_tab(self, qurl_or_bool_or_int=None, title="New Tab"):
+    def add_new_tab(self, qurl_or_bool_or_int=None, title="New Tab", background=False, session_id=None):
         
         qurl = None
         if isinstance(qurl_or_bool_or_int, QUrl):
@@ -500,37 +942,274 @@ class MyWebBrowser(QMainWindow):
             qurl = QUrl('https://google.com/') 
             title = "New Tab"
 
-        # Create a new BrowserTab widget
-        browser_tab = BrowserTab(settings_manager=self)
-        
-        # Use the determined URL
-        browser_tab.browser.setUrl(qurl)
+        # Create a new BrowserTab widget. It starts as a placeholder and only
+        # builds its web view (and starts loading) once it's activated.
+        browser_tab = BrowserTab(settings_manager=self, url=qurl, title=title, lazy=True)
+        browser_tab.session_id = session_id
         
         # Connect the custom signal for opening new tabs
-        browser_tab.page.newTabRequested.connect(self.add_new_tab)
+        browser_tab.newTabRequested.connect(self.open_background_tab)
+        browser_tab.titleChanged.connect(self.tab_title_changed)
+        browser_tab.loadFinished.connect(self.tab_load_finished)
+        browser_tab.iconChanged.connect(self.tab_icon_changed)
+        browser_tab.urlChanged.connect(self.tab_url_changed)
+        self.load_metrics.watch(browser_tab)
+        self.throttler.watch(browser_tab)
         
-        # Add the tab to the QTabWidget
-        i = self.tabs.addTab(browser_tab, title)
-        self.tabs.setCurrentIndex(i)
+        # Recorded before addTab() because adding the first tab already makes it current
+        self.session.tab_opened(browser_tab, self.tabs.count())
+
+        # Add the tab to the tab list
+        # The cached icon shows right away, the page's own replaces it once it loads
+        i = self.tabs.addTab(browser_tab, self.favicons.icon(qurl), title, qurl.toString())
+        if not background:
+            self.tabs.setCurrentIndex(i)
+        return browser_tab
+
+    def open_urls(self, urls):
+        """
+        Opens URLs from the command line (ours or a later start's) as new tabs and brings the window up.
+        """
+        for url in urls:
+            self.add_new_tab(QUrl(url), url)
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def restore_session(self, saved_tabs, active_id):
+        # Every tab comes back lazy, only the active one actually loads
+        active_index = len(saved_tabs) - 1
+        for record in saved_tabs:
+            browser_tab = self.add_new_tab(
+                QUrl(record["url"]), record["title"], background=True, session_id=record["id"]
+            )
+            browser_tab.saved_history = record["history"]
+            if record["id"] == active_id:
+                active_index = self.tabs.indexOf(browser_tab)
+        self.tabs.setCurrentIndex(active_index)
+
+    def open_background_tab(self, qurl):
+        # Middle-clicked links open behind the current tab and stay lazy until looked at
+        self.add_new_tab(qurl, qurl.host() or qurl.toString(), background=True)
 
     def tab_open_doubleclick(self, index):
         if index == -1: # Double-clicked on the empty space
             # Call add_new_tab without arguments, not passing the index
             self.add_new_tab() 
 
+    def tab_load_finished(self, success):
+        browser_tab = self.sender()
+        self.session.tab_updated(browser_tab)
+        # Saves bookmarked pages, or puts up the saved copy when the load failed
+        self.offline_cache.page_loaded(browser_tab, success)
+        if "first loadFinished" not in startup_profiler.marks:
+            startup_profiler.mark("first loadFinished")
+            startup_profiler.write_log(data_path("startup.log"))
+        if success:
+            self.history.add_visit(browser_tab.current_url().toString(), browser_tab.current_title())
+            self.content_index.page_loaded(browser_tab)
+            if browser_tab is self.tabs.currentWidget():
+                self.thumbnail_timer.start()
+
+    def tab_title_changed(self, title):
+        browser_tab = self.sender()
+        index = self.tabs.indexOf(browser_tab)
+        if index != -1:
+            self.tabs.setTabText(index, title)
+        if browser_tab is self.tabs.currentWidget():
+            self.setWindowTitle("Python Browser - " + title)
+
+    def tab_url_changed(self, url):
+        # The tab list filters and groups by URL. current_url() rather than
+        # `url` so an offline snapshot still shows the page's real address.
+        browser_tab = self.sender()
+        self.tabs.setTabUrl(self.tabs.indexOf(browser_tab), browser_tab.current_url().toString())
+
+    def tab_icon_changed(self, icon):
+        browser_tab = self.sender()
+        index = self.tabs.indexOf(browser_tab)
+        if index == -1:
+            return
+        url = browser_tab.current_url()
+        if icon.isNull():
+            # Pages drop their icon when they start loading, keep showing the site's one meanwhile
+            self.tabs.setTabIcon(index, self.favicons.icon(url))
+        else:
+            self.tabs.setTabIcon(index, icon)
+            self.favicons.store(url, icon)
+
+    def favicon_stored(self, host):
+        # Other tabs on the same site (lazy ones included) get the new icon too
+        icon = self.favicons.icon("https://" + host)
+        for index in range(self.tabs.count()):
+            if QUrl(self.tabs.tabUrl(index)).host().lower() == host:
+                self.tabs.setTabIcon(index, icon)
+
     def current_tab_changed(self, index):
-        if self.tabs.currentWidget():
-            qurl = self.tabs.currentWidget().browser.url()
-            title = self.tabs.currentWidget().browser.page().title()
+        browser_tab = self.tabs.currentWidget()
+        if browser_tab:
+            qurl = browser_tab.current_url()
+            title = browser_tab.current_title()
             self.setWindowTitle("Python Browser - " + title)
-            self.tabs.currentWidget().update_url_bar(qurl)
+            browser_tab.update_url_bar(qurl)
+            self.session.tab_activated(browser_tab)
+            # Unfreezes this tab and starts the clock on the one we came from
+            self.throttler.tab_activated(browser_tab)
+            # Building the view is deferred so that flicking through tabs (or the
+            # first tab being added at startup) doesn't load pages nobody looks at.
+            QTimer.singleShot(0, self.load_current_tab)
+
+    def load_current_tab(self):
+        if not self.first_paint_done:
+            return  # first_paint() calls this again
+        # Bring the tab back if it's lazy or was discarded in the background
+        self.tab_lifecycle.activate(self.tabs.currentWidget())
+
+    def eventFilter(self, obj, event):
+        if obj is self.tabs.list_view.viewport() and event.type() == QEvent.Paint:
+            self.first_paint()
+        return super().eventFilter(obj, event)
+
+    def first_paint(self):
+        if self.first_paint_done:
+            return
+        self.first_paint_done = True
+        self.tabs.list_view.viewport().removeEventFilter(self)
+        startup_profiler.mark("first paint")
+        QTimer.singleShot(0, self.load_current_tab)
+
+    def show_tab_stats(self):
+        rows = self.tab_lifecycle.stats()
+        print(f"{'state':<10} {'rss':>10} {'idle':>7} {'disc':>5} {'rest':>5} {'throttled':>9}  title")
+        for row in rows:
+            print(f"{row['state']:<10} {format_bytes(row['rss']):>10} {row['idle_seconds']:>6}s "
+                  f"{row['discards']:>5} {row['restores']:>5} {row['throttled'] or '-':>9}  {row['title']}")
+        discarded = sum(1 for row in rows if row["state"] == "discarded")
+        total = format_bytes(self.tab_lifecycle.total_memory())
+        pages = CustomWebEnginePage.alive
+        print(f"{pages} pages alive, {self.content_blocker.blocked_count} requests blocked")
+        lag = self.watchdog.stats()
+        print(f"event loop lag p50 {lag['p50_ms']:.0f} ms, p99 {lag['p99_ms']:.0f} ms, "
+              f"{lag['stalls']} stalls (worst {lag['worst_ms']:.0f} ms)")
+        self.status.showMessage(f"{len(rows)} tabs, {discarded} discarded, {pages} pages, {total} in use", 5000)
         
+    def toggle_bookmarks(self):
+        self.bookmarks_panel.setVisible(not self.bookmarks_panel.isVisible())
+
+    def bookmark_current_page(self):
+        browser_tab = self.tabs.currentWidget()
+        if browser_tab is None:
+            return
+        url = browser_tab.current_url().toString()
+        # Ctrl+D again takes the bookmark away
+        if self.bookmarks.contains(url):
+            self.bookmarks.remove_url(url)
+            self.status.showMessage("Bookmark removed", 3000)
+        else:
+            self.bookmarks.add(url, browser_tab.current_title())
+            self.status.showMessage("Bookmarked", 3000)
+
+    def save_current_page(self):
+        browser_tab = self.tabs.currentWidget()
+        if browser_tab is not None and self.offline_cache.save(browser_tab):
+            self.status.showMessage("Saving page for offline use...", 3000)
+
+    def snapshot_saved(self, url):
+        self.status.showMessage(f"Saved for offline use: {url}", 3000)
+
+    def open_bookmark(self, qurl):
+        browser_tab = self.tabs.currentWidget()
+        browser_tab.url_bar.setText(qurl.toString())
+        browser_tab.navigate()
+
+    def toggle_content_search(self):
+        self.content_search_panel.setVisible(not self.content_search_panel.isVisible())
+
+    def open_tab_urls(self):
+        return {self.tabs.tabUrl(i) for i in range(self.tabs.count())}
+
+    def open_search_result(self, qurl):
+        # Switch to the page if it's still open somewhere, otherwise open it again
+        for index in range(self.tabs.count()):
+            if self.tabs.tabUrl(index) == qurl.toString():
+                self.tabs.setCurrentIndex(index)
+                return
+        self.add_new_tab(qurl, qurl.host() or qurl.toString())
+
+    def capture_thumbnail(self):
+        browser_tab = self.tabs.currentWidget()
+        if browser_tab is None:
+            return
+        pixmap = capture_tab(browser_tab)
+        if pixmap is not None:
+            self.thumbnails.put(browser_tab.current_url().toString(), pixmap)
+
+    def open_tab_overview(self):
+        # The current tab is the one thing that can be grabbed fresh right now
+        self.thumbnail_timer.stop()
+        self.capture_thumbnail()
+        overview = TabOverview(self.tabs, self.thumbnails, parent=self)
+        overview.exec_()
+        overview.deleteLater()
+
+    def toggle_downloads(self):
+        self.downloads_panel.setVisible(not self.downloads_panel.isVisible())
+
+    def toggle_load_metrics(self):
+        self.load_metrics_panel.setVisible(not self.load_metrics_panel.isVisible())
+
     def close_current_tab(self, index):
         if self.tabs.count() > 1:
+            # removeTab() only takes the widget out of the tab bar, the tab
+            # (and its renderer) has to be freed by hand.
+            browser_tab = self.tabs.widget(index)
+            self.session.tab_closed(browser_tab)
+            self.load_metrics.forget(browser_tab)
+            self.throttler.forget(browser_tab)
             self.tabs.removeTab(index)
+            browser_tab.dispose()
         else:
             self.close()
 
-app = QApplication(sys.argv)
-window = MyWebBrowser()
-app.exec_()
+    def closeEvent(self, event):
+        self.watchdog.stop()
+        self.instance_server.close()
+        # Write out the whole session so the next start doesn't have to replay the journal
+        self.session.close()
+        self.history.close()
+        self.bookmarks.close()
+        self.downloads.close()
+        self.favicons.close()
+        self.content_index.close()
+        self.offline_cache.close()
+        self.perf_sample_percent = self.load_metrics.sample_percent
+        self.download_limit_kbps = int(self.downloads.throttle.rate // 1024)
+        self.save_settings()
+        super().closeEvent(event)
+
+def main():
+    startup_profiler.mark("imports")
+    argv = [arg for arg in sys.argv if arg != "--profile-startup"]
+    # Set before the app exists so data_path() already points at our folder
+    QApplication.setApplicationName("Lovely Browser")
+    # The process model has to be in the environment before QtWebEngine starts.
+    # Command line options (see process_model.py) override the saved settings.
+    settings = QSettings(data_path("settings.ini"), QSettings.IniFormat)
+    argv, process_options = process_model.parse_args(argv, process_model.load_options(settings))
+    process_model.apply(process_options)
+    app = QApplication(argv)
+    startup_profiler.mark("QApplication")
+    window = MyWebBrowser()
+    startup_profiler.mark("window created")
+    # app.arguments() has Qt's own options (-platform ...) taken out
+    urls = urls_from_args(app.arguments()[1:])
+    if urls:
+        window.open_urls(urls)
+    # Started here so stalls are blamed on whatever this event loop was running
+    window.watchdog.start()
+    app.exec_()
+
+
+if __name__ == "__main__":
+    main()
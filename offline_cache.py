@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import time
+
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
+from PyQt5.QtNetwork import QNetworkConfigurationManager
+from PyQt5.QtWebEngineWidgets import QWebEngineDownloadItem
+
+
+def page_key(url):
+    """
+    Snapshots are per URL, ignoring the #fragment.
+    """
+    if not isinstance(url, QUrl):
+        url = QUrl(url)
+    return url.adjusted(QUrl.RemoveFragment).toString()
+
+
+def item_path(item):
+    # path() is deprecated from Qt 5.14 on
+    if hasattr(item, "downloadDirectory"):
+        return os.path.join(item.downloadDirectory(), item.downloadFileName())
+    return item.path()
+
+
+class OfflineCache(QObject):
+    """
+    Pages saved as MHTML snapshots (QWebEnginePage.save), so they can be
+    opened again without the network. Pages are saved on demand, and
+    bookmarked pages are saved automatically (at most once an hour) when
+    they load.
+
+    When a page with a snapshot fails to load, or the network is known to be
+    down, the tab shows the snapshot instead with a banner saying how old it
+    is (see BrowserTab.show_snapshot). The snapshots live in one folder with
+    a JSON index and are kept under `max_bytes` by dropping the least
+    recently used ones.
+    """
+
+    snapshotSaved = pyqtSignal(str)
+
+    # Bookmarked pages aren't saved again on every visit
+    REFRESH_SECONDS = 60 * 60
+
+    def __init__(self, folder, bookmarks=None, max_bytes=200 * 1024 * 1024, auto_save=True, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.bookmarks = bookmarks
+        self.max_bytes = max_bytes
+        self.auto_save = auto_save
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, "index.json")
+        self.index = {}
+        # Temp path -> (key, title) for saves that haven't finished yet
+        self.pending = {}
+        self.network = QNetworkConfigurationManager(self)
+        self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as index_file:
+                self.index = json.load(index_file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: couldn't read the offline page index: {e}")
+        # Snapshots whose file has gone missing are no use
+        self.index = {key: entry for key, entry in self.index.items()
+                      if os.path.exists(os.path.join(self.folder, entry["file"]))}
+
+    def save_index(self):
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump(self.index, index_file)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: couldn't save the offline page index: {e}")
+
+    def online(self):
+        return self.network.isOnline()
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.index.values())
+
+    def snapshot(self, url):
+        """
+        (path, saved_at) of the URL's snapshot, or None. Counts as a use for the LRU.
+        """
+        entry = self.index.get(page_key(url))
+        if entry is None:
+            return None
+        entry["last_used"] = time.time()
+        self.save_index()
+        return os.path.join(self.folder, entry["file"]), entry["saved_at"]
+
+    def page_loaded(self, browser_tab, success):
+        """
+        Called on every loadFinished: keeps bookmarked pages saved and falls back to the snapshot on failure.
+        """
+        if browser_tab.offline_url is not None or browser_tab.is_discarded():
+            return  # That was the snapshot itself loading
+        url = browser_tab.current_url()
+        if url.scheme() not in ("http", "https"):
+            return
+        if success:
+            entry = self.index.get(page_key(url))
+            fresh = entry is not None and time.time() - entry["saved_at"] < self.REFRESH_SECONDS
+            if self.auto_save and not fresh and self.bookmarks is not None and self.bookmarks.contains(url.toString()):
+                self.save(browser_tab)
+            return
+        snapshot = self.snapshot(url)
+        if snapshot is not None:
+            browser_tab.show_snapshot(url, *snapshot)
+
+    def save(self, browser_tab):
+        """
+        Saves the tab's page. Returns False if there's nothing to save (or it's already being saved).
+        """
+        if browser_tab.is_discarded() or browser_tab.offline_url is not None:
+            return False
+        url = browser_tab.current_url()
+        if url.scheme() not in ("http", "https"):
+            return False
+        key = page_key(url)
+        if any(pending_key == key for pending_key, _ in self.pending.values()):
+            return False
+        # Saved next to the old snapshot first, so that one stays usable until this one is done
+        name = hashlib.sha1(key.encode()).hexdigest() + ".mhtml"
+        temp_path = os.path.join(self.folder, name + ".part")
+        self.pending[temp_path] = (key, browser_tab.current_title())
+        browser_tab.page.save(temp_path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+        return True
+
+    def take_download(self, item):
+        """
+        Given every download by DownloadManager first. True if it's one of our snapshots.
+        """
+        path = item_path(item)
+        if path not in self.pending:
+            return False
+        item.finished.connect(lambda: self.download_finished(item, path))
+        item.accept()
+        return True
+
+    def download_finished(self, item, temp_path):
+        key, title = self.pending.pop(temp_path)
+        if item.state() != QWebEngineDownloadItem.DownloadCompleted:
+            print(f"Warning: couldn't save {key} for offline use")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        name = os.path.basename(temp_path)[:-len(".part")]
+        try:
+            os.replace(temp_path, os.path.join(self.folder, name))
+            size = os.path.getsize(os.path.join(self.folder, name))
+        except OSError as e:
+            print(f"Warning: couldn't save {key} for offline use: {e}")
+            return
+        now = time.time()
+        self.index[key] = {"file": name, "title": title, "saved_at": now, "last_used": now, "size": size}
+        self.evict()
+        self.save_index()
+        self.snapshotSaved.emit(key)
+
+    def evict(self):
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes or len(self.index) == 1:
+                break
+            self.remove_entry(key)
+            total -= entry["size"]
+
+    def remove_entry(self, key):
+        entry = self.index.pop(key)
+        try:
+            os.remove(os.path.join(self.folder, entry["file"]))
+        except OSError:
+            pass
+
+    def clear(self):
+        for key in list(self.index):
+            self.remove_entry(key)
+        self.save_index()
+
+    def close(self):
+        self.save_index()
+
+
+if __name__ == "__main__":
+    # Self-test against a local server that gets shut off halfway:
+    #   python offline_cache.py
+    # 1. the LRU keeps the cache under its size budget
+    # 2. a page is loaded from the server and saved as a snapshot
+    # 3. the server is shut down, loading the page again shows the snapshot
+    import sys
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    from main import BrowserTab
+
+    class PageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = (f"<html><head><title>Offline test {self.path}</title></head>"
+                    f"<body><h1>Saved copy of {self.path}</h1></body></html>").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Window:
+        # The bits of MyWebBrowser a BrowserTab needs
+        def __init__(self, profile, folder):
+            from types import SimpleNamespace
+            from history import BrowsingHistory
+            from prefetch import SpeculativeLoader
+            from url_classifier import UrlClassifier
+            self.profiles = SimpleNamespace(profile=profile)
+            self.history = BrowsingHistory(os.path.join(folder, "history.sqlite"))
+            self.bookmarks = None
+            self.favicons = None
+            self.speculative = SpeculativeLoader(profile, mode="off")
+            self.url_classifier = UrlClassifier()
+            self.default_search_engine = "Google"
+            self.offline_cache = None
+
+    app = QApplication(sys.argv[:1])
+    checks = []
+
+    def check(name, ok):
+        checks.append(ok)
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        # 1. LRU eviction, with made-up entries
+        cache = OfflineCache(os.path.join(folder, "lru"), max_bytes=250)
+        for number in range(5):
+            name = f"{number}.mhtml"
+            with open(os.path.join(cache.folder, name), "wb") as snapshot_file:
+                snapshot_file.write(b"x" * 100)
+            cache.index[f"https://example.com/{number}"] = {
+                "file": name, "title": "", "saved_at": number, "last_used": number, "size": 100}
+        cache.snapshot("https://example.com/0")  # Used most recently now
+        cache.evict()
+        check("LRU keeps the budget", cache.total_size() <= 250)
+        check("LRU drops the least recently used",
+              sorted(cache.index) == ["https://example.com/0", "https://example.com/4"])
+
+        # 2 and 3. The real thing, against a local server
+        from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+        from downloads import DownloadManager
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = QUrl(f"http://127.0.0.1:{server.server_address[1]}/article")
+        profile = QWebEngineProfile()
+        window = Window(profile, folder)
+        window.offline_cache = OfflineCache(os.path.join(folder, "pages"), auto_save=False)
+        downloads = DownloadManager(profile, os.path.join(folder, "downloads"))
+        downloads.take_download = window.offline_cache.take_download
+        tab = BrowserTab(settings_manager=window, url=url, lazy=True)
+        tab.resize(800, 600)
+        tab.show()
+        steps = []
+
+        def loaded(success):
+            window.offline_cache.page_loaded(tab, success)
+            if steps:
+                QTimer.singleShot(500, steps.pop(0))
+
+        def save_page():
+            check("page loads from the server", tab.current_title().startswith("Offline test"))
+            check("saving starts", window.offline_cache.save(tab))
+
+        def saved(key):
+            check("snapshot saved", window.offline_cache.snapshot(url) is not None)
+            check("snapshot isn't in the downloads list", not downloads.downloads)
+            server.shutdown()
+            server.server_close()
+            tab.url_bar.setText(url.toString())
+            tab.navigate()
+
+        def offline_loaded():
+            check("snapshot shown after the server went away", tab.offline_url == url)
+            check("banner is showing", tab.offline_banner.isVisible())
+            check("URL bar keeps the page's URL", tab.url_bar.text() == url.toString())
+            check("snapshot has the page's content", tab.current_title().startswith("Offline test"))
+            app.quit()
+
+        steps.extend([save_page, lambda: None, offline_loaded])
+        window.offline_cache.snapshotSaved.connect(saved)
+        tab.loadFinished.connect(loaded)
+        tab.restore()
+        QTimer.singleShot(30000, app.quit)
+        app.exec_()
+
+    print(f"{sum(checks)}/{len(checks)} checks passed")
+    sys.exit(0 if checks and all(checks) else 1)
@@ -0,0 +1,234 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QUrl
+from PyQt5.QtNetwork import QHostInfo
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+
+class SpeculativeLoader(QObject):
+    """
+    Warms up the page the user is probably about to open while they're still
+    typing in the URL bar: the best history match (or whatever the typed text
+    turns into) gets its host resolved and, depending on the mode, a
+    connection opened, the page prefetched into the cache or fully loaded in a
+    hidden page. Everything goes through the shared profile, so the real
+    navigation reuses the warm connection and cache.
+
+    Keystrokes are debounced and every new one cancels the hint in flight.
+    """
+
+    # key: label. Each mode also does everything the ones before it do.
+    MODES = {
+        "off": "Off",
+        "dns": "Look up host names",
+        "preconnect": "Open connections",
+        "prefetch": "Prefetch pages",
+        "prerender": "Load pages in the background",
+    }
+
+    DEBOUNCE_MS = 250
+    # The same origin isn't warmed again for this long
+    REWARM_SECONDS = 30
+    # A navigation counts as hinted if it starts this soon after the hint
+    HINT_WINDOW_SECONDS = 60
+    # A background page that was never used gets unloaded after this
+    PRERENDER_TIMEOUT_MS = 30000
+
+    def __init__(self, profile, history=None, mode="preconnect", parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.history = history
+        self.mode = mode
+
+        self.pending = None
+        self.lookup_id = None
+        self.hint_page = None
+        # origin -> (time it was warmed, mode)
+        self.warmed = {}
+        self.hint_count = 0
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(self.DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.send_hint)
+
+        self.prerender_timer = QTimer(self)
+        self.prerender_timer.setSingleShot(True)
+        self.prerender_timer.setInterval(self.PRERENDER_TIMEOUT_MS)
+        self.prerender_timer.timeout.connect(self.drop_hint_page)
+
+    def text_edited(self, text, typed_url):
+        """
+        Called on every keystroke. `typed_url` is where the text would go if Enter was pressed now.
+        """
+        self.cancel()
+        if self.mode == "off" or not text.strip():
+            return
+        self.pending = (text, typed_url)
+        self.debounce.start()
+
+    def cancel(self):
+        self.debounce.stop()
+        self.pending = None
+        if self.lookup_id is not None:
+            QHostInfo.abortHostLookup(self.lookup_id)
+            self.lookup_id = None
+
+    def candidate(self, text, typed_url):
+        # The top suggestion is what the user is most likely to pick
+        if self.history is not None:
+            matches = self.history.search(text, limit=1)
+            if matches:
+                return QUrl(matches[0].url)
+        return QUrl(typed_url)
+
+    def send_hint(self):
+        if self.pending is None:
+            return
+        url = self.candidate(*self.pending)
+        self.pending = None
+        if url.scheme() not in ("http", "https") or not url.host():
+            return
+        origin = self.origin(url)
+        warmed_at, _ = self.warmed.get(origin, (0, None))
+        if time.monotonic() - warmed_at < self.REWARM_SECONDS and self.mode != "prerender":
+            return
+
+        self.lookup_id = QHostInfo.lookupHost(url.host(), self.lookup_done)
+        if self.mode in ("preconnect", "prefetch"):
+            self.page().setHtml(self.hint_html(url), QUrl("about:blank"))
+        elif self.mode == "prerender":
+            self.page().load(url)
+            self.prerender_timer.start()
+        self.warmed[origin] = (time.monotonic(), self.mode)
+        self.hint_count += 1
+
+    def hint_html(self, url):
+        origin = self.origin(url)
+        html = (f'<link rel="dns-prefetch" href="{origin}">'
+                f'<link rel="preconnect" href="{origin}">')
+        if self.mode == "prefetch":
+            html += f'<link rel="prefetch" href="{url.toString(QUrl.FullyEncoded)}">'
+        return html
+
+    def lookup_done(self, host_info):
+        if host_info.lookupId() == self.lookup_id:
+            self.lookup_id = None
+
+    def page(self):
+        # One hidden page is reused for every hint
+        if self.hint_page is None:
+            self.hint_page = QWebEnginePage(self.profile, self)
+            self.hint_page.setAudioMuted(True)
+        return self.hint_page
+
+    def drop_hint_page(self):
+        if self.hint_page is not None:
+            self.hint_page.deleteLater()
+            self.hint_page = None
+
+    def take_hint(self, url):
+        """
+        Which mode warmed up `url`'s origin recently, or "" if none did. Used
+        to tag the load timings, so only the first load after a hint gets it.
+        """
+        warmed_at, mode = self.warmed.pop(self.origin(url), (0, None))
+        if time.monotonic() - warmed_at < self.HINT_WINDOW_SECONDS:
+            return mode
+        return ""
+
+    @staticmethod
+    def origin(url):
+        return url.adjusted(QUrl.RemovePath | QUrl.RemoveQuery | QUrl.RemoveFragment
+                            | QUrl.RemoveUserInfo).toString()
+
+
+if __name__ == "__main__":
+    # Benchmark: python prefetch.py [rounds] [mode]
+    # Serves pages from a local server that adds a delay to every new
+    # connection (like a far away server's TCP/TLS handshake) and compares
+    # time to first paint with and without a hint sent a moment earlier.
+    import statistics
+    import sys
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+    from PyQt5.QtWidgets import QApplication
+
+    CONNECT_DELAY = 0.3
+    RESPONSE_DELAY = 0.05
+
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            time.sleep(CONNECT_DELAY)
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(RESPONSE_DELAY)
+            body = (f"<html><body><h1>{self.path}</h1>"
+                    + "<p>Lorem ipsum dolor sit amet.</p>" * 50 + "</body></html>").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    mode = sys.argv[2] if len(sys.argv) > 2 else "preconnect"
+
+    app = QApplication(sys.argv[:1])
+    results = {True: [], False: []}
+    runs = [hinted for _ in range(rounds) for hinted in (False, True)]
+    first_paint_js = "(performance.getEntriesByName('first-contentful-paint')[0] || {}).startTime"
+
+    def run_next():
+        if not runs:
+            for hinted in (False, True):
+                values = results[hinted]
+                label = f"with {mode} hint" if hinted else "without hint"
+                if values:
+                    print(f"{label:<24} median {statistics.median(values):.0f} ms, "
+                          f"worst {max(values):.0f} ms ({len(values)} loads)")
+            app.quit()
+            return
+        hinted = runs.pop(0)
+        # A fresh server (new port, so a new origin) and a fresh in-memory
+        # profile every time, so nothing is left over from the last round
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = QUrl(f"http://127.0.0.1:{server.server_address[1]}/page.html")
+        profile = QWebEngineProfile()
+        loader = SpeculativeLoader(profile, mode=mode)
+        page = QWebEnginePage(profile)
+
+        def finished(success):
+            page.runJavaScript(first_paint_js, record)
+
+        def record(first_paint):
+            # startTime is measured from when the navigation started
+            if first_paint:
+                results[hinted].append(first_paint)
+            server.shutdown()
+            page.deleteLater()
+            loader.deleteLater()
+            QTimer.singleShot(100, run_next)
+
+        def navigate():
+            page.load(url)
+
+        page.loadFinished.connect(finished)
+        if hinted:
+            loader.text_edited(url.toString(), url.toString())
+            # Give the hint the kind of head start typing would
+            QTimer.singleShot(loader.DEBOUNCE_MS + 500, navigate)
+        else:
+            navigate()
+
+    QTimer.singleShot(0, run_next)
+    app.exec_()
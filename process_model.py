@@ -0,0 +1,197 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from procstats import format_bytes, process_rss, process_tree
+
+# Chromium picks its process model from QTWEBENGINE_CHROMIUM_FLAGS, which is
+# only read when the first QtWebEngine object starts up. So all of this has
+# to happen before the QApplication exists and changes need a restart.
+
+# Always passed, whatever the settings say
+BASE_FLAGS = ["--enable-proprietary-media-audios"]
+
+# key: (label, flags)
+PROCESS_MODELS = {
+    "default": ("One per site instance (default)", []),
+    "per-site": ("One per site", ["--process-per-site"]),
+    "single": ("Single process (unstable)", ["--single-process"]),
+}
+
+GPU_MODES = {
+    "auto": ("Automatic", []),
+    "gpu-raster": ("GPU rasterization", ["--enable-gpu-rasterization"]),
+    "software-raster": ("Software rasterization", ["--disable-gpu-rasterization"]),
+    "off": ("No GPU", ["--disable-gpu"]),
+}
+
+DEFAULT_OPTIONS = {
+    "model": "default",
+    "renderer_limit": 0,
+    "gpu": "auto",
+    "site_isolation": True,
+}
+
+
+def chromium_flags(options):
+    """
+    Turns the process options into a list of Chromium switches.
+    """
+    flags = list(BASE_FLAGS)
+    flags += PROCESS_MODELS.get(options["model"], PROCESS_MODELS["default"])[1]
+    if options["renderer_limit"] > 0:
+        flags.append(f"--renderer-process-limit={options['renderer_limit']}")
+    flags += GPU_MODES.get(options["gpu"], GPU_MODES["auto"])[1]
+    if not options["site_isolation"]:
+        # Lets cross-site frames share a renderer with their page
+        flags.append("--disable-site-isolation-trials")
+    return flags
+
+
+def load_options(settings):
+    return {
+        "model": settings.value("process/model", DEFAULT_OPTIONS["model"]),
+        "renderer_limit": settings.value("process/renderer_limit", DEFAULT_OPTIONS["renderer_limit"], type=int),
+        "gpu": settings.value("process/gpu", DEFAULT_OPTIONS["gpu"]),
+        "site_isolation": settings.value("process/site_isolation", DEFAULT_OPTIONS["site_isolation"], type=bool),
+    }
+
+
+def save_options(settings, options):
+    for key, value in options.items():
+        settings.setValue(f"process/{key}", value)
+
+
+def parse_args(argv, options):
+    """
+    Picks the process options out of the command line, e.g.
+    --process-model=per-site --renderer-limit=4 --gpu=off --no-site-isolation
+    Returns (argv without them, options with them applied).
+    """
+    options = dict(options)
+    remaining = []
+    for arg in argv:
+        name, _, value = arg.partition("=")
+        if name == "--process-model" and value in PROCESS_MODELS:
+            options["model"] = value
+        elif name == "--renderer-limit" and value.isdigit():
+            options["renderer_limit"] = int(value)
+        elif name == "--gpu" and value in GPU_MODES:
+            options["gpu"] = value
+        elif arg == "--no-site-isolation":
+            options["site_isolation"] = False
+        elif name in ("--process-model", "--renderer-limit", "--gpu"):
+            print(f"Warning: ignoring {arg}")
+        else:
+            remaining.append(arg)
+    return remaining, options
+
+
+def apply(options):
+    """
+    Puts the flags into the environment. Flags already set there by hand are kept (and go last, so they win).
+    """
+    flags = chromium_flags(options)
+    user_flags = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "")
+    os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(flags + user_flags.split())
+    return flags
+
+
+def run_bench_child(tab_count, url):
+    """
+    Runs inside a fresh process (the flags only apply at startup): opens
+    `tab_count` pages and prints the RSS and process count once they've loaded.
+    """
+    from PyQt5.QtCore import QTimer, QUrl
+    from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+    profile = QWebEngineProfile()
+    pages = []
+    loaded = []
+
+    def report():
+        pids = process_tree(os.getpid())
+        rss = sum(process_rss(pid) or 0 for pid in pids)
+        print(json.dumps({"processes": len(pids), "rss": rss, "loaded": len(loaded)}))
+        app.quit()
+
+    def page_loaded(success):
+        loaded.append(success)
+        if len(loaded) == tab_count:
+            # Let renderers settle before measuring
+            QTimer.singleShot(2000, report)
+
+    for i in range(tab_count):
+        page = QWebEnginePage(profile)
+        page.loadFinished.connect(page_loaded)
+        page.load(QUrl(f"{url}/page{i}.html"))
+        pages.append(page)
+    # Don't wait forever if some page never finishes
+    QTimer.singleShot(60000, report)
+    app.exec_()
+
+
+def run_bench(tab_count):
+    """
+    Opens `tab_count` tabs against a local server in each process model and
+    prints the total memory and process count.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class PageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = (f"<html><head><title>{self.path}</title></head><body><h1>{self.path}</h1>"
+                    + "<p>Lorem ipsum dolor sit amet.</p>" * 200
+                    + "<script>document.body.dataset.n = [...Array(10000).keys()].join()</script>"
+                    + "</body></html>").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    modes = [
+        ("default", []),
+        ("per-site", ["--process-model=per-site"]),
+        ("limit 4", ["--renderer-limit=4"]),
+        ("per-site, no isolation", ["--process-model=per-site", "--no-site-isolation"]),
+        ("single", ["--process-model=single"]),
+    ]
+    print(f"{tab_count} tabs against {url}")
+    print(f"{'mode':<24} {'processes':>9} {'rss':>10} {'time':>7}")
+    for name, args in modes:
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--bench-child", str(tab_count), url] + args,
+            capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - start
+        try:
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            print(f"{name:<24} failed: {result.stderr.strip()[-200:]}")
+            continue
+        print(f"{name:<24} {stats['processes']:>9} {format_bytes(stats['rss']):>10} {elapsed:>6.1f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    # python process_model.py --bench [tab count]
+    args, bench_options = parse_args(sys.argv[1:], DEFAULT_OPTIONS)
+    if args[:1] == ["--bench-child"]:
+        apply(bench_options)
+        run_bench_child(int(args[1]), args[2])
+    else:
+        run_bench(int(args[1]) if len(args) > 1 else 20)
@@ -0,0 +1,121 @@
+import os
+
+# psutil is optional, we only use it if it's installed.
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def process_rss(pid):
+    """
+    Returns the resident memory of a process in bytes, or None if it can't be read.
+    Uses psutil when available and falls back to /proc on Linux.
+    """
+    if not pid:
+        return None
+
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def process_cpu_time(pid):
+    """
+    Returns the CPU time (user + system) a process has used in seconds, or None if it can't be read.
+    """
+    if not pid:
+        return None
+
+    if psutil is not None:
+        try:
+            times = psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            # utime and stime are the 12th and 13th fields after the name
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def browser_rss(renderer_pids=()):
+    """
+    Total resident memory of the browser: this process plus its helper
+    processes (renderers, GPU process...). Without psutil we can't list
+    children, so only the given renderer pids are added up.
+    """
+    if psutil is not None:
+        try:
+            me = psutil.Process(os.getpid())
+            total = me.memory_info().rss
+            for child in me.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            return total
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    total = process_rss(os.getpid())
+    if total is None:
+        return None
+    # Several tabs can share a renderer, so count each pid once.
+    for pid in set(renderer_pids):
+        total += process_rss(pid) or 0
+    return total
+
+
+def process_tree(pid):
+    """
+    Returns pid plus the pids of all its child processes, recursively.
+    """
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return [pid]
+
+    # Without psutil, read every process's parent out of /proc (Linux only)
+    children = {}
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return [pid]
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/stat") as stat_file:
+                # The name in brackets can contain spaces, so split after it
+                parent = int(stat_file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    pids = [pid]
+    for current in pids:
+        pids.extend(children.get(current, ()))
+    return pids
+
+
+def format_bytes(size):
+    if size is None:
+        return "?"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,179 @@
+import os
+
+from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+
+
+class ProfileManager:
+    """
+    Owns the one named QWebEngineProfile that every tab shares, so the HTTP
+    cache and cookies are kept on disk between runs instead of living in the
+    off-the-record default profile.
+    """
+
+    CACHE_TYPES = {
+        "Disk": QWebEngineProfile.DiskHttpCache,
+        "Memory": QWebEngineProfile.MemoryHttpCache,
+        "Off": QWebEngineProfile.NoCache,
+    }
+
+    def __init__(self, name, storage_dir):
+        self.storage_dir = storage_dir
+        # Parented to the application so it outlives every page that uses it
+        self.profile = QWebEngineProfile(name, QCoreApplication.instance())
+        self.profile.setPersistentStoragePath(os.path.join(storage_dir, "storage"))
+        self.profile.setCachePath(os.path.join(storage_dir, "cache"))
+
+    def configure(self, cache_type="Disk", cache_size_mb=256, persistent_cookies=True):
+        self.profile.setHttpCacheType(self.CACHE_TYPES.get(cache_type, QWebEngineProfile.DiskHttpCache))
+        # 0 lets Chromium pick the size itself
+        self.profile.setHttpCacheMaximumSize(cache_size_mb * 1024 * 1024)
+        if persistent_cookies:
+            self.profile.setPersistentCookiesPolicy(QWebEngineProfile.AllowPersistentCookies)
+        else:
+            self.profile.setPersistentCookiesPolicy(QWebEngineProfile.NoPersistentCookies)
+
+    def clear_cache(self):
+        self.profile.clearHttpCache()
+
+    def cache_usage(self):
+        """
+        Bytes currently used by the disk cache.
+        """
+        total = 0
+        for folder, _, files in os.walk(self.profile.cachePath()):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(folder, name))
+                except OSError:
+                    pass
+        return total
+
+
+if __name__ == "__main__":
+    # Repeat-load benchmark: python profile_manager.py [runs]
+    # A local static-file server serves a page with ASSETS stylesheets,
+    # scripts and images, taking DELAY_MS for every request like a far-away
+    # server would. The page is loaded through the shared profile twice, cold
+    # and then warm (like opening it again in another tab), once with the
+    # disk cache on and once with caching off.
+    import statistics
+    import sys
+    import tempfile
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from PyQt5.QtCore import QTimer, QUrl
+    from PyQt5.QtWebEngineWidgets import QWebEnginePage
+    from PyQt5.QtWidgets import QApplication
+
+    from procstats import format_bytes
+
+    ASSETS = 30
+    DELAY_MS = 20
+    PADDING = "/*" + "x" * 20000 + "*/\n"
+
+    served = [0]
+
+    def page_html():
+        tags = []
+        for number in range(ASSETS):
+            kind = number % 3
+            if kind == 0:
+                tags.append(f'<link rel="stylesheet" href="style{number}.css">')
+            elif kind == 1:
+                tags.append(f'<script src="script{number}.js"></script>')
+            else:
+                tags.append(f'<img src="image{number}.svg" width="20" height="20">')
+        return f"<html><head><title>cache bench</title></head><body>{''.join(tags)}</body></html>"
+
+    class StaticHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            served[0] += 1
+            time.sleep(DELAY_MS / 1000)
+            # /<run>/<file>, every run gets its own URLs so its first load is really cold
+            name = self.path.rsplit("/", 1)[1]
+            if name.endswith(".css"):
+                body, content_type = PADDING + "p { margin: 1px; }", "text/css"
+            elif name.endswith(".js"):
+                body, content_type = PADDING + "var loaded = (window.loaded || 0) + 1;", "application/javascript"
+            elif name.endswith(".svg"):
+                body = ('<svg xmlns="http://www.w3.org/2000/svg" width="20" height="20">'
+                        '<rect width="20" height="20" fill="tomato"/></svg>')
+                content_type = "image/svg+xml"
+            else:
+                body, content_type = page_html(), "text/html"
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "max-age=3600")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StaticHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    app = QApplication(sys.argv[:1])
+    folder = tempfile.TemporaryDirectory()
+    modes = [("Disk", "disk cache on"), ("Off", "cache off")]
+    # Mode -> {"cold": [ms...], "warm": [...]} and the requests each load made
+    times = {mode: {"cold": [], "warm": []} for mode, _ in modes}
+    requests = {mode: {"cold": [], "warm": []} for mode, _ in modes}
+    steps = []
+    pages = []
+
+    def timed_load(mode, manager, url, which):
+        def step():
+            page = QWebEnginePage(manager.profile)
+            pages.append(page)
+            served_before = served[0]
+            start = time.perf_counter()
+
+            def finished(ok):
+                page.loadFinished.disconnect(finished)
+                times[mode][which].append((time.perf_counter() - start) * 1000)
+                requests[mode][which].append(served[0] - served_before)
+                QTimer.singleShot(0, next_step)
+
+            page.loadFinished.connect(finished)
+            page.load(QUrl(url))
+        return step
+
+    def next_step():
+        if steps:
+            steps.pop(0)()
+        else:
+            app.quit()
+
+    managers = []
+    for mode, _ in modes:
+        manager = ProfileManager(f"cache-bench-{mode.lower()}", os.path.join(folder.name, mode))
+        manager.configure(cache_type=mode)
+        managers.append(manager)
+        for run in range(runs):
+            url = f"{base_url}/{mode}-{run}/index.html"
+            steps.append(timed_load(mode, manager, url, "cold"))
+            steps.append(timed_load(mode, manager, url, "warm"))
+
+    QTimer.singleShot(0, next_step)
+    app.exec_()
+    server.shutdown()
+
+    print(f"{ASSETS} assets, {DELAY_MS} ms per request, median of {runs} runs")
+    print(f"{'':<15} {'cold':>9} {'warm':>9}  requests cold/warm")
+    for mode, label in modes:
+        if not times[mode]["warm"]:
+            print(f"{label:<15} didn't finish")
+            continue
+        cold = statistics.median(times[mode]["cold"])
+        warm = statistics.median(times[mode]["warm"])
+        print(f"{label:<15} {cold:7.0f} ms {warm:7.0f} ms  "
+              f"{statistics.median(requests[mode]['cold']):.0f}/{statistics.median(requests[mode]['warm']):.0f}")
+    print(f"disk cache size afterwards: {format_bytes(managers[0].cache_usage())}")
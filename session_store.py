@@ -0,0 +1,235 @@
+import base64
+import json
+import os
+
+from PyQt5.QtCore import QByteArray, QDataStream, QIODevice, QObject, QTimer, qCompress, qUncompress
+
+
+def serialize_history(page):
+    """
+    Packs a page's back/forward history (QWebEngineHistory) into compressed bytes.
+    """
+    data = QByteArray()
+    stream = QDataStream(data, QIODevice.WriteOnly)
+    stream << page.history()
+    return bytes(qCompress(data))
+
+
+def restore_history(page, blob):
+    """
+    Loads history saved with serialize_history() into a page. This also
+    navigates the page to the entry that was current.
+    """
+    data = qUncompress(QByteArray(blob))
+    stream = QDataStream(data, QIODevice.ReadOnly)
+    stream >> page.history()
+
+
+class SessionStore(QObject):
+    """
+    Keeps the open tabs on disk so they come back after a restart.
+
+    Every change (tab opened, closed, moved, navigated, activated) is appended
+    to a journal file instead of rewriting the whole session. Writes are
+    batched by a short timer, and every COMPACT_EVERY records the journal is
+    folded into a snapshot file and emptied.
+    """
+
+    FLUSH_DELAY_MS = 1000
+    COMPACT_EVERY = 200
+
+    def __init__(self, base_path, parent=None):
+        super().__init__(parent)
+        self.snapshot_path = base_path + ".json"
+        self.journal_path = base_path + ".journal"
+
+        # In-memory copy of the session, so compaction never has to touch the tabs
+        self.order = []
+        self.records = {}
+        self.active_id = None
+        self.next_id = 1
+
+        self.pending = []
+        self.pending_updates = {}
+        self.journal_records = 0
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.FLUSH_DELAY_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    # --- Loading ---------------------------------------------------------
+
+    def load(self):
+        """
+        Reads the snapshot and replays the journal on top of it.
+        Returns the tab records in order and the id of the active tab.
+        """
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            for record in snapshot.get("tabs", []):
+                self.records[record["id"]] = record
+                self.order.append(record["id"])
+            self.active_id = snapshot.get("active")
+            self.next_id = snapshot.get("next_id", 1)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        damaged = False
+        try:
+            with open(self.journal_path, encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        self.apply(json.loads(line))
+                    except (ValueError, KeyError, IndexError):
+                        # Half-written last line after a crash, just skip it
+                        damaged = True
+                        continue
+                    self.journal_records += 1
+        except OSError:
+            pass
+
+        if self.order:
+            self.next_id = max(self.next_id, max(self.order) + 1)
+        if damaged:
+            # Otherwise the next flush appends its first record to the broken
+            # line and that record is lost on the next load too
+            self.compact()
+
+        tabs = []
+        for tab_id in self.order:
+            record = dict(self.records[tab_id])
+            history = record.pop("history", None)
+            record["history"] = base64.b64decode(history) if history else None
+            tabs.append(record)
+        return tabs, self.active_id
+
+    def apply(self, entry):
+        op = entry["op"]
+        if op == "open":
+            record = {"id": entry["id"], "url": entry["url"], "title": entry["title"]}
+            self.records[entry["id"]] = record
+            self.order.insert(min(entry["index"], len(self.order)), entry["id"])
+        elif op == "update":
+            record = self.records.get(entry["id"])
+            if record is not None:
+                record["url"] = entry["url"]
+                record["title"] = entry["title"]
+                # No history (an offline snapshot, say) replaces the old one too,
+                # or restoring would go back to a page the tab has left
+                if entry.get("history"):
+                    record["history"] = entry["history"]
+                else:
+                    record.pop("history", None)
+        elif op == "close":
+            if entry["id"] in self.records:
+                del self.records[entry["id"]]
+                self.order.remove(entry["id"])
+        elif op == "move":
+            self.order.insert(entry["to"], self.order.pop(entry["from"]))
+        elif op == "active":
+            self.active_id = entry["id"]
+
+    # --- Recording changes -----------------------------------------------
+
+    def record(self, entry):
+        self.apply(entry)
+        if entry["op"] == "update" and entry["id"] in self.pending_updates:
+            # Only the latest update of a tab is worth writing
+            self.pending[self.pending_updates[entry["id"]]] = entry
+        else:
+            if entry["op"] == "update":
+                self.pending_updates[entry["id"]] = len(self.pending)
+            self.pending.append(entry)
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def tab_opened(self, browser_tab, index):
+        if getattr(browser_tab, "session_id", None) in self.records:
+            return  # Restored from this session, already known
+        browser_tab.session_id = self.next_id
+        self.next_id += 1
+        self.record({
+            "op": "open",
+            "id": browser_tab.session_id,
+            "index": index,
+            "url": browser_tab.current_url().toString(),
+            "title": browser_tab.current_title(),
+        })
+
+    def tab_updated(self, browser_tab):
+        if getattr(browser_tab, "session_id", None) not in self.records:
+            return
+        history = browser_tab.history_state()
+        self.record({
+            "op": "update",
+            "id": browser_tab.session_id,
+            "url": browser_tab.current_url().toString(),
+            "title": browser_tab.current_title(),
+            "history": base64.b64encode(history).decode("ascii") if history else None,
+        })
+
+    def tab_closed(self, browser_tab):
+        if getattr(browser_tab, "session_id", None) in self.records:
+            self.record({"op": "close", "id": browser_tab.session_id})
+
+    def tab_moved(self, from_index, to_index):
+        if 0 <= from_index < len(self.order) and 0 <= to_index < len(self.order):
+            self.record({"op": "move", "from": from_index, "to": to_index})
+
+    def tab_activated(self, browser_tab):
+        tab_id = getattr(browser_tab, "session_id", None)
+        if tab_id in self.records and tab_id != self.active_id:
+            self.record({"op": "active", "id": tab_id})
+
+    # --- Writing ---------------------------------------------------------
+
+    def flush(self):
+        if not self.pending:
+            return
+        lines = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in self.pending)
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as journal_file:
+                journal_file.write(lines)
+        except OSError as e:
+            print(f"Warning: couldn't write the session journal: {e}")
+            return
+        self.journal_records += len(self.pending)
+        self.pending = []
+        self.pending_updates = {}
+
+        if self.journal_records >= self.COMPACT_EVERY:
+            self.compact()
+
+    def compact(self):
+        """
+        Writes the whole session to the snapshot file and empties the journal.
+        """
+        self.flush_timer.stop()
+        # Anything still pending is already in self.records
+        self.pending = []
+        self.pending_updates = {}
+
+        snapshot = {
+            "active": self.active_id,
+            "next_id": self.next_id,
+            "tabs": [self.records[tab_id] for tab_id in self.order],
+        }
+        temp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            os.replace(temp_path, self.snapshot_path)
+            # Only drop the journal once the snapshot is safely in place
+            open(self.journal_path, "w").close()
+        except OSError as e:
+            print(f"Warning: couldn't write the session snapshot: {e}")
+            return
+        self.journal_records = 0
+
+    def close(self):
+        self.compact()
@@ -0,0 +1,202 @@
+# Single-instance mode: when the browser is already running, `python main.py
+# some-url` hands the URL over to it (it opens as a new tab) and exits
+# instead of booting a second Qt + WebEngine. main.py calls hand_off()
+# before it imports anything heavy, so this file only uses QtCore and
+# QtNetwork. Pass --new-instance to start a separate browser anyway.
+import getpass
+import json
+import os
+import sys
+
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+CONNECT_TIMEOUT_MS = 300
+REPLY_TIMEOUT_MS = 2000
+
+
+def server_name():
+    # One browser per user, the socket lives in the temp folder on Unix
+    return f"lovely-browser-{getpass.getuser()}"
+
+
+# Qt's own options that take the next argument as their value, like
+# `-platform offscreen`. QApplication strips them out, but hand_off() runs
+# before there is one.
+QT_VALUE_OPTIONS = {
+    "-platform", "-platformpluginpath", "-platformtheme", "-plugin", "-style", "-stylesheet", "-session",
+    "-qwindowgeometry", "-qwindowicon", "-qwindowtitle", "-display", "-geometry", "-title", "-name",
+}
+
+
+def urls_from_args(args):
+    """
+    URLs (or files, relative to where we were started from) given on the command line.
+    """
+    urls = []
+    args = iter(args)
+    for arg in args:
+        if arg.startswith("-"):
+            # Qt takes --style as well as -style
+            if "=" not in arg and "-" + arg.lstrip("-") in QT_VALUE_OPTIONS:
+                next(args, None)
+            continue
+        urls.append(QUrl.fromUserInput(arg, os.getcwd()).toString())
+    return urls
+
+
+def send(urls, name=None):
+    """
+    Sends the URLs to the running browser. False if there isn't one (or it didn't answer).
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name or server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    socket.write(json.dumps({"urls": urls}).encode() + b"\n")
+    socket.flush()
+    # Wait for the answer so we only exit once the tabs are really on their way
+    answered = socket.waitForReadyRead(REPLY_TIMEOUT_MS) and socket.readLine().trimmed() == b"ok"
+    socket.disconnectFromServer()
+    return answered
+
+
+def hand_off(args):
+    """
+    Called first thing by main.py with the command line arguments. True
+    means a running browser took the URLs and this process can exit.
+    """
+    if "--new-instance" in args:
+        return False
+    return send(urls_from_args(args))
+
+
+class InstanceServer(QObject):
+    """
+    The running browser's end: listens for other starts and emits the URLs they were given.
+    """
+
+    # List of URL strings, empty if the browser was just started again without any
+    openRequested = pyqtSignal(list)
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self.name = name or server_name()
+        self.server = QLocalServer(self)
+        # Other users on the machine can't open tabs in our browser
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.new_connection)
+        self.buffers = {}
+
+    def listen(self):
+        if self.server.listen(self.name):
+            return True
+        # A browser that crashed leaves its socket file behind. Only remove
+        # it when nobody answers, or we'd cut off a browser that's running.
+        probe = QLocalSocket()
+        probe.connectToServer(self.name)
+        if probe.waitForConnected(CONNECT_TIMEOUT_MS):
+            probe.disconnectFromServer()
+            return False  # Another browser (started with --new-instance) has it
+        QLocalServer.removeServer(self.name)
+        if self.server.listen(self.name):
+            return True
+        print(f"Warning: couldn't listen for other browser starts: {self.server.errorString()}")
+        return False
+
+    def new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.closed(socket))
+
+    def read(self, socket):
+        self.buffers[socket] += bytes(socket.readAll())
+        if not self.buffers[socket].endswith(b"\n"):
+            return
+        try:
+            urls = [str(url) for url in json.loads(self.buffers[socket])["urls"]]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Warning: got a bad message from another browser start: {e!r}")
+            socket.disconnectFromServer()
+            return
+        self.buffers[socket] = b""
+        socket.write(b"ok\n")
+        socket.flush()
+        self.openRequested.emit(urls)
+
+    def closed(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def close(self):
+        self.server.close()
+
+
+if __name__ == "__main__":
+    # Hand-off latency vs cold start: python single_instance.py --bench [runs]
+    # Hand-off runs a fresh interpreter that sends a URL to a server in this
+    # process and times it until it exits. Cold start runs main.py with
+    # --new-instance --profile-startup and times it until its first paint.
+    import statistics
+    import subprocess
+    import threading
+    import time
+
+    if sys.argv[1:2] == ["--send"]:
+        # The client side of the benchmark
+        sys.exit(0 if send(sys.argv[3:], sys.argv[2]) else 1)
+
+    from PyQt5.QtCore import QCoreApplication, QTimer
+
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    app = QCoreApplication(sys.argv[:1])
+    name = f"lovely-browser-bench-{os.getpid()}"
+    server = InstanceServer(name)
+    server.listen()
+    received = []
+    server.openRequested.connect(received.extend)
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {"hand-off": [], "cold start": []}
+
+    def time_hand_off(number):
+        # Runs in a thread with subprocess, the server answers from the event loop
+        start = time.perf_counter()
+        code = subprocess.call([sys.executable, os.path.abspath(__file__), "--send", name,
+                                f"https://example.com/{number}"])
+        if code == 0:
+            results["hand-off"].append((time.perf_counter() - start) * 1000)
+
+    def time_cold_start():
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(here, "main.py"), "--new-instance", "--profile-startup"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, cwd=here,
+        )
+        try:
+            for line in process.stdout:
+                if line.startswith("[startup] first paint"):
+                    results["cold start"].append((time.perf_counter() - start) * 1000)
+                    break
+        finally:
+            process.terminate()
+            process.wait()
+
+    def run_all():
+        for number in range(runs):
+            time_hand_off(number)
+        for _ in range(min(runs, 3)):
+            time_cold_start()
+        QTimer.singleShot(0, app.quit)
+
+    threading.Thread(target=run_all, daemon=True).start()
+    app.exec_()
+    server.close()
+
+    print(f"{len(received)} of {runs} URLs handed off")
+    for label, times in results.items():
+        if times:
+            print(f"{label:<12} median {statistics.median(times):7.0f} ms, best {min(times):7.0f} ms ({len(times)} runs)")
+        else:
+            print(f"{label:<12} couldn't be measured here")
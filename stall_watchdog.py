@@ -0,0 +1,268 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+def frame_label(frame):
+    code = frame.f_code
+    # co_qualname (Python 3.11+) gives MyWebBrowser.toggle_theme instead of just toggle_theme
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{os.path.basename(code.co_filename)}:{name}"
+
+
+class StallWatchdog(QObject):
+    """
+    Finds out where the GUI freezes.
+
+    A timer on the GUI thread ticks every HEARTBEAT_MS and a helper thread
+    watches it. When a tick is late by more than `stall_ms`, the helper
+    starts sampling the GUI thread's Python stack (sys._current_frames) every
+    SAMPLE_MS until the ticks come back. Each sample is charged to the
+    handler the event loop was running (MyWebBrowser.toggle_theme,
+    BrowserTab.navigate...), or "(Qt)" when there was no Python code on the
+    stack, i.e. the time went into Qt/Chromium itself.
+
+    Every stall gets a line in `log_path` (rotated at MAX_LOG_BYTES) and all
+    the samples are added to `folded_path` in the folded stack format that
+    flamegraph.pl and speedscope read.
+
+    While nothing is stalled the cost is a timer tick every HEARTBEAT_MS and
+    a few thread wake-ups a second, see `python stall_watchdog.py`.
+    """
+
+    HEARTBEAT_MS = 100
+    SAMPLE_MS = 5
+    MAX_DEPTH = 64
+    MAX_LOG_BYTES = 1024 * 1024
+    LOG_BACKUPS = 3
+    # Event loop lag of the last minute or so, for stats()
+    LAG_HISTORY = 1200
+
+    def __init__(self, log_path, folded_path, stall_ms=250, parent=None):
+        super().__init__(parent)
+        self.log_path = log_path
+        self.folded_path = folded_path
+        self.stall_ms = stall_ms
+        self.gui_thread = threading.get_ident()
+        # The code object that runs app.exec_(), set by start()
+        self.loop_code = None
+
+        # Written by the GUI thread, read by the sampler. Plain attribute
+        # assignments, so the GIL is all the locking they need.
+        self.beats = 0
+        self.last_beat = time.monotonic()
+        self.lags = deque(maxlen=self.LAG_HISTORY)
+
+        # Only touched by the sampler thread (and stats(), which just reads)
+        self.stall_count = 0
+        self.worst_stall_ms = 0
+        self.folded = Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.HEARTBEAT_MS)
+        self.timer.timeout.connect(self.beat)
+
+    def start(self):
+        """
+        Call right before app.exec_(): whatever that function's event loop calls is what gets blamed.
+        """
+        if self.stall_ms <= 0 or self.thread is not None:
+            return
+        self.loop_code = sys._getframe(1).f_code
+        self.last_beat = time.monotonic()
+        self.timer.start()
+        self.thread = threading.Thread(target=self.run, name="stall-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def beat(self):
+        now = time.monotonic()
+        self.lags.append(max(0.0, (now - self.last_beat) * 1000 - self.HEARTBEAT_MS))
+        self.last_beat = now
+        self.beats += 1
+
+    # --- Sampler thread ---------------------------------------------------------
+
+    def run(self):
+        # Sampling starts a bit before a stall counts as one, so the first
+        # part of it isn't missing from the samples
+        sample_after = (self.HEARTBEAT_MS + self.stall_ms / 2) / 1000
+        while not self.stop_event.is_set():
+            # Sleeps right up to the moment the next tick would be late, so
+            # an idle browser only wakes this thread a few times a second
+            wait = self.last_beat + sample_after - time.monotonic()
+            if wait > 0:
+                self.stop_event.wait(wait)
+            else:
+                self.sample_stall(self.beats, self.last_beat)
+
+    def sample_stall(self, beats, last_beat):
+        samples = Counter()
+        while self.beats == beats and not self.stop_event.wait(self.SAMPLE_MS / 1000):
+            frame = sys._current_frames().get(self.gui_thread)
+            if frame is not None:
+                samples[self.stack(frame)] += 1
+        stall_ms = (self.last_beat - last_beat) * 1000 - self.HEARTBEAT_MS
+        if stall_ms >= self.stall_ms and samples:
+            self.record(stall_ms, samples)
+
+    def stack(self, frame):
+        """
+        The GUI thread's stack as a tuple of labels, from the handler the event loop called down to the current line.
+        """
+        frames = []
+        while frame is not None and frame.f_code is not self.loop_code:
+            frames.append(frame)
+            frame = frame.f_back
+        if frame is None:
+            # Not called from the event loop we know (a nested one, or start()
+            # wasn't used), so keep the whole stack
+            frames = frames[-self.MAX_DEPTH:]
+        elif not frames:
+            return ("(Qt)",)
+        return tuple(frame_label(f) for f in reversed(frames[:self.MAX_DEPTH]))
+
+    def record(self, stall_ms, samples):
+        self.stall_count += 1
+        self.worst_stall_ms = max(self.worst_stall_ms, stall_ms)
+        self.folded.update(samples)
+
+        total = sum(samples.values())
+        by_handler = Counter()
+        for stack, count in samples.items():
+            by_handler[stack[0]] += count
+        blame = ", ".join(f"{handler} {count * 100 // total}%" for handler, count in by_handler.most_common(3))
+        hottest = ";".join(samples.most_common(1)[0][0])
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} stall {stall_ms:.0f} ms, "
+                f"{total} samples: {blame} | hottest: {hottest}")
+        print(f"Warning: the window froze for {stall_ms:.0f} ms in {by_handler.most_common(1)[0][0]}")
+        self.write_log(line)
+        self.export_folded(self.folded_path)
+
+    def write_log(self, line):
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.MAX_LOG_BYTES:
+                # stalls.log -> stalls.log.1 -> stalls.log.2 ...
+                for number in range(self.LOG_BACKUPS - 1, 0, -1):
+                    older = f"{self.log_path}.{number}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{self.log_path}.{number + 1}")
+                os.replace(self.log_path, self.log_path + ".1")
+            with open(self.log_path, "a", encoding="utf-8") as log_file:
+                log_file.write(line + "\n")
+        except OSError as e:
+            print(f"Warning: couldn't write the stall log: {e}")
+
+    def export_folded(self, path):
+        """
+        All samples so far as "frame;frame;frame count" lines (flamegraph.pl, speedscope).
+        """
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as folded_file:
+                for stack, count in self.folded.most_common():
+                    folded_file.write(";".join(stack) + f" {count}\n")
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: couldn't write the stall profile: {e}")
+
+    def stats(self):
+        lags = sorted(self.lags)
+        if not lags:
+            return {"p50_ms": 0, "p99_ms": 0, "stalls": self.stall_count, "worst_ms": self.worst_stall_ms}
+        return {
+            "p50_ms": lags[len(lags) // 2],
+            "p99_ms": lags[min(len(lags) - 1, len(lags) * 99 // 100)],
+            "stalls": self.stall_count,
+            "worst_ms": self.worst_stall_ms,
+        }
+
+
+if __name__ == "__main__":
+    # Self-check and overhead: python stall_watchdog.py [idle seconds]
+    # Freezes the event loop on purpose in a few ways and checks each one is
+    # caught and blamed on the right handler, then compares the CPU used by
+    # an idle event loop with and without the watchdog.
+    import tempfile
+
+    from PyQt5.QtCore import QCoreApplication
+
+    idle_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    app = QCoreApplication(sys.argv[:1])
+
+    def spin(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            sum(range(1000))
+
+    class Handlers:
+        # Named like the window's handlers so the attribution is easy to check
+        def toggle_theme(self):
+            spin(0.4)
+
+        def add_new_tab(self):
+            time.sleep(0.3)  # Blocked outside Python's own code
+
+        def navigate(self):
+            spin(0.05)  # Too short to count as a stall
+
+    def idle_cpu(watchdog_on):
+        with tempfile.TemporaryDirectory() as folder:
+            watchdog = StallWatchdog(os.path.join(folder, "stalls.log"), os.path.join(folder, "stalls.folded"))
+            if watchdog_on:
+                watchdog.start()
+            QTimer.singleShot(int(idle_seconds * 1000), app.quit)
+            start = time.process_time()
+            app.exec_()
+            used = time.process_time() - start
+            watchdog.stop()
+        return used
+
+    def check_stalls():
+        folder = tempfile.mkdtemp()
+        log_path = os.path.join(folder, "stalls.log")
+        folded_path = os.path.join(folder, "stalls.folded")
+        watchdog = StallWatchdog(log_path, folded_path, stall_ms=150)
+        handlers = Handlers()
+        for delay, handler in ((300, handlers.toggle_theme), (1200, handlers.add_new_tab), (2000, handlers.navigate)):
+            QTimer.singleShot(delay, handler)
+        QTimer.singleShot(2800, app.quit)
+        watchdog.start()
+        app.exec_()
+        watchdog.stop()
+
+        with open(log_path, encoding="utf-8") as log_file:
+            lines = log_file.read().splitlines()
+        with open(folded_path, encoding="utf-8") as folded_file:
+            folded = folded_file.read()
+        ok = [
+            ("two stalls logged", len(lines) == 2),
+            ("spinning blamed on toggle_theme", bool(lines) and "samples: stall_watchdog.py:Handlers.toggle_theme" in lines[0]),
+            ("sleep blamed on add_new_tab", len(lines) > 1 and "Handlers.add_new_tab" in lines[1]),
+            ("short handler not reported", "navigate" not in folded),
+            ("folded stacks written", "stall_watchdog.py:Handlers.toggle_theme;stall_watchdog.py:spin " in folded),
+        ]
+        for line in lines:
+            print("  " + line)
+        for name, passed in ok:
+            print(f"{'ok  ' if passed else 'FAIL'} {name}")
+        return all(passed for _, passed in ok)
+
+    passed = check_stalls()
+    without = idle_cpu(False)
+    with_watchdog = idle_cpu(True)
+    print(f"idle CPU over {idle_seconds:.0f} s: {without * 1000:.1f} ms without the watchdog, "
+          f"{with_watchdog * 1000:.1f} ms with it ({(with_watchdog - without) / idle_seconds * 100:.3f}% of a core)")
+    sys.exit(0 if passed else 1)
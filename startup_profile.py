@@ -0,0 +1,39 @@
+import os
+import time
+
+
+class StartupProfiler:
+    """
+    Logs how long each startup step took (run main.py with --profile-startup).
+
+    Times are measured from `start`, which main.py takes before importing
+    Qt. Every run is also appended to a CSV log so cold-start regressions
+    show up over time.
+    """
+
+    STEPS = ("imports", "QApplication", "window created", "first paint", "first loadFinished")
+
+    def __init__(self, start, enabled=False):
+        self.start = start
+        self.enabled = enabled
+        self.marks = {}
+
+    def mark(self, step):
+        if not self.enabled or step in self.marks:
+            return
+        self.marks[step] = (time.perf_counter() - self.start) * 1000
+        print(f"[startup] {step}: {self.marks[step]:.0f} ms")
+
+    def write_log(self, path):
+        if not self.enabled:
+            return
+        try:
+            new_file = not os.path.exists(path)
+            with open(path, "a", encoding="utf-8") as log_file:
+                if new_file:
+                    log_file.write("time," + ",".join(self.STEPS) + "\n")
+                values = [f"{self.marks[step]:.0f}" if step in self.marks else "" for step in self.STEPS]
+                log_file.write(time.strftime("%Y-%m-%d %H:%M:%S") + "," + ",".join(values) + "\n")
+        except OSError as e:
+            print(f"Warning: couldn't write the startup log: {e}")
+
@@ -0,0 +1,244 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+
+from procstats import browser_rss, process_rss
+
+
+class TabLifecycleManager(QObject):
+    """
+    Discards background tabs to save memory.
+
+    A tab is discarded when it hasn't been looked at for `idle_minutes`, or
+    (least recently used first) when the whole browser goes over
+    `memory_budget_mb`. Discarded tabs only keep their URL, title, icon and
+    scroll position and are brought back when they become the current tab.
+    Setting either value to 0 turns that rule off. Lazy tabs that were never
+    shown have no view to begin with and are left alone.
+    """
+
+    CHECK_INTERVAL_MS = 30 * 1000
+
+    def __init__(self, tab_widget, idle_minutes=30, memory_budget_mb=0, parent=None):
+        super().__init__(parent)
+        self.tabs = tab_widget
+        self.idle_minutes = idle_minutes
+        self.memory_budget_mb = memory_budget_mb
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.CHECK_INTERVAL_MS)
+        self.timer.timeout.connect(self.check)
+        self.timer.start()
+
+    def configure(self, idle_minutes, memory_budget_mb):
+        self.idle_minutes = idle_minutes
+        self.memory_budget_mb = memory_budget_mb
+        self.check()
+
+    def all_tabs(self):
+        return [self.tabs.widget(i) for i in range(self.tabs.count())]
+
+    def activate(self, browser_tab):
+        """
+        Called when a tab becomes the current one. Restores it if it was discarded.
+        """
+        if browser_tab is None:
+            return
+        browser_tab.last_active = time.monotonic()
+        if browser_tab.is_discarded():
+            browser_tab.restore()
+
+    def can_discard(self, browser_tab):
+        if browser_tab is self.tabs.currentWidget() or browser_tab.is_discarded():
+            return False
+        # Don't kill music or videos that are playing in the background.
+        if browser_tab.page is not None and browser_tab.page.recentlyAudible():
+            return False
+        return True
+
+    def check(self):
+        now = time.monotonic()
+        candidates = [t for t in self.all_tabs() if self.can_discard(t)]
+        # Least recently used first
+        candidates.sort(key=lambda t: t.last_active)
+
+        if self.idle_minutes > 0:
+            idle_seconds = self.idle_minutes * 60
+            for browser_tab in list(candidates):
+                if now - browser_tab.last_active >= idle_seconds:
+                    browser_tab.discard()
+                    candidates.remove(browser_tab)
+
+        if self.memory_budget_mb > 0 and candidates:
+            budget = self.memory_budget_mb * 1024 * 1024
+            total = self.total_memory()
+            while total is not None and total > budget and candidates:
+                browser_tab = candidates.pop(0)
+                # The renderer may be shared with other tabs, so this is only an estimate.
+                freed = browser_tab.memory_usage() or 0
+                browser_tab.discard()
+                total -= freed
+
+    def discard_background_tabs(self):
+        """
+        Discards every tab except the current one right away.
+        """
+        for browser_tab in self.all_tabs():
+            if self.can_discard(browser_tab):
+                browser_tab.discard()
+
+    def total_memory(self):
+        return browser_rss(t.renderer_pid() for t in self.all_tabs() if t.renderer_pid())
+
+    def stats(self):
+        """
+        Per-tab counters, mostly useful for checking that discarding actually helps.
+        """
+        now = time.monotonic()
+        rows = []
+        for browser_tab in self.all_tabs():
+            pid = browser_tab.renderer_pid()
+            rows.append({
+                "title": browser_tab.current_title(),
+                "url": browser_tab.current_url().toString(),
+                "state": browser_tab.state(),
+                "renderer_pid": pid,
+                "rss": process_rss(pid),
+                "idle_seconds": round(now - browser_tab.last_active),
+                "discards": browser_tab.discard_count,
+                "restores": browser_tab.restore_count,
+                "throttled": browser_tab.throttled,
+            })
+        return rows
+
+
+if __name__ == "__main__":
+    # Tab close soak test: python tab_lifecycle.py [tabs]
+    # Opens a tab in a real browser window, waits for its page to load from a
+    # local server and closes it again, 1000 times by default. Afterwards the
+    # live page count, the BrowserTab objects and the process count have to be
+    # back where they were after the warm-up, and memory within MEMORY_SLACK
+    # of it. Runs offscreen, and Qt's test mode keeps it out of your own
+    # data folder.
+    import gc
+    import os
+    import shutil
+    import sys
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt5.QtCore import QCoreApplication, QEvent, QStandardPaths, QUrl
+    from PyQt5.QtWidgets import QApplication
+
+    QStandardPaths.setTestModeEnabled(True)
+
+    import main
+    from app_paths import data_path
+    from procstats import format_bytes, process_tree
+
+    WARM_UP = 20
+    MEMORY_SLACK = 0.15
+    # Deleted tabs' renderer processes take a moment to exit
+    SETTLE_MS = 2000
+
+    class PageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            paragraphs = "".join(f"<p>Paragraph {number} of {self.path}</p>" for number in range(200))
+            body = (f"<html><head><title>Soak {self.path}</title></head><body>{paragraphs}"
+                    "<script>window.junk = new Array(100000).fill(Math.random());</script>"
+                    "</body></html>").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    QApplication.setApplicationName("Lovely Browser")
+    # No session, history or settings left over from the last run
+    shutil.rmtree(data_path(), ignore_errors=True)
+    app = QApplication(sys.argv[:1])
+    window = main.MyWebBrowser()
+    window.show()
+
+    def measure():
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        gc.collect()
+        return {
+            "pages": main.CustomWebEnginePage.alive,
+            "BrowserTab objects": sum(isinstance(obj, main.BrowserTab) for obj in gc.get_objects()),
+            "processes": len(process_tree(os.getpid())),
+            "memory": browser_rss(),
+        }
+
+    done = 0
+    baseline = {}
+
+    def open_tab():
+        browser_tab = window.add_new_tab(QUrl(f"{base_url}{done}"))
+        browser_tab.loadFinished.connect(page_loaded)
+
+    def page_loaded(ok):
+        # Closed from the event loop, not from inside the page's own signal
+        QTimer.singleShot(0, close_tab)
+
+    def close_tab():
+        global done
+        browser_tab = window.tabs.currentWidget()
+        browser_tab.loadFinished.disconnect(page_loaded)
+        window.close_current_tab(window.tabs.indexOf(browser_tab))
+        done += 1
+        if done == WARM_UP:
+            QTimer.singleShot(SETTLE_MS, lambda: (baseline.update(measure()), open_tab()))
+        elif done == WARM_UP + cycles:
+            QTimer.singleShot(SETTLE_MS, finish)
+        else:
+            if done % 100 == 0:
+                print(f"{done} tabs opened and closed, {format_bytes(browser_rss())} in use")
+            QTimer.singleShot(0, open_tab)
+
+    def finish():
+        after = measure()
+        print(f"{'':<20} {'baseline':>12} {'after':>12}")
+        for name, value in baseline.items():
+            if name == "memory":
+                print(f"{name:<20} {format_bytes(value):>12} {format_bytes(after[name]):>12}")
+            else:
+                print(f"{name:<20} {value:>12} {after[name]:>12}")
+        checks = [
+            ("pages back to baseline", after["pages"] == baseline["pages"]),
+            ("BrowserTab objects back to baseline", after["BrowserTab objects"] == baseline["BrowserTab objects"]),
+            ("processes back to baseline", after["processes"] <= baseline["processes"]),
+            (f"memory within {MEMORY_SLACK:.0%} of baseline", after["memory"] is None or baseline["memory"] is None
+             or after["memory"] <= baseline["memory"] * (1 + MEMORY_SLACK)),
+        ]
+        for name, ok in checks:
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        results.extend(ok for _, ok in checks)
+        window.close()
+        app.quit()
+
+    def start():
+        # One local page stays open the whole time, so closing a test tab
+        # never leaves the window on a tab that still has to load
+        home = window.add_new_tab(QUrl(base_url + "home"))
+        while window.tabs.count() > 1:
+            window.close_current_tab(0 if window.tabs.widget(0) is not home else 1)
+        open_tab()
+
+    results = []
+    QTimer.singleShot(0, start)
+    # Gives up if pages stop loading
+    QTimer.singleShot((WARM_UP + cycles) * 1000 + 60000, app.quit)
+    app.exec_()
+    server.shutdown()
+    sys.exit(0 if results and all(results) else 1)
@@ -0,0 +1,223 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QRect, QSize, Qt, QTimer
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPixmap
+from PyQt5.QtWidgets import QDialog, QLabel, QLineEdit, QListView, QListWidget, QListWidgetItem, QVBoxLayout
+
+THUMBNAIL_SIZE = QSize(240, 150)
+
+
+class ThumbnailCache:
+    """
+    Small page snapshots keyed by URL, so they still match after a restart
+    when the tabs come back lazy. Recently used ones stay in memory, all of
+    them go to disk as JPEGs, and both are kept under a size budget by
+    dropping the least recently used.
+    """
+
+    def __init__(self, folder, memory_budget=16 * 1024 * 1024, disk_budget=64 * 1024 * 1024):
+        self.folder = folder
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.folder, hashlib.sha1(url.encode()).hexdigest() + ".jpg")
+
+    @staticmethod
+    def pixmap_size(pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+    def get(self, url, load=True):
+        pixmap = self.memory.get(url)
+        if pixmap is not None:
+            self.memory.move_to_end(url)
+            return pixmap
+        if not load:
+            return None
+        path = self.path(url)
+        pixmap = QPixmap(path)
+        if pixmap.isNull():
+            return None
+        try:
+            os.utime(path)  # Disk LRU goes by mtime
+        except OSError:
+            pass
+        self.remember(url, pixmap)
+        return pixmap
+
+    def put(self, url, pixmap):
+        self.remember(url, pixmap)
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        pixmap.save(buffer, "JPG", 70)
+        try:
+            with open(self.path(url), "wb") as thumbnail_file:
+                thumbnail_file.write(bytes(data))
+        except OSError as e:
+            print(f"Warning: couldn't save a tab thumbnail: {e}")
+        self.trim_disk()
+
+    def remember(self, url, pixmap):
+        old = self.memory.pop(url, None)
+        if old is not None:
+            self.memory_used -= self.pixmap_size(old)
+        self.memory[url] = pixmap
+        self.memory_used += self.pixmap_size(pixmap)
+        while self.memory_used > self.memory_budget and len(self.memory) > 1:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_used -= self.pixmap_size(evicted)
+
+    def trim_disk(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.folder):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= self.disk_budget:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            # Trim down to 90% so this doesn't run on every single capture
+            if total <= self.disk_budget * 0.9:
+                break
+
+
+def capture_tab(browser_tab):
+    """
+    A low resolution snapshot of the tab's page, or None if it can't be taken.
+    Only works for the visible tab, a hidden web view grabs as blank.
+    """
+    if browser_tab.is_discarded() or not browser_tab.browser.isVisible():
+        return None
+    view = browser_tab.browser
+    # Take the top of the page with the thumbnail's aspect ratio, then scale it down
+    height = min(view.height(), view.width() * THUMBNAIL_SIZE.height() // THUMBNAIL_SIZE.width())
+    pixmap = view.grab(QRect(0, 0, view.width(), height))
+    if pixmap.isNull():
+        return None
+    return pixmap.scaled(THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+def placeholder(title):
+    pixmap = QPixmap(THUMBNAIL_SIZE)
+    pixmap.fill(QColor("#dddddd"))
+    painter = QPainter(pixmap)
+    painter.setPen(QColor("#555555"))
+    painter.drawText(pixmap.rect().adjusted(8, 8, -8, -8), Qt.AlignCenter | Qt.TextWordWrap, title)
+    painter.end()
+    return pixmap
+
+
+class TabOverview(QDialog):
+    """
+    Grid of every tab with its thumbnail, filtered as you type. Only reads
+    what the tabs remember (URL, title, cached thumbnail), so lazy and
+    discarded tabs stay asleep. Picking one just makes it the current tab.
+    """
+
+    # Thumbnails read from disk per event loop turn, so big sessions open instantly
+    LOAD_BATCH = 24
+
+    def __init__(self, tabs, thumbnails, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        self.thumbnails = thumbnails
+        self.setWindowTitle("Tab Overview")
+        self.resize(1000, 700)
+
+        layout = QVBoxLayout(self)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search tabs by title or URL")
+        self.search_edit.setClearButtonEnabled(True)
+        self.grid = QListWidget()
+        self.grid.setViewMode(QListView.IconMode)
+        self.grid.setIconSize(THUMBNAIL_SIZE)
+        self.grid.setGridSize(QSize(THUMBNAIL_SIZE.width() + 24, THUMBNAIL_SIZE.height() + 44))
+        self.grid.setResizeMode(QListView.Adjust)
+        self.grid.setMovement(QListView.Static)
+        self.grid.setUniformItemSizes(True)
+        self.grid.setWordWrap(True)
+        self.count_label = QLabel()
+        layout.addWidget(self.search_edit)
+        layout.addWidget(self.grid)
+        layout.addWidget(self.count_label)
+
+        self.search_edit.textChanged.connect(self.filter)
+        self.search_edit.returnPressed.connect(self.choose_first)
+        self.grid.itemActivated.connect(self.choose)
+
+        self.pending = []
+        self.load_timer = QTimer(self)
+        self.load_timer.timeout.connect(self.load_some)
+        self.populate()
+
+    def populate(self):
+        current = self.tabs.currentWidget()
+        blank = QIcon(placeholder("Loading..."))
+        for index in range(self.tabs.count()):
+            browser_tab = self.tabs.widget(index)
+            url = browser_tab.current_url().toString()
+            title = browser_tab.current_title() or url
+            item = QListWidgetItem(title)
+            item.setToolTip(url)
+            item.setData(Qt.UserRole, browser_tab)
+            item.setData(Qt.UserRole + 1, (title + " " + url).lower())
+            pixmap = self.thumbnails.get(url, load=False)
+            if pixmap is not None:
+                item.setIcon(QIcon(pixmap))
+            else:
+                item.setIcon(blank)
+                self.pending.append((item, url, title))
+            self.grid.addItem(item)
+            if browser_tab is current:
+                self.grid.setCurrentItem(item)
+        self.count_label.setText(f"{self.tabs.count()} tabs")
+        if self.pending:
+            self.load_timer.start(0)
+
+    def load_some(self):
+        batch, self.pending = self.pending[:self.LOAD_BATCH], self.pending[self.LOAD_BATCH:]
+        for item, url, title in batch:
+            pixmap = self.thumbnails.get(url)
+            item.setIcon(QIcon(pixmap if pixmap is not None else placeholder(title)))
+        if not self.pending:
+            self.load_timer.stop()
+
+    def filter(self, text):
+        words = text.lower().split()
+        shown = 0
+        for row in range(self.grid.count()):
+            item = self.grid.item(row)
+            haystack = item.data(Qt.UserRole + 1)
+            hidden = not all(word in haystack for word in words)
+            item.setHidden(hidden)
+            shown += not hidden
+        self.count_label.setText(f"{shown} of {self.grid.count()} tabs")
+
+    def choose_first(self):
+        for row in range(self.grid.count()):
+            if not self.grid.item(row).isHidden():
+                self.choose(self.grid.item(row))
+                return
+
+    def choose(self, item):
+        index = self.tabs.indexOf(item.data(Qt.UserRole))
+        if index != -1:
+            # Same path as clicking the tab, so current_tab_changed does the loading
+            self.tabs.setCurrentIndex(index)
+        self.accept()
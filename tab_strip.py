@@ -0,0 +1,621 @@
+from PyQt5.QtCore import (
+    QAbstractListModel, QEvent, QMimeData, QModelIndex, QRect, QSize, QSortFilterProxyModel, Qt, pyqtSignal,
+)
+from PyQt5.QtGui import QIcon, QKeySequence, QPalette
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QApplication, QHBoxLayout, QLineEdit, QListView, QPushButton, QShortcut, QSplitter,
+    QStackedWidget, QStyle, QStyledItemDelegate, QStyleOptionViewItem, QVBoxLayout, QWidget,
+)
+
+from favicons import site_key
+
+UrlRole = Qt.UserRole + 1
+HostRole = Qt.UserRole + 2
+# Title and URL together, what the filter box matches against
+SearchRole = Qt.UserRole + 3
+
+MIME_TYPE = "application/x-lovely-tab-row"
+
+
+class TabItem:
+    """
+    One tab's metadata. `widget` stays None for placeholder tabs until they're first shown.
+    """
+
+    __slots__ = ("widget", "title", "icon", "url", "host")
+
+    def __init__(self, widget, title="", icon=None, url=""):
+        self.widget = widget
+        self.title = title
+        self.icon = icon if icon is not None else QIcon()
+        self.url = url
+        self.host = site_key(url) if url else ""
+
+
+class TabModel(QAbstractListModel):
+    """
+    The list of tabs: title, icon and URL per row, in tab order. This is
+    what the tab list shows and what TabStrip answers from, so looking up
+    or renaming a tab doesn't go through any widget.
+    """
+
+    tabMoved = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.by_widget = {}
+        # Item -> row, so indexOf() doesn't scan every tab. Rebuilt on the
+        # next lookup after rows shift (a removal or a move).
+        self.rows = {}
+        self.rows_valid = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            return item.title
+        if role == Qt.DecorationRole:
+            return item.icon
+        if role == Qt.ToolTipRole:
+            return f"{item.title}\n{item.url}" if item.url else item.title
+        if role == UrlRole:
+            return item.url
+        if role == HostRole:
+            return item.host
+        if role == SearchRole:
+            return f"{item.title} {item.url}"
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled  # Dropping between tabs
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def row_of(self, item):
+        if not self.rows_valid:
+            self.rows = {item: row for row, item in enumerate(self.items)}
+            self.rows_valid = True
+        return self.rows.get(item, -1)
+
+    def row_of_widget(self, widget):
+        item = self.by_widget.get(widget)
+        return -1 if item is None else self.row_of(item)
+
+    def insert(self, row, item):
+        row = max(0, min(row, len(self.items)))
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.insert(row, item)
+        if item.widget is not None:
+            self.by_widget[item.widget] = item
+        if self.rows_valid and row == len(self.items) - 1:
+            self.rows[item] = row  # Appending doesn't shift anything
+        else:
+            self.rows_valid = False
+        self.endInsertRows()
+        return row
+
+    def remove(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        item = self.items.pop(row)
+        self.by_widget.pop(item.widget, None)
+        self.rows.pop(item, None)
+        if row != len(self.items):
+            self.rows_valid = False
+        self.endRemoveRows()
+        return item
+
+    def move(self, from_row, to_row):
+        """
+        Like QTabBar.moveTab: the tab at from_row ends up at to_row.
+        """
+        if from_row == to_row:
+            return
+        # beginMoveRows wants the row it goes in front of, counted before the move
+        self.beginMoveRows(QModelIndex(), from_row, from_row, QModelIndex(),
+                           to_row + 1 if to_row > from_row else to_row)
+        self.items.insert(to_row, self.items.pop(from_row))
+        self.rows_valid = False
+        self.endMoveRows()
+        self.tabMoved.emit(from_row, to_row)
+
+    def set_widget(self, row, widget):
+        item = self.items[row]
+        item.widget = widget
+        self.by_widget[widget] = item
+
+    def set_title(self, row, title):
+        self.items[row].title = title
+        self.changed(row, [Qt.DisplayRole, Qt.ToolTipRole, SearchRole])
+
+    def set_icon(self, row, icon):
+        self.items[row].icon = icon
+        self.changed(row, [Qt.DecorationRole])
+
+    def set_url(self, row, url):
+        item = self.items[row]
+        if item.url == url:
+            return
+        item.url = url
+        item.host = site_key(url)
+        self.changed(row, [UrlRole, HostRole, Qt.ToolTipRole, SearchRole])
+
+    def changed(self, row, roles):
+        index = self.index(row)
+        self.dataChanged.emit(index, index, roles)
+
+    # --- Drag and drop reordering ------------------------------------------------
+
+    def supportedDragActions(self):
+        return Qt.MoveAction
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [MIME_TYPE]
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        if indexes:
+            data.setData(MIME_TYPE, str(indexes[0].row()).encode())
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if action != Qt.MoveAction or not data.hasFormat(MIME_TYPE):
+            return False
+        from_row = int(bytes(data.data(MIME_TYPE)).decode())
+        if row == -1:
+            # Dropped onto a tab rather than between two
+            row = parent.row() if parent.isValid() else len(self.items)
+        # `row` is the gap it was dropped in, counted with the dragged tab still in place
+        to_row = row - 1 if row > from_row else row
+        if 0 <= from_row < len(self.items) and from_row != to_row:
+            self.move(from_row, min(to_row, len(self.items) - 1))
+        # The move is already done, so the view mustn't remove the dragged row
+        # as it would after a normal move
+        return False
+
+
+class TabDelegate(QStyledItemDelegate):
+    """
+    Draws a tab row: icon, title and a close button on hover. With
+    grouping on, the first tab of every site gets the site's name above it.
+    """
+
+    closeClicked = pyqtSignal(QModelIndex)
+
+    ROW_HEIGHT = 30
+    HEADER_HEIGHT = 22
+    CLOSE_SIZE = 18
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grouped = False
+
+    def group_start(self, index):
+        if not self.grouped:
+            return False
+        row = index.row()
+        return row == 0 or index.sibling(row - 1, 0).data(HostRole) != index.data(HostRole)
+
+    def row_rect(self, option, index):
+        rect = QRect(option.rect)
+        if self.group_start(index):
+            rect.setTop(rect.top() + self.HEADER_HEIGHT)
+        return rect
+
+    def close_rect(self, rect):
+        return QRect(rect.right() - self.CLOSE_SIZE - 4, rect.center().y() - self.CLOSE_SIZE // 2,
+                     self.CLOSE_SIZE, self.CLOSE_SIZE)
+
+    def sizeHint(self, option, index):
+        return QSize(0, self.ROW_HEIGHT + (self.HEADER_HEIGHT if self.group_start(index) else 0))
+
+    def paint(self, painter, option, index):
+        widget = option.widget
+        style = widget.style() if widget is not None else QApplication.style()
+        rect = self.row_rect(option, index)
+        if rect.top() != option.rect.top():
+            header = QRect(option.rect.left() + 8, option.rect.top(), option.rect.width() - 16, self.HEADER_HEIGHT)
+            painter.save()
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(option.palette.color(QPalette.PlaceholderText))
+            painter.drawText(header, Qt.AlignLeft | Qt.AlignBottom, index.data(HostRole) or "Other")
+            painter.restore()
+
+        row_option = QStyleOptionViewItem(option)
+        self.initStyleOption(row_option, index)
+        row_option.rect = rect
+        # The background goes all the way across, the title stops short of the close button
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, row_option, painter, widget)
+        show_close = row_option.state & (QStyle.State_MouseOver | QStyle.State_Selected)
+        if show_close:
+            row_option.rect = rect.adjusted(0, 0, -self.CLOSE_SIZE - 6, 0)
+        style.drawControl(QStyle.CE_ItemViewItem, row_option, painter, widget)
+        if show_close:
+            painter.save()
+            painter.setPen(option.palette.color(QPalette.Text))
+            painter.drawText(self.close_rect(rect), Qt.AlignCenter, "×")
+            painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            on_close = self.close_rect(self.row_rect(option, index)).contains(event.pos())
+            # Middle click anywhere on a tab closes it too
+            if (on_close and event.button() == Qt.LeftButton) or event.button() == Qt.MiddleButton:
+                if event.type() == QEvent.MouseButtonRelease:
+                    self.closeClicked.emit(index)
+                return True  # Otherwise the press would switch to the tab that's being closed
+        return super().editorEvent(event, model, option, index)
+
+
+class TabListView(QListView):
+    emptyDoubleClicked = pyqtSignal()
+
+    def mouseDoubleClickEvent(self, event):
+        if not self.indexAt(event.pos()).isValid():
+            self.emptyDoubleClicked.emit()
+            return
+        super().mouseDoubleClickEvent(event)
+
+
+class TabStrip(QWidget):
+    """
+    Vertical tabs, standing in for QTabWidget (same method names and
+    signals, so the rest of the browser works with either).
+
+    The tab list is a QListView over a TabModel, so only the rows on screen
+    are ever drawn and thousands of tabs stay quick to add, move and switch
+    between. It can be filtered and grouped by site. Page widgets only
+    join the QStackedWidget once they're shown, and only the MAX_STACKED
+    most recently shown ones stay in it. Tabs can even be added without a
+    widget, `create_widget(title, url)` then makes one the first time the
+    tab is shown.
+    """
+
+    currentChanged = pyqtSignal(int)
+    tabCloseRequested = pyqtSignal(int)
+    tabBarDoubleClicked = pyqtSignal(int)
+    tabMoved = pyqtSignal(int, int)
+
+    MAX_STACKED = 16
+    PANEL_WIDTH = 240
+
+    def __init__(self, create_widget=None, parent=None):
+        super().__init__(parent)
+        self.create_widget = create_widget
+        self.current = None
+        # Widgets in the stacked layout, least recently shown first
+        self.stacked = []
+        # Set while we change rows ourselves, so the view following along isn't taken as a click
+        self.updating = False
+
+        self.model = TabModel(self)
+        self.model.tabMoved.connect(self.tabMoved)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterRole(SearchRole)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.proxy.setSortRole(HostRole)
+
+        self.delegate = TabDelegate(self)
+        self.delegate.closeClicked.connect(self.close_clicked)
+
+        self.list_view = TabListView()
+        self.list_view.setObjectName("tab_list")
+        self.list_view.setModel(self.proxy)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setLayoutMode(QListView.Batched)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.list_view.setDragDropMode(QAbstractItemView.InternalMove)
+        self.list_view.setDefaultDropAction(Qt.MoveAction)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.selectionModel().currentChanged.connect(self.view_current_changed)
+        self.list_view.doubleClicked.connect(
+            lambda index: self.tabBarDoubleClicked.emit(self.proxy.mapToSource(index).row())
+        )
+        self.list_view.emptyDoubleClicked.connect(lambda: self.tabBarDoubleClicked.emit(-1))
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter tabs")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self.set_filter)
+        # Only on click, so the page (not the filter) has the keyboard when the window opens
+        self.filter_edit.setFocusPolicy(Qt.ClickFocus)
+        self.group_btn = QPushButton("By site")
+        self.group_btn.setCheckable(True)
+        self.group_btn.setToolTip("Group tabs by site")
+        self.group_btn.toggled.connect(self.set_grouped)
+        self.group_btn.setFocusPolicy(Qt.NoFocus)
+
+        self.panel = QWidget()
+        self.panel.setObjectName("tab_panel")
+        self.panel.setMinimumWidth(160)
+        panel_layout = QVBoxLayout(self.panel)
+        panel_layout.setContentsMargins(4, 4, 4, 4)
+        # setCornerWidget() puts the window's buttons here
+        self.corner_layout = QHBoxLayout()
+        self.corner_layout.setContentsMargins(0, 0, 0, 0)
+        self.corner_layout.addStretch()
+        panel_layout.addLayout(self.corner_layout)
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.filter_edit, 1)
+        filter_layout.addWidget(self.group_btn)
+        panel_layout.addLayout(filter_layout)
+        panel_layout.addWidget(self.list_view)
+
+        self.stack = QStackedWidget()
+        self.splitter = QSplitter()
+        self.splitter.addWidget(self.panel)
+        self.splitter.addWidget(self.stack)
+        self.splitter.setChildrenCollapsible(False)
+        self.splitter.setStretchFactor(1, 1)
+        self.splitter.setSizes([self.PANEL_WIDTH, 1000])
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.splitter)
+
+        QShortcut(QKeySequence("Ctrl+Tab"), self, lambda: self.cycle(1))
+        QShortcut(QKeySequence("Ctrl+Shift+Tab"), self, lambda: self.cycle(-1))
+        QShortcut(QKeySequence("Ctrl+Shift+PgDown"), self, lambda: self.move_current(1))
+        QShortcut(QKeySequence("Ctrl+Shift+PgUp"), self, lambda: self.move_current(-1))
+
+    # --- QTabWidget's API -----------------------------------------------------------
+
+    def count(self):
+        return len(self.model.items)
+
+    def widget(self, row):
+        return self.model.items[row].widget if 0 <= row < len(self.model.items) else None
+
+    def indexOf(self, widget):
+        return self.model.row_of_widget(widget)
+
+    def currentIndex(self):
+        return -1 if self.current is None else self.model.row_of(self.current)
+
+    def currentWidget(self):
+        return None if self.current is None else self.current.widget
+
+    def addTab(self, widget, icon, title, url=""):
+        return self.insertTab(self.count(), widget, icon, title, url)
+
+    def insertTab(self, row, widget, icon, title, url=""):
+        if widget is not None:
+            # Parented right away like QTabWidget pages, but hidden until shown.
+            # Outside the stacked layout nothing else would hide it, and a
+            # shown parent would show it on top of the current tab.
+            widget.setParent(self.stack)
+            widget.hide()
+        row = self.model.insert(row, TabItem(widget, title, icon, url))
+        if self.current is None:
+            self.setCurrentIndex(row)
+        return row
+
+    def removeTab(self, row):
+        """
+        Takes the tab out, the widget isn't deleted (same as QTabWidget).
+        """
+        if not 0 <= row < self.count():
+            return
+        self.updating = True
+        try:
+            item = self.model.remove(row)
+        finally:
+            self.updating = False
+        if item.widget in self.stacked:
+            self.stacked.remove(item.widget)
+            self.stack.removeWidget(item.widget)
+        if item is self.current:
+            self.current = None
+            if self.count():
+                # The next tab down takes its place, like QTabBar.SelectRightTab
+                self.setCurrentIndex(min(row, self.count() - 1))
+            else:
+                self.currentChanged.emit(-1)
+
+    def moveTab(self, from_row, to_row):
+        if 0 <= from_row < self.count() and 0 <= to_row < self.count():
+            self.model.move(from_row, to_row)
+
+    def setCurrentIndex(self, row):
+        if not 0 <= row < self.count():
+            return
+        item = self.model.items[row]
+        if item is self.current:
+            return
+        self.current = item
+        self.show_item(row, item)
+        self.sync_selection()
+        self.currentChanged.emit(row)
+
+    def setCurrentWidget(self, widget):
+        self.setCurrentIndex(self.indexOf(widget))
+
+    def tabText(self, row):
+        return self.model.items[row].title
+
+    def setTabText(self, row, title):
+        if 0 <= row < self.count():
+            self.model.set_title(row, title)
+
+    def tabIcon(self, row):
+        return self.model.items[row].icon
+
+    def setTabIcon(self, row, icon):
+        if 0 <= row < self.count():
+            self.model.set_icon(row, icon)
+
+    def tabUrl(self, row):
+        return self.model.items[row].url
+
+    def setTabUrl(self, row, url):
+        if 0 <= row < self.count():
+            self.model.set_url(row, url)
+
+    def setCornerWidget(self, widget):
+        self.corner_layout.addWidget(widget)
+
+    # --- Internals ---------------------------------------------------------------------
+
+    def show_item(self, row, item):
+        if item.widget is None:
+            if self.create_widget is None:
+                return
+            widget = self.create_widget(item.title, item.url)
+            widget.setParent(self.stack)
+            widget.hide()
+            self.model.set_widget(row, widget)
+        widget = item.widget
+        if widget in self.stacked:
+            self.stacked.remove(widget)
+        else:
+            self.stack.addWidget(widget)
+        self.stacked.append(widget)
+        self.stack.setCurrentWidget(widget)
+        # Long unseen pages leave the layout (they stay parented, just hidden)
+        while len(self.stacked) > self.MAX_STACKED:
+            widget = self.stacked.pop(0)
+            self.stack.removeWidget(widget)
+            widget.hide()
+
+    def sync_selection(self):
+        index = self.proxy.mapFromSource(self.model.index(self.currentIndex()))
+        if not index.isValid():
+            return  # Filtered out
+        self.updating = True
+        try:
+            self.list_view.setCurrentIndex(index)
+        finally:
+            self.updating = False
+        self.list_view.scrollTo(index)
+
+    def view_current_changed(self, current, previous):
+        if not self.updating and current.isValid():
+            self.setCurrentIndex(self.proxy.mapToSource(current).row())
+
+    def close_clicked(self, index):
+        self.tabCloseRequested.emit(self.proxy.mapToSource(index).row())
+
+    def set_filter(self, text):
+        self.proxy.setFilterFixedString(text.strip())
+        self.sync_selection()
+
+    def set_grouped(self, grouped):
+        self.delegate.grouped = grouped
+        # Group headers make some rows taller, and dragging within a sorted list makes no sense
+        self.list_view.setUniformItemSizes(not grouped)
+        self.list_view.setDragEnabled(not grouped)
+        self.proxy.sort(0 if grouped else -1)
+        self.list_view.doItemsLayout()
+        self.sync_selection()
+
+    def cycle(self, step):
+        """
+        Next/previous tab in the order the list shows them.
+        """
+        rows = self.proxy.rowCount()
+        if not rows:
+            return
+        current = self.proxy.mapFromSource(self.model.index(self.currentIndex()))
+        row = (current.row() + step) % rows if current.isValid() else 0
+        self.setCurrentIndex(self.proxy.mapToSource(self.proxy.index(row, 0)).row())
+
+    def move_current(self, step):
+        row = self.currentIndex()
+        if row != -1:
+            self.moveTab(row, max(0, min(self.count() - 1, row + step)))
+            self.sync_selection()
+
+
+if __name__ == "__main__":
+    # Benchmark: python tab_strip.py [tabs] [operations]
+    # Opens placeholder tabs in a QTabWidget and in a TabStrip and times
+    # adding them, renaming, moving and switching tabs, with the window
+    # repainted after every operation like it would be in use.
+    import random
+    import statistics
+    import sys
+    import time
+
+    from PyQt5.QtWidgets import QLabel, QTabWidget
+
+    tab_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    app = QApplication(sys.argv[:1])
+    titles = [f"Page {number} - site {number % 40}" for number in range(tab_count)]
+    urls = [f"https://site{number % 40}.example/page/{number}" for number in range(tab_count)]
+
+    def timed(action):
+        start = time.perf_counter()
+        action()
+        app.processEvents()
+        return (time.perf_counter() - start) * 1000
+
+    def latencies(label, tabs, action):
+        rng = random.Random(1)
+        times = [timed(lambda: action(tabs, rng)) for _ in range(operations)]
+        print(f"  {label:<10} median {statistics.median(times):7.2f} ms, "
+              f"p95 {sorted(times)[len(times) * 95 // 100]:7.2f} ms")
+
+    def bench(name, tabs, add):
+        tabs.resize(1200, 800)
+        tabs.show()
+        app.processEvents()
+        print(f"{name}, {tab_count} tabs")
+        start = time.perf_counter()
+        for number in range(tab_count):
+            add(number)
+        app.processEvents()
+        total = (time.perf_counter() - start) * 1000
+        print(f"  {'insert':<10} {total:7.0f} ms total, {total * 1000 / tab_count:7.1f} µs per tab")
+        latencies("rename", tabs, lambda t, rng: t.setTabText(rng.randrange(tab_count), f"Renamed {rng.random():.3f}"))
+        latencies("reorder", tabs, lambda t, rng: move(t, rng.randrange(tab_count), rng.randrange(tab_count)))
+        latencies("switch", tabs, lambda t, rng: t.setCurrentIndex(rng.randrange(tab_count)))
+        tabs.hide()
+
+    def move(tabs, from_row, to_row):
+        if isinstance(tabs, QTabWidget):
+            tabs.tabBar().moveTab(from_row, to_row)
+        else:
+            tabs.moveTab(from_row, to_row)
+
+    # QTabWidget needs a real widget for every tab, even empty ones
+    tab_widget = QTabWidget()
+    bench("QTabWidget", tab_widget, lambda n: tab_widget.addTab(QWidget(), titles[n]))
+
+    # TabStrip rows start without a widget, a label is made when one is first shown
+    strip = TabStrip(create_widget=lambda title, url: QLabel(f"{title}\n{url}"))
+    bench("TabStrip", strip, lambda n: strip.addTab(None, QIcon(), titles[n], urls[n]))
+    strip.show()
+    print(f"  {'filter':<10} {timed(lambda: strip.filter_edit.setText('site 7')):7.2f} ms "
+          f"({strip.proxy.rowCount()} tabs match)")
+    print(f"  {'group':<10} {timed(lambda: strip.group_btn.setChecked(True)):7.2f} ms")
+    print(f"  {strip.stack.count()} of {strip.count()} tabs have a widget in the stacked layout")
+
+    # Tabs added before the window is shown, like main.py's session tabs:
+    # only the current one may end up visible, before and after switching
+    check = TabStrip()
+    labels = [QLabel(f"tab {number}") for number in range(5)]
+    for label in labels:
+        check.addTab(label, QIcon(), label.text())
+    check.show()
+    app.processEvents()
+    shown_at_start = [label.isVisible() for label in labels]
+    check.setCurrentIndex(3)
+    app.processEvents()
+    shown_after_switch = [label.isVisible() for label in labels]
+    ok = (shown_at_start == [True, False, False, False, False]
+          and shown_after_switch == [False, False, False, True, False])
+    print(f"{'ok  ' if ok else 'FAIL'} only the current tab is visible "
+          f"({shown_at_start} then {shown_after_switch})")
+    sys.exit(0 if ok else 1)
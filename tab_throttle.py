@@ -0,0 +1,299 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QUrl
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+# setLifecycleState() only exists from Qt 5.14 on
+HAS_LIFECYCLE = hasattr(QWebEnginePage, "setLifecycleState")
+
+# Fallback for older Qt: pause what the page is playing and hold back its
+# animation frames until it's shown again. The state is kept on the window
+# so running it twice (or resuming a page that was never paused) is harmless.
+PAUSE_JS = """
+(function () {
+    if (window.__lovelyPaused) return;
+    var state = window.__lovelyPaused = {
+        media: [], animations: [], callbacks: [],
+        raf: window.requestAnimationFrame, caf: window.cancelAnimationFrame,
+    };
+    document.querySelectorAll("video, audio").forEach(function (media) {
+        if (!media.paused) { state.media.push(media); media.pause(); }
+    });
+    if (document.getAnimations) {
+        state.animations = document.getAnimations().filter(function (animation) {
+            return animation.playState === "running";
+        });
+        state.animations.forEach(function (animation) { animation.pause(); });
+    }
+    window.requestAnimationFrame = function (callback) {
+        state.callbacks.push(callback);
+        return -state.callbacks.length;
+    };
+    window.cancelAnimationFrame = function (id) {
+        if (id < 0) state.callbacks[-id - 1] = null;
+        else state.caf.call(window, id);
+    };
+})();
+"""
+
+RESUME_JS = """
+(function () {
+    var state = window.__lovelyPaused;
+    if (!state) return;
+    delete window.__lovelyPaused;
+    window.requestAnimationFrame = state.raf;
+    window.cancelAnimationFrame = state.caf;
+    state.media.forEach(function (media) { media.play().catch(function () {}); });
+    state.animations.forEach(function (animation) { animation.play(); });
+    state.callbacks.forEach(function (callback) {
+        if (callback) state.raf.call(window, callback);
+    });
+})();
+"""
+
+
+def split_hosts(text):
+    return [host.strip().lower() for host in text.replace(",", " ").split() if host.strip()]
+
+
+class BackgroundThrottler(QObject):
+    """
+    Stops background tabs from using CPU. A tab that has been hidden for
+    FREEZE_DELAY_MS is frozen (Chromium stops running its timers, tasks and
+    animations) and made active again when it's looked at. On Qt older than
+    5.14 there's no freezing, so its media and animation frames are paused
+    from JavaScript instead.
+
+    Tabs that are playing sound and sites on the allow-list (music players
+    and the like, subdomains included) are never touched.
+    """
+
+    # Short enough to matter, long enough that flicking through tabs doesn't freeze them
+    FREEZE_DELAY_MS = 10 * 1000
+    CHECK_INTERVAL_MS = 1000
+
+    def __init__(self, tab_widget, enabled=True, allowed_hosts=(), parent=None):
+        super().__init__(parent)
+        self.tabs = tab_widget
+        self.enabled = enabled
+        self.allowed_hosts = list(allowed_hosts)
+        self.use_lifecycle = HAS_LIFECYCLE
+        self.current = None
+        # Tab -> when it's due to be throttled
+        self.pending = {}
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.CHECK_INTERVAL_MS)
+        self.timer.timeout.connect(self.check)
+
+    def configure(self, enabled, allowed_hosts):
+        self.enabled = enabled
+        self.allowed_hosts = list(allowed_hosts)
+        for index in range(self.tabs.count()):
+            browser_tab = self.tabs.widget(index)
+            if not self.can_throttle(browser_tab):
+                self.resume(browser_tab)
+            elif browser_tab is not self.current and not browser_tab.throttled:
+                self.schedule(browser_tab)
+
+    def watch(self, browser_tab):
+        browser_tab.loadFinished.connect(self.tab_load_finished)
+
+    def forget(self, browser_tab):
+        self.pending.pop(browser_tab, None)
+        if self.current is browser_tab:
+            self.current = None
+
+    def tab_activated(self, browser_tab):
+        previous, self.current = self.current, browser_tab
+        if browser_tab is not None:
+            self.pending.pop(browser_tab, None)
+            self.resume(browser_tab)
+        if previous is not None and previous is not browser_tab:
+            self.schedule(previous)
+
+    def tab_load_finished(self, success):
+        # A background tab that loaded a new page (or came back from frozen to load it)
+        browser_tab = self.sender()
+        if browser_tab is not self.current:
+            self.schedule(browser_tab)
+
+    def is_allowed(self, url):
+        host = url.host().lower()
+        return any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts)
+
+    def can_throttle(self, browser_tab):
+        if not self.enabled or browser_tab.is_discarded():
+            return False
+        # Music or a video somebody is listening to in the background
+        if browser_tab.page.recentlyAudible():
+            return False
+        return not self.is_allowed(browser_tab.current_url())
+
+    def schedule(self, browser_tab):
+        self.pending[browser_tab] = time.monotonic() + self.FREEZE_DELAY_MS / 1000
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def check(self):
+        now = time.monotonic()
+        for browser_tab, due in list(self.pending.items()):
+            if due > now:
+                continue
+            del self.pending[browser_tab]
+            if browser_tab is not self.current and self.can_throttle(browser_tab):
+                self.throttle(browser_tab)
+        if not self.pending:
+            self.timer.stop()
+
+    def throttle(self, browser_tab):
+        if self.use_lifecycle:
+            if browser_tab.page.lifecycleState() == QWebEnginePage.LifecycleState.Active:
+                browser_tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+            browser_tab.throttled = "frozen"
+        else:
+            # Also after a new page loaded in the background, since that one starts unpaused
+            browser_tab.page.runJavaScript(PAUSE_JS)
+            browser_tab.throttled = "paused"
+
+    def resume(self, browser_tab):
+        if not browser_tab.throttled:
+            return
+        if not browser_tab.is_discarded():
+            if browser_tab.throttled == "frozen":
+                browser_tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            else:
+                browser_tab.page.runJavaScript(RESUME_JS)
+        browser_tab.throttled = None
+
+    def throttle_background_tabs(self):
+        """
+        Throttles every hidden tab right away instead of after the delay.
+        """
+        for index in range(self.tabs.count()):
+            browser_tab = self.tabs.widget(index)
+            self.pending.pop(browser_tab, None)
+            if browser_tab is not self.current and self.can_throttle(browser_tab):
+                self.throttle(browser_tab)
+
+
+if __name__ == "__main__":
+    # CPU report: python tab_throttle.py [tabs] [seconds] [--js]
+    # Opens animated pages from a local server in a tab widget and measures
+    # the CPU time of the whole browser (renderers included) while nothing
+    # is throttled, then with every background tab throttled.
+    import sys
+    import os
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from PyQt5.QtCore import pyqtSignal
+    from PyQt5.QtWebEngineWidgets import QWebEngineProfile, QWebEngineView
+    from PyQt5.QtWidgets import QApplication, QTabWidget, QVBoxLayout, QWidget
+
+    from procstats import process_cpu_time, process_tree
+
+    PAGE = """<html><head><title>animated</title><style>
+    .box { width: 40px; height: 40px; background: tomato; display: inline-block;
+           animation: spin 1s linear infinite; }
+    @keyframes spin { to { transform: rotate(360deg); } }
+    </style></head><body>
+    <canvas id="c" width="600" height="300"></canvas><div>%s</div>
+    <script>
+    var ctx = document.getElementById("c").getContext("2d");
+    function draw(t) {
+        for (var i = 0; i < 300; i++) {
+            ctx.fillStyle = "hsl(" + ((t / 10 + i) %% 360) + ", 70%%, 50%%)";
+            ctx.fillRect((i * 37 + t / 5) %% 600, (i * 17) %% 300, 20, 20);
+        }
+        requestAnimationFrame(draw);
+    }
+    requestAnimationFrame(draw);
+    setInterval(function () { document.title = "animated " + Date.now(); }, 50);
+    </script></body></html>""" % ('<span class="box"></span>' * 50)
+
+    class AnimatedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = PAGE.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class BenchTab(QWidget):
+        # Just the parts of BrowserTab the throttler uses
+        loadFinished = pyqtSignal(bool)
+
+        def __init__(self, profile, url):
+            super().__init__()
+            self.browser = QWebEngineView()
+            self.page = QWebEnginePage(profile, self.browser)
+            self.browser.setPage(self.page)
+            self.throttled = None
+            QVBoxLayout(self).addWidget(self.browser)
+            self.page.loadFinished.connect(self.loadFinished)
+            self.page.load(url)
+
+        def is_discarded(self):
+            return False
+
+        def current_url(self):
+            return self.page.url()
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    tab_count = int(args[0]) if args else 20
+    seconds = float(args[1]) if len(args) > 1 else 10
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AnimatedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = QUrl(f"http://127.0.0.1:{server.server_address[1]}/")
+
+    app = QApplication(sys.argv[:1])
+    profile = QWebEngineProfile()
+    tabs = QTabWidget()
+    tabs.resize(1000, 700)
+    throttler = BackgroundThrottler(tabs)
+    if "--js" in sys.argv:
+        throttler.use_lifecycle = False
+    for number in range(tab_count):
+        tabs.addTab(BenchTab(profile, url), f"tab {number}")
+    tabs.show()
+    throttler.tab_activated(tabs.currentWidget())
+    throttler.pending.clear()
+
+    def cpu_seconds():
+        return sum(process_cpu_time(pid) or 0 for pid in process_tree(os.getpid()))
+
+    results = {}
+
+    def measure(label, then):
+        start_cpu, start = cpu_seconds(), time.perf_counter()
+
+        def done():
+            elapsed = time.perf_counter() - start
+            results[label] = (cpu_seconds() - start_cpu) / elapsed * 100
+            then()
+        QTimer.singleShot(int(seconds * 1000), done)
+
+    def throttled_run():
+        throttler.throttle_background_tabs()
+        # Let the pages actually stop before measuring
+        QTimer.singleShot(2000, lambda: measure("throttled", report))
+
+    def report():
+        how = "frozen" if throttler.use_lifecycle else "paused from JavaScript"
+        print(f"{tab_count} animated tabs, background ones {how}, {seconds:.0f} s per run")
+        for label, percent in results.items():
+            print(f"{label:<12} {percent:6.1f}% CPU")
+        if results.get("normal"):
+            print(f"saved {100 - results['throttled'] / results['normal'] * 100:.0f}%")
+        server.shutdown()
+        app.quit()
+
+    # Give every page time to load and start animating first
+    QTimer.singleShot(5000, lambda: measure("normal", throttled_run))
+    app.exec_()
@@ -0,0 +1,154 @@
+import base64
+import glob
+import json
+import os
+import string
+import sys
+import time
+
+from PyQt5.QtGui import QColor, QPalette
+from PyQt5.QtWidgets import QApplication
+
+THEMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes")
+
+ARROW_SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 16 16">'
+             '<path fill="{color}" d="M4 6h8l-4 5z"/></svg>')
+
+
+class ThemeEngine:
+    """
+    Themes are a .json file of colors in the themes folder, filled into the
+    shared base.qss template. Rendered stylesheets are cached (until the
+    files change) and a switch is one palette change for the application
+    plus one stylesheet on the main window. Setting the stylesheet on the
+    window instead of QApplication measured about twice as fast, since Qt
+    then only repolishes the window's own widgets.
+    """
+
+    def __init__(self, themes_dir=THEMES_DIR):
+        self.themes_dir = themes_dir
+        self.template_path = os.path.join(themes_dir, "base.qss")
+        self.cache = {}
+        self.current = None
+        self.last_switch_ms = 0.0
+
+    def theme_path(self, name):
+        return os.path.join(self.themes_dir, f"{name}.json")
+
+    def available(self):
+        """
+        Returns [(name, label), ...] in the order the themes want to be listed.
+        """
+        themes = []
+        for path in glob.glob(os.path.join(self.themes_dir, "*.json")):
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with open(path, encoding="utf-8") as theme_file:
+                    theme = json.load(theme_file)
+            except (OSError, ValueError) as e:
+                print(f"Warning: skipping theme {path}: {e}")
+                continue
+            themes.append((theme.get("order", 99), name, theme.get("label", name.title())))
+        return [(name, label) for _, name, label in sorted(themes)]
+
+    def render(self, name):
+        """
+        Returns (stylesheet, palette) for a theme, from the cache when the files haven't changed.
+        """
+        path = self.theme_path(name)
+        signature = (os.path.getmtime(path), os.path.getmtime(self.template_path))
+        cached = self.cache.get(name)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+
+        with open(path, encoding="utf-8") as theme_file:
+            theme = json.load(theme_file)
+        with open(self.template_path, encoding="utf-8") as template_file:
+            template = string.Template(template_file.read())
+
+        colors = theme["colors"]
+        arrow = ARROW_SVG.format(color=colors.get("arrow", colors["fg"]))
+        values = dict(colors)
+        values["font"] = theme.get("font", "Arial")
+        values["radius"] = theme.get("radius", "4px")
+        values["arrow_icon"] = "data:image/svg+xml;base64," + base64.b64encode(arrow.encode()).decode("ascii")
+        stylesheet = template.safe_substitute(values)
+
+        palette = self.make_palette(colors)
+        self.cache[name] = (signature, stylesheet, palette)
+        return stylesheet, palette
+
+    @staticmethod
+    def make_palette(colors):
+        # Covers what the stylesheet doesn't reach, like the web view's
+        # background before a page paints.
+        palette = QPalette()
+        palette.setColor(QPalette.Window, QColor(colors["bg"]))
+        palette.setColor(QPalette.WindowText, QColor(colors["fg"]))
+        palette.setColor(QPalette.Base, QColor(colors["input_bg"]))
+        palette.setColor(QPalette.Text, QColor(colors["fg"]))
+        palette.setColor(QPalette.Button, QColor(colors["button_bg"]))
+        palette.setColor(QPalette.ButtonText, QColor(colors["fg"]))
+        palette.setColor(QPalette.Highlight, QColor(colors["accent"]))
+        palette.setColor(QPalette.HighlightedText, QColor(colors["accent_text"]))
+        return palette
+
+    def apply(self, name, window):
+        """
+        Switches the application and `window` to a theme. Returns how long it took in ms.
+        """
+        if name == self.current:
+            return 0.0
+        start = time.perf_counter()
+        try:
+            stylesheet, palette = self.render(name)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: couldn't load theme '{name}': {e}")
+            return 0.0
+        QApplication.instance().setPalette(palette)
+        window.setStyleSheet(stylesheet)
+        self.current = name
+        self.last_switch_ms = (time.perf_counter() - start) * 1000
+        return self.last_switch_ms
+
+
+if __name__ == "__main__":
+    # Timing harness: python theme_engine.py [tab counts...]
+    # Builds tabs with the same toolbar widgets as BrowserTab (minus the web
+    # view) and measures how long a theme switch takes as the count grows.
+    from PyQt5.QtWidgets import QHBoxLayout, QLineEdit, QMainWindow, QPushButton, QTabWidget, QVBoxLayout, QWidget
+
+    app = QApplication(sys.argv[:1])
+    engine = ThemeEngine()
+    names = [name for name, _ in engine.available()]
+
+    for count in [int(arg) for arg in sys.argv[1:]] or [1, 10, 50, 200]:
+        window = QMainWindow()
+        tabs = QTabWidget()
+        window.setCentralWidget(tabs)
+        for i in range(count):
+            tab = QWidget()
+            layout = QVBoxLayout(tab)
+            toolbar = QHBoxLayout()
+            for text in ("<", ">", "Go", "Reload"):
+                toolbar.addWidget(QPushButton(text))
+            toolbar.insertWidget(2, QLineEdit())
+            layout.addLayout(toolbar)
+            layout.addWidget(QWidget())
+            tabs.addTab(tab, f"Tab {i}")
+        window.show()
+        app.processEvents()
+
+        timings = []
+        for round_number in range(3):
+            for name in names:
+                start = time.perf_counter()
+                engine.apply(name, window)
+                app.processEvents()
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{count:>5} tabs: median {timings[len(timings) // 2]:.1f} ms, worst {timings[-1]:.1f} ms")
+        window.close()
+        window.deleteLater()
+        engine.current = None
+        app.processEvents()
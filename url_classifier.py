@@ -0,0 +1,382 @@
+import ipaddress
+import json
+import re
+from urllib.parse import quote_plus
+
+# Schemes that make the text a URL as it is, anything else with a colon
+# ("localhost:8080", "note: buy milk") goes through the host checks below
+KNOWN_SCHEMES = {
+    "http", "https", "file", "ftp", "about", "data", "blob", "chrome", "qrc",
+    "view-source", "mailto", "tel", "ws", "wss",
+}
+
+SCHEME_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*):(//)?")
+# host[:port][/path?query#fragment], the host can be a bracketed IPv6 address
+HOST_RE = re.compile(r"^(\[[0-9a-fA-F:.]+\]|[^/?#:\s@\[\]]+)(?::(\d{1,5}))?([/?#].*)?$", re.S)
+LABEL_RE = re.compile(r"^(?!-)[a-z0-9-]{1,63}(?<!-)$")
+DOTTED_NUMBERS_RE = re.compile(r"^[0-9.]+$")
+
+# Used when there's no public_suffix_list.dat in the data folder: every
+# country code, the common generic TLDs and the multi-part suffixes people
+# actually type. Good enough to tell "example.co.uk" from "e.g.", the full
+# list (publicsuffix.org) is picked up if it's there.
+BUILTIN_SUFFIXES = """
+ac ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo br bs bt
+bw by bz ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm do dz ec ee eg er es
+et eu fi fj fk fm fo fr ga gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id
+ie il im in io iq ir is it je jm jo jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr ls lt lu
+lv ly ma mc md me mg mh mk ml mm mn mo mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np
+nr nu nz om pa pe pf pg ph pk pl pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh si sk
+sl sm sn so sr ss st su sv sx sy sz tc td tf tg th tj tk tl tm tn to tr tt tv tw tz ua ug uk us uy
+uz va vc ve vg vi vn vu wf ws ye yt za zm zw
+com net org edu gov mil int arpa info biz name pro aero asia cat coop jobs mobi museum post tel
+travel xxx app dev blog cloud shop store online site tech xyz top club design page news live art
+wiki email link space website fun icu vip work one today life world ninja digital agency studio
+systems solutions network media software games zone onion
+xn--p1ai xn--p1acf xn--fiqs8s xn--fiqz9s xn--3e0b707e xn--j6w193g xn--90ais xn--mgbaam7a8h
+co.uk org.uk ac.uk gov.uk me.uk ltd.uk plc.uk net.uk sch.uk nhs.uk
+com.au net.au org.au edu.au gov.au asn.au id.au
+co.jp ne.jp or.jp ac.jp go.jp ad.jp ed.jp gr.jp lg.jp
+co.nz net.nz org.nz govt.nz ac.nz school.nz
+com.br net.br org.br gov.br edu.br
+co.in net.in org.in gov.in ac.in edu.in
+co.za org.za gov.za ac.za
+com.cn net.cn org.cn gov.cn edu.cn
+com.mx org.mx gob.mx edu.mx
+com.tr org.tr gov.tr edu.tr
+co.kr or.kr go.kr ac.kr
+com.tw org.tw gov.tw edu.tw
+com.hk org.hk gov.hk edu.hk
+*.ck !www.ck
+github.io gitlab.io blogspot.com appspot.com herokuapp.com pages.dev netlify.app vercel.app
+"""
+
+
+class PublicSuffixTrie:
+    """
+    The public suffix list as a trie of labels read from the right
+    ("co.uk" is root -> "uk" -> "co"). Follows the list's rules, including
+    wildcards ("*.ck") and exceptions ("!www.ck").
+    """
+
+    # Marks a node where a rule ends: True for a normal rule, "!" for an exception
+    END = ""
+
+    def __init__(self, rules=()):
+        self.root = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule):
+        exception = rule.startswith("!")
+        node = self.root
+        for label in reversed(rule.lstrip("!").lower().split(".")):
+            node = node.setdefault(label, {})
+        node[self.END] = "!" if exception else True
+
+    @classmethod
+    def from_text(cls, text):
+        trie = cls()
+        for line in text.splitlines():
+            # The list puts one rule per line, with // comments
+            rule = line.split("//", 1)[0].strip()
+            for word in rule.split():
+                trie.add(word)
+        return trie
+
+    @classmethod
+    def load(cls, path=None):
+        if path is not None:
+            try:
+                with open(path, encoding="utf-8") as suffix_file:
+                    return cls.from_text(suffix_file.read())
+            except FileNotFoundError:
+                pass
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Warning: couldn't read the public suffix list: {e}")
+        return cls.from_text(BUILTIN_SUFFIXES)
+
+    def is_tld(self, label):
+        return label in self.root
+
+    def suffix_length(self, labels):
+        """
+        How many of the host's labels (from the right) are its public suffix, 0 if none is known.
+        """
+        node = self.root
+        length = 0
+        for depth, label in enumerate(reversed(labels), 1):
+            child = node.get(label)
+            wildcard = node.get("*")
+            if child is not None:
+                if child.get(self.END) == "!":
+                    return depth - 1  # Exception: the rule one label shorter wins
+                node = child
+                if self.END in child:
+                    length = depth
+            elif wildcard is not None:
+                return depth
+            else:
+                break
+        return length
+
+    def registrable_domain(self, host):
+        """
+        The part of the host someone could register ("news.bbc.co.uk" -> "bbc.co.uk"), or None.
+        """
+        labels = host.lower().rstrip(".").split(".")
+        length = self.suffix_length(labels)
+        if not length or length >= len(labels):
+            return None
+        return ".".join(labels[-length - 1:])
+
+
+class SearchEngine:
+    def __init__(self, name, url, keyword="", encoding="utf-8"):
+        self.name = name
+        self.url = url
+        self.keyword = keyword
+        self.encoding = encoding
+
+    def url_for(self, query):
+        terms = quote_plus(query, encoding=self.encoding, errors="replace")
+        return self.url.replace("{searchTerms}", terms)
+
+
+DEFAULT_ENGINES = [
+    SearchEngine("Google", "https://www.google.com/search?q={searchTerms}", "g"),
+    SearchEngine("Bing", "https://www.bing.com/search?q={searchTerms}", "b"),
+    SearchEngine("DuckDuckGo", "https://duckduckgo.com/?q={searchTerms}", "ddg"),
+    SearchEngine("Yahoo", "https://search.yahoo.com/search?p={searchTerms}", "y"),
+    SearchEngine("Wikipedia", "https://en.wikipedia.org/w/index.php?search={searchTerms}", "w"),
+    SearchEngine("GitHub", "https://github.com/search?q={searchTerms}", "gh"),
+    SearchEngine("YouTube", "https://www.youtube.com/results?search_query={searchTerms}", "yt"),
+]
+
+
+class SearchEngines:
+    """
+    The search engines the URL bar can use, in the order they're listed.
+    More can be added (or the built-in ones changed, by name) in a JSON file:
+
+        {"engines": [{"name": "MDN", "keyword": "mdn",
+                      "url": "https://developer.mozilla.org/search?q={searchTerms}"}]}
+    """
+
+    def __init__(self, config_path=None):
+        self.engines = {engine.name: engine for engine in DEFAULT_ENGINES}
+        if config_path is not None:
+            self.load(config_path)
+        self.keywords = {engine.keyword: engine for engine in self.engines.values() if engine.keyword}
+
+    def load(self, path):
+        try:
+            with open(path, encoding="utf-8") as config_file:
+                config = json.load(config_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: couldn't read the search engines file: {e}")
+            return
+        for entry in config.get("engines", []):
+            try:
+                engine = SearchEngine(entry["name"], entry["url"], entry.get("keyword", ""),
+                                      entry.get("encoding", "utf-8"))
+                "".encode(engine.encoding)  # Unknown encodings are caught here rather than on every search
+            except (KeyError, TypeError, LookupError) as e:
+                print(f"Warning: skipping a search engine in {path}: {e!r}")
+                continue
+            self.engines[engine.name] = engine
+
+    def names(self):
+        return list(self.engines)
+
+    def get(self, name):
+        # Google if the saved one has been removed from the config since
+        return self.engines.get(name) or self.engines.get("Google") or next(iter(self.engines.values()))
+
+
+class UrlClassifier:
+    """
+    Decides what the text typed in the URL bar means: a URL (and which one)
+    or a search (and with which engine). Cheap enough to run on every
+    keystroke, see the benchmark at the bottom.
+
+    Text is a URL if it has a known scheme, or its host is localhost, an IP
+    address, a single name with a port ("intranet:8080") or a domain ending
+    in a known public suffix. "gh something" searches with the engine whose
+    keyword is "gh", and a leading "?" forces a search.
+    """
+
+    def __init__(self, engines=None, suffixes=None):
+        self.engines = engines or SearchEngines()
+        self.suffixes = suffixes or PublicSuffixTrie.load()
+
+    def classify(self, text, engine_name="Google"):
+        """
+        Returns (kind, url) where kind is "url" or "search", or (None, "") for empty text.
+        """
+        text = text.strip()
+        if not text:
+            return None, ""
+        if text.startswith("?"):
+            return "search", self.engines.get(engine_name).url_for(text[1:].strip())
+
+        keyword, _, query = text.partition(" ")
+        engine = self.engines.keywords.get(keyword)
+        if engine is not None and query.strip():
+            return "search", engine.url_for(query.strip())
+
+        url = self.url_for_text(text)
+        if url is not None:
+            return "url", url
+        return "search", self.engines.get(engine_name).url_for(text)
+
+    def url_for_text(self, text):
+        match = SCHEME_RE.match(text)
+        if match and (match.group(1).lower() in KNOWN_SCHEMES or match.group(2)):
+            return text
+
+        match = HOST_RE.match(text)
+        if match is None:
+            return None
+        host, port, rest = match.groups()
+        scheme = self.scheme_for_host(host, port)
+        if scheme is None:
+            return None
+        return f"{scheme}://{host.lower() if host.isascii() else host}" + (f":{port}" if port else "") + (rest or "")
+
+    def scheme_for_host(self, host, port):
+        """
+        "http" for local addresses, "https" for public domains, None if this doesn't look like a host at all.
+        """
+        if port is not None and int(port) > 65535:
+            return None
+        if host.startswith("["):
+            try:
+                ipaddress.IPv6Address(host[1:-1])
+            except ValueError:
+                return None
+            return "http"
+
+        host = host.lower().rstrip(".")
+        if host == "localhost" or host.endswith(".localhost"):
+            return "http"
+        if DOTTED_NUMBERS_RE.match(host):
+            # Only a full dotted quad, "1.5" is a number somebody wants to look up
+            if host.count(".") != 3:
+                return None
+            try:
+                ipaddress.IPv4Address(host)
+            except ValueError:
+                return None
+            return "http"
+
+        if not host.isascii():
+            try:
+                host = host.encode("idna").decode("ascii")
+            except UnicodeError:
+                return None
+        labels = host.split(".")
+        if not all(LABEL_RE.match(label) for label in labels):
+            return None
+        if len(labels) == 1:
+            # A bare name is only a host with a port, otherwise it's a search
+            return "http" if port is not None else None
+        if not self.suffixes.is_tld(labels[-1]) or labels[-1].isdigit():
+            return None
+        return "https"
+
+
+if __name__ == "__main__":
+    # Self-check and fuzz/benchmark: python url_classifier.py [inputs]
+    import random
+    import sys
+    import time
+
+    classifier = UrlClassifier()
+    cases = [
+        ("example.com", "url", "https://example.com"),
+        ("Example.COM/Path?q=1", "url", "https://example.com/Path?q=1"),
+        ("news.bbc.co.uk", "url", "https://news.bbc.co.uk"),
+        ("http://example.com", "url", "http://example.com"),
+        ("file:///tmp/a.html", "url", "file:///tmp/a.html"),
+        ("about:blank", "url", "about:blank"),
+        ("localhost", "url", "http://localhost"),
+        ("localhost:8080/app", "url", "http://localhost:8080/app"),
+        ("intranet:3000", "url", "http://intranet:3000"),
+        ("192.168.1.10", "url", "http://192.168.1.10"),
+        ("10.0.0.1:8000/x", "url", "http://10.0.0.1:8000/x"),
+        ("[::1]:8080", "url", "http://[::1]:8080"),
+        ("bücher.de", "url", "https://bücher.de"),
+        ("пример.рф", "url", "https://пример.рф"),
+        ("e.g.", "search", "https://www.google.com/search?q=e.g."),
+        ("1.5", "search", "https://www.google.com/search?q=1.5"),
+        ("999.1.1.1", "search", "https://www.google.com/search?q=999.1.1.1"),
+        ("python", "search", "https://www.google.com/search?q=python"),
+        ("c++ tutorial", "search", "https://www.google.com/search?q=c%2B%2B+tutorial"),
+        ("note: buy milk", "search", "https://www.google.com/search?q=note%3A+buy+milk"),
+        ("what is example.com", "search", "https://www.google.com/search?q=what+is+example.com"),
+        ("gh pyqt5 browser", "search", "https://github.com/search?q=pyqt5+browser"),
+        ("gh", "search", "https://www.google.com/search?q=gh"),
+        ("?example.com", "search", "https://www.google.com/search?q=example.com"),
+        ("user@example.com", "search", "https://www.google.com/search?q=user%40example.com"),
+        ("foo.notatld", "search", "https://www.google.com/search?q=foo.notatld"),
+        ("localhost:99999", "search", "https://www.google.com/search?q=localhost%3A99999"),
+    ]
+    failures = 0
+    for text, kind, url in cases:
+        result = classifier.classify(text)
+        if result != (kind, url):
+            failures += 1
+            print(f"FAIL {text!r}: got {result}, expected {(kind, url)}")
+    trie = classifier.suffixes
+    for host, domain in [("news.bbc.co.uk", "bbc.co.uk"), ("a.b.example.com", "example.com"),
+                         ("foo.bar.ck", "foo.bar.ck"), ("www.ck", "www.ck"), ("co.uk", None),
+                         ("me.github.io", "me.github.io")]:
+        if trie.registrable_domain(host) != domain:
+            failures += 1
+            print(f"FAIL registrable_domain({host!r}) = {trie.registrable_domain(host)!r}, expected {domain!r}")
+    print(f"{len(cases) + 6 - failures}/{len(cases) + 6} checks passed")
+
+    # Fuzz: random mixes of the things people type, plus plain garbage. Every
+    # input has to classify without raising, and come back as either the
+    # same URL every time or a search URL with the text in it.
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    rng = random.Random(20)
+    words = ["example", "github", "news", "bbc", "co", "uk", "com", "io", "localhost", "mail",
+             "foo", "bar", "what", "is", "how", "to", "python", "qt", "über", "пример", "рф"]
+    pieces = [".", ":", "/", "?", "#", " ", "-", "@", "[", "]", "::1", "8080", "99999", "http://",
+              "https://", "file:///", "192.168.0.1", "1.5", "%", "+", "\t", "g ", "gh ", "?"]
+    garbage = "".join(chr(c) for c in range(32, 127)) + "éü日本語🙂​"
+
+    def random_input():
+        roll = rng.random()
+        if roll < 0.1:
+            return "".join(rng.choice(garbage) for _ in range(rng.randint(0, 30)))
+        return "".join(rng.choice(words) if rng.random() < 0.6 else rng.choice(pieces)
+                       for _ in range(rng.randint(1, 8)))
+
+    inputs = [random_input() for _ in range(count)]
+    kinds = {}
+    start = time.perf_counter()
+    for text in inputs:
+        kind, url = classifier.classify(text)
+        kinds[kind] = kinds.get(kind, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    for text in inputs[:20000]:
+        kind, url = classifier.classify(text)
+        if kind == "search" and "://" not in url:
+            failures += 1
+            print(f"FAIL {text!r} gave a broken search URL {url!r}")
+        elif kind is None and text.strip():
+            failures += 1
+            print(f"FAIL {text!r} was treated as empty")
+        if classifier.classify(text) != (kind, url):
+            failures += 1
+            print(f"FAIL {text!r} isn't classified the same way twice")
+
+    print(f"{count} random inputs: {kinds.get('url', 0)} URLs, {kinds.get('search', 0)} searches, "
+          f"{elapsed / count * 1e6:.1f} µs each")
+    sys.exit(1 if failures else 0)